@@ -0,0 +1,423 @@
+"""Alarm-Regeln pro Instrument, z.B. "RSI(14) < 30", "price crosses EMA(50)"
+oder "within 0.2% of support".
+
+Jede Regel wird in Trigger der Form (Merkmal, Vergleich, Schwelle) übersetzt:
+
+- "RSI(14) < 30"                 -> rsi(14) < 30
+- "price > EMA(50)"              -> price-ema(50) > 0
+- "price crosses EMA(50)"        -> price-ema(50) > 0 oder < 0 (nur beim Wechsel)
+- "within 0.2% of support"       -> price~support(20) <= 0.2 (Abstand in Prozent)
+
+Alle Regeln zusammen ergeben einen Plan: jeder Indikator und jedes Merkmal
+wird pro Instrument nur einmal gerechnet, egal wie viele Regeln es nutzen.
+Die Schwellen liegen pro (Instrument, Merkmal, Vergleich) sortiert in einem
+ThresholdIndex. Bewegt sich ein Merkmal von alt nach neu, haben genau die
+Regeln mit einer Schwelle dazwischen ihren Zustand gewechselt - zwei bisects
+finden sie, alle anderen Regeln werden nicht angefasst.
+
+Ein Alarm wird ausgelöst, wenn eine Bedingung von falsch nach wahr wechselt.
+Neue Regeln werden einmal direkt geprüft; Bedingungen ohne crosses lösen
+dabei sofort aus, wenn sie schon erfüllt sind.
+"""
+import re
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+import indicators
+
+MAX_PERIOD = 1000
+
+# Vergleich -> Vergleich mit vertauschten Seiten
+FLIPPED = {'<': '>', '<=': '>=', '>': '<', '>=': '<='}
+
+_NUMBER = r'[-+]?(?:\d+\.?\d*|\.\d+)'
+_OPERAND = rf'(?:[a-z]+(?:\s*\(\s*\d+\s*\))?|{_NUMBER})'
+
+_WITHIN = re.compile(rf'^(?:({_OPERAND})\s+)?within\s+({_NUMBER})\s*%\s*of\s+({_OPERAND})$')
+_CROSSES = re.compile(rf'^({_OPERAND})\s+crosses(?:\s+(above|below))?\s+({_OPERAND})$')
+_COMPARE = re.compile(rf'^({_OPERAND})\s*(<=|>=|<|>)\s*({_OPERAND})$')
+_NAMED = re.compile(r'^([a-z]+)(?:\s*\(\s*(\d+)\s*\))?$')
+
+# Operanden-Namen -> (kanonischer Name, Standard-Periode; None = Periode Pflicht)
+NAMES = {
+    'price': ('price', 0), 'close': ('price', 0),
+    'ema': ('ema', None),
+    'rsi': ('rsi', None),
+    'support': ('support', 20),
+    'resistance': ('resistance', 20),
+}
+
+
+class Trigger(namedtuple('Trigger', 'feature op threshold cross')):
+    """Merkmal (z.B. 'rsi(14)'), Vergleich, Schwelle; cross=True löst nur
+    bei einem Wechsel aus, nie bei der ersten Prüfung"""
+    __slots__ = ()
+
+
+def parse(condition):
+    """Bedingung -> Liste von Triggern; ValueError bei ungültiger Syntax"""
+    text = ' '.join(condition.strip().lower().split())
+
+    match = _WITHIN.match(text)
+    if match:
+        subject = _operand(match.group(1) or 'price')
+        percent = float(match.group(2))
+        target = _operand(match.group(3))
+        if isinstance(subject, float) or isinstance(target, float):
+            raise ValueError(f'within braucht Kurs oder Indikator: {condition}')
+        if percent < 0:
+            raise ValueError(f'Negativer Abstand: {condition}')
+        return [Trigger(f'{subject}~{target}', '<=', percent, False)]
+
+    match = _CROSSES.match(text)
+    if match:
+        left, direction, right = _operand(match.group(1)), match.group(2), _operand(match.group(3))
+        feature, threshold, flipped = _difference(left, right, condition)
+        if flipped and direction:
+            direction = 'below' if direction == 'above' else 'above'
+        ops = {'above': ['>'], 'below': ['<'], None: ['>', '<']}[direction]
+        return [Trigger(feature, op, threshold, True) for op in ops]
+
+    match = _COMPARE.match(text)
+    if match:
+        left, op, right = _operand(match.group(1)), match.group(2), _operand(match.group(3))
+        feature, threshold, flipped = _difference(left, right, condition)
+        return [Trigger(feature, FLIPPED[op] if flipped else op, threshold, False)]
+
+    raise ValueError(f'Unbekannte Bedingung: {condition}')
+
+
+def _operand(text):
+    """'EMA(50)' -> 'ema(50)', 'support' -> 'support(20)', '1.1' -> 1.1"""
+    text = text.strip()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    match = _NAMED.match(text)
+    if not match or match.group(1) not in NAMES:
+        raise ValueError(f'Unbekannter Operand: {text}')
+    name, default = NAMES[match.group(1)]
+    if name == 'price':
+        if match.group(2):
+            raise ValueError(f'price hat keine Periode: {text}')
+        return name
+    period = int(match.group(2)) if match.group(2) else default
+    if period is None:
+        raise ValueError(f'{name.upper()} braucht eine Periode, z.B. {name.upper()}(14)')
+    if not 1 <= period <= MAX_PERIOD or (name == 'rsi' and period < 2):
+        raise ValueError(f'Ungültige Periode: {text}')
+    return f'{name}({period})'
+
+
+def _difference(left, right, condition):
+    """(Merkmal, Schwelle, Seiten vertauscht) für einen Vergleich left ? right"""
+    left_number, right_number = isinstance(left, float), isinstance(right, float)
+    if left_number and right_number:
+        raise ValueError(f'Bedingung ohne Kurs oder Indikator: {condition}')
+    if right_number:
+        return left, right, False
+    if left_number:
+        return right, left, True
+    if left == right:
+        raise ValueError(f'Beide Seiten gleich: {condition}')
+    return f'{left}-{right}', 0.0, False
+
+
+def indicator_key(operand):
+    """Laufender Indikator hinter einem Operanden; Support und Resistance
+    derselben Periode teilen sich ein RollingMinMax"""
+    if operand == 'price':
+        return None
+    name, period = operand[:-1].split('(')
+    return f'levels({period})' if name in ('support', 'resistance') else operand
+
+
+def make_indicator(key):
+    name, period = key[:-1].split('(')
+    period = int(period)
+    if name == 'ema':
+        return indicators.StreamingEMA(period)
+    if name == 'rsi':
+        return indicators.StreamingRSI(period)
+    return indicators.RollingMinMax(period)
+
+
+def load_indicator(key, state):
+    kind = {'ema': indicators.StreamingEMA, 'rsi': indicators.StreamingRSI}.get(key.split('(')[0])
+    return (kind or indicators.RollingMinMax).from_dict(state)
+
+
+def operands(feature):
+    """'price-ema(50)' -> ('price', 'ema(50)'), 'rsi(14)' -> ('rsi(14)',)"""
+    for separator in ('~', '-'):
+        if separator in feature:
+            return tuple(feature.split(separator))
+    return (feature,)
+
+
+def feature_value(feature, values):
+    """Wert eines Merkmals aus den Operanden-Werten; None, solange einer fehlt"""
+    if '~' in feature:
+        subject, target = feature.split('~')
+        a, b = values.get(subject), values.get(target)
+        if a is None or b is None or not b:
+            return None
+        return abs(a / b - 1) * 100
+    if '-' in feature:
+        subject, target = feature.split('-')
+        a, b = values.get(subject), values.get(target)
+        if a is None or b is None:
+            return None
+        return a - b
+    return values.get(feature)
+
+
+def holds(op, value, threshold):
+    if op == '<':
+        return value < threshold
+    if op == '<=':
+        return value <= threshold
+    if op == '>':
+        return value > threshold
+    return value >= threshold
+
+
+class ThresholdIndex:
+    """Schwellen eines (Instrument, Merkmal, Vergleich), aufsteigend sortiert.
+
+    Bei '<'/'<=' sind die Regeln ab einer Grenze erfüllt, bei '>'/'>=' die
+    bis zu einer Grenze; die Grenze zu einem Wert liefert ein bisect."""
+
+    __slots__ = ('op', 'thresholds', 'rules')
+
+    def __init__(self, op):
+        self.op = op
+        self.thresholds = []
+        self.rules = []         # (Regel-ID, cross), parallel zu thresholds
+
+    def add(self, threshold, rule_id, cross):
+        position = bisect_right(self.thresholds, threshold)
+        self.thresholds.insert(position, threshold)
+        self.rules.insert(position, (rule_id, cross))
+
+    def boundary(self, value):
+        if self.op in ('<', '>='):
+            return bisect_right(self.thresholds, value)
+        return bisect_left(self.thresholds, value)
+
+    def crossed(self, old, new):
+        """Regeln, deren Bedingung beim Wechsel old -> new wahr geworden ist"""
+        before, after = self.boundary(old), self.boundary(new)
+        if self.op in ('<', '<='):
+            # erfüllt: thresholds[boundary:]
+            return self.rules[after:before] if after < before else ()
+        # erfüllt: thresholds[:boundary]
+        return self.rules[before:after] if before < after else ()
+
+
+class Rule(namedtuple('Rule', 'id symbol condition triggers')):
+    __slots__ = ()
+
+    def to_dict(self):
+        return {'id': self.id, 'symbol': self.symbol, 'condition': self.condition}
+
+
+class Plan:
+    """Alle Regeln, kompiliert: pro Instrument die benötigten Indikatoren,
+    die Merkmale und die Schwellen-Indizes"""
+
+    def __init__(self, rules=()):
+        self.rules = {}
+        self.indicators = {}    # Symbol -> {Indikator-Schlüssel}
+        self.features = {}      # Symbol -> {Merkmal: [ThresholdIndex, ...]}
+        for rule in rules:
+            self.add(rule)
+
+    @property
+    def symbols(self):
+        return sorted(self.features)
+
+    def add(self, rule):
+        self.rules[rule.id] = rule
+        features = self.features.setdefault(rule.symbol, {})
+        needed = self.indicators.setdefault(rule.symbol, set())
+        for trigger in rule.triggers:
+            for operand in operands(trigger.feature):
+                key = indicator_key(operand)
+                if key:
+                    needed.add(key)
+            indexes = features.setdefault(trigger.feature, [])
+            index = next((i for i in indexes if i.op == trigger.op), None)
+            if index is None:
+                index = ThresholdIndex(trigger.op)
+                indexes.append(index)
+            index.add(trigger.threshold, rule.id, trigger.cross)
+
+    def __len__(self):
+        return len(self.rules)
+
+
+def compile_rules(rules, parsed=None):
+    """Plan aus Regel-Dicts {id, symbol, condition}. parsed ist ein optionaler
+    Cache Bedingung -> Trigger, viele Regeln teilen sich dieselbe Bedingung."""
+    parsed = {} if parsed is None else parsed
+    plan = Plan()
+    for rule in rules:
+        condition = rule['condition']
+        triggers = parsed.get(condition)
+        if triggers is None:
+            triggers = parsed[condition] = parse(condition)
+        plan.add(Rule(rule['id'], rule['symbol'], condition, triggers))
+    return plan
+
+
+class AlertEngine:
+    """Wertet einen Plan über die Tageskurse aus.
+
+    Die Indikatoren laufen wie in indicators.IndicatorSet pro Instrument
+    mit, die letzten Merkmalswerte sind die Vergleichsbasis für den nächsten
+    Tag. date ist der letzte ausgewertete Tag: ältere Zeilen wärmen nur die
+    Indikatoren auf, z.B. nach einem Neustart oder für neue Indikatoren."""
+
+    def __init__(self):
+        self.plan = Plan()
+        self.date = None            # letzter ausgewerteter Tag
+        self.state_date = None      # letzter Tag in den Indikatoren
+        self.indicators = {}        # Symbol -> {Schlüssel: Streaming-Indikator}
+        self.prices = {}            # Symbol -> letzter Kurs
+        self.values = {}            # Symbol -> {Merkmal: letzter Wert}
+        self.armed = set()          # einmal geprüfte Regel-IDs
+
+    @property
+    def after(self):
+        """Ab welchem Tag Kurse gebraucht werden (None: ganze Historie)"""
+        return self.state_date
+
+    def load(self, plan):
+        """Neuen Plan übernehmen; kommen Instrumente oder Indikatoren dazu,
+        werden alle Indikatoren beim nächsten update neu aufgewärmt"""
+        for symbol, keys in plan.indicators.items():
+            if not keys <= self.indicators.get(symbol, {}).keys() or symbol not in self.prices:
+                self.indicators, self.prices, self.state_date = {}, {}, None
+                break
+        self.plan = plan
+        self.armed &= plan.rules.keys()
+
+    def update(self, dates, prices, symbols):
+        """Neue Kurszeilen (älteste zuerst, Spalten = symbols) einarbeiten;
+        liefert die ausgelösten Alarme"""
+        for symbol, keys in self.plan.indicators.items():
+            state = self.indicators.setdefault(symbol, {})
+            for key in keys - state.keys():
+                state[key] = make_indicator(key)
+
+        columns = [(n, symbol) for n, symbol in enumerate(symbols) if symbol in self.plan.features]
+        alerts = []
+        last = len(dates) - 1
+        for row, day in enumerate(dates):
+            if self.state_date is not None and day <= self.state_date:
+                continue
+            for n, symbol in columns:
+                price = float(prices[row, n])
+                self.prices[symbol] = price
+                for indicator in self.indicators[symbol].values():
+                    indicator.update(price)
+            self.state_date = day
+
+            # Aufwärmen: nichts auslösen, beim allerersten Mal nur der letzte Tag als Basis
+            if self.date is not None and day <= self.date:
+                continue
+            if self.date is None and row < last:
+                continue
+            for _, symbol in columns:
+                alerts.extend(self._evaluate(symbol, day, first=self.date is None))
+            self.date = day
+
+        alerts.extend(self._check_new())
+        return alerts
+
+    def current(self, symbol):
+        """Aktuelle Werte aller Operanden eines Instruments"""
+        values = {'price': self.prices.get(symbol)}
+        for key, indicator in self.indicators.get(symbol, {}).items():
+            if key.startswith('levels'):
+                period = key[6:]
+                values['support' + period] = indicator.support
+                values['resistance' + period] = indicator.resistance
+            else:
+                values[key] = indicator.value
+        return values
+
+    def _evaluate(self, symbol, day, first=False):
+        values = self.current(symbol)
+        previous = self.values.setdefault(symbol, {})
+        alerts = []
+        for feature, indexes in self.plan.features[symbol].items():
+            new = feature_value(feature, values)
+            old = previous.get(feature)
+            if new is None:
+                continue
+            previous[feature] = new
+            if old is None or first:
+                continue
+            for index in indexes:
+                for rule_id, _ in index.crossed(old, new):
+                    alerts.append(self._alert(rule_id, feature, new, day))
+        return alerts
+
+    def _check_new(self):
+        """Regeln, die noch nie geprüft wurden, gegen den aktuellen Stand"""
+        if len(self.armed) == len(self.plan.rules) or self.date is None:
+            return []
+        alerts = []
+        current = {}
+        for rule_id, rule in self.plan.rules.items():
+            if rule_id in self.armed:
+                continue
+            if rule.symbol not in current:
+                current[rule.symbol] = self.current(rule.symbol)
+            values = self.values.setdefault(rule.symbol, {})
+            for trigger in rule.triggers:
+                if values.get(trigger.feature) is None:
+                    # Neues Merkmal: aktueller Wert ist die Basis für den nächsten Tag
+                    value = feature_value(trigger.feature, current[rule.symbol])
+                    if value is not None:
+                        values[trigger.feature] = value
+            if any(values.get(t.feature) is None for t in rule.triggers):
+                continue    # Indikator noch nicht aufgewärmt
+            self.armed.add(rule_id)
+            for trigger in rule.triggers:
+                value = values[trigger.feature]
+                if not trigger.cross and holds(trigger.op, value, trigger.threshold):
+                    alerts.append(self._alert(rule_id, trigger.feature, value, self.date))
+        return alerts
+
+    def _alert(self, rule_id, feature, value, day):
+        self.armed.add(rule_id)
+        rule = self.plan.rules[rule_id]
+        return {'rule': rule_id, 'symbol': rule.symbol, 'condition': rule.condition,
+                'feature': feature, 'value': round(value, 6), 'date': day}
+
+    def export(self):
+        """Zustand für den Checkpoint im Cache (JSON-fähig)"""
+        return {
+            'date': self.date,
+            'state_date': self.state_date,
+            'prices': dict(self.prices),
+            'values': {s: dict(v) for s, v in self.values.items()},
+            'armed': sorted(self.armed),
+            'indicators': {s: {k: i.to_dict() for k, i in state.items()}
+                           for s, state in self.indicators.items()},
+        }
+
+    def restore(self, state):
+        self.date = state['date']
+        self.state_date = state['state_date']
+        self.prices = dict(state['prices'])
+        self.values = {s: dict(v) for s, v in state['values'].items()}
+        self.armed = set(state['armed']) & self.plan.rules.keys()
+        self.indicators = {s: {k: load_indicator(k, i) for k, i in keys.items()}
+                           for s, keys in state['indicators'].items()}
+        # Fehlen Indikatoren für den aktuellen Plan, wird neu aufgewärmt
+        self.load(self.plan)
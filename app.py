@@ -1,193 +1,306 @@
-from flask import Flask, jsonify
+import time
+STARTED = time.perf_counter()   # Beginn des Imports, für startup_seconds in /metrics
+
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 from datetime import datetime, timedelta
-import requests
-import xml.etree.ElementTree as ET
+import atexit
+import gzip
+import hashlib
+import hmac
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+
+try:
+    import brotli
+except ImportError:  # optional - ohne brotli wird nur gzip angeboten
+    brotli = None
+
+import alerts
+import econ_calendar
+import feeds
+import indicators
+import instruments
+import metrics
+import news
+import risk
+import setups
+import state_snapshot
+from cache_backend import LRUCache, make_cache
+from history import RateHistory
+from rate_store import RateStore
+from refresh import RefreshScheduler
+from stream import UpdateStream
+from upstream import UpstreamClient
 
 app = Flask(__name__)
 CORS(app)
 
-news_cache = {'data': None, 'timestamp': None}
-calendar_cache = {'data': None, 'timestamp': None}
-analysis_cache = {'data': None, 'timestamp': None}
+# Caches 'analysis', 'news' und 'calendar' - pro Prozess oder (CACHE_BACKEND=sqlite)
+# gemeinsam für alle gunicorn-Worker
+cache = make_cache()
+
+# Frankfurter API (EZB-Daten): ein gepoolter Client mit Retries und Circuit
+# Breaker; FRANKFURTER_URL zeigt z.B. auf stub_frankfurter.py
+frankfurter = UpstreamClient(os.environ.get('FRANKFURTER_URL', 'https://api.frankfurter.app'),
+                             timeout=10, retries=2, backoff=0.5)
+
+# Gesamtbudget für alle Upstream-Aufrufe eines Refreshs (Sekunden)
+REFRESH_DEADLINE = 20
+
+# Analyse pro Paar (Bars, Indikatoren, Text) parallel in einem begrenzten Pool.
+# Paare, die bis zum Ende von REFRESH_DEADLINE nicht fertig sind, kommen aus
+# dem letzten guten Stand (stale); hängt ein Paar noch vom letzten Refresh,
+# wird es nicht erneut gestartet
+analysis_pool = ThreadPoolExecutor(max_workers=int(os.environ.get('ANALYSIS_WORKERS', '8')),
+                                   thread_name_prefix='analysis')
+analysis_running = {}       # Symbol -> Future
+
+# Eine gemeinsame Kursmatrix (USD-Basis) für alle Paare und Intervalle. Sie
+# reicht weiter zurück als die Analyse (ANALYSIS_DAYS), damit /api/indicators
+# auch lange Perioden wie EMA 200 rechnen kann
+# Kurse liegen zusätzlich spaltenweise auf der Platte (RATE_STORE): ein Neustart
+# lädt das Fenster von dort, `python rate_store.py --backfill` holt alles seit 1999
+rate_store = RateStore()
+# Upstream fragt pro Intervall nur der Worker mit der Lease 'history' (sie läuft
+# nach max_age ab und wird nicht freigegeben), die anderen lesen den RateStore
+rate_history = RateHistory(frankfurter, days=400, max_age=60, store=rate_store,
+                           lease=lambda: cache.acquire('history', scheduler.owner, 60))
+ANALYSIS_DAYS = 100
+
+# Ergebnisse von /api/indicators: (Paar, Indikator, Parameter, Datenstand) -> Wert
+indicator_memo = LRUCache(maxsize=4096)
+
+# Laufende Indikatoren (EMA/RSI/Support/Resistance) pro Paar und der
+# letzte eingerechnete Tag
+indicator_state = {'date': None, 'pairs': {}}
+
+# Rollierende Korrelation/Volatilität für /api/correlation:
+# (Paare, Fenster) -> {'date', 'version', 'risk'}, neue Tage inkrementell
+risk_state = LRUCache(maxsize=64)
+risk_lock = threading.Lock()
+
+# Caches werden im Hintergrund vor Ablauf neu berechnet
+scheduler = RefreshScheduler(cache)
+
+# Push-Updates per Server-Sent Events, sobald ein Cache eine neue Generation hat.
+# Der Stream ist öffentlich, Alarme gehören Nutzern: die gibt es nur über /api/alerts.
+# Jede Verbindung belegt einen gthread-Thread: höchstens MAX_STREAMS gleichzeitig
+update_stream = UpdateStream(cache, {'analysis': 'rates', 'news': 'news', 'calendar': 'calendar'},
+                             max_clients=int(os.environ.get('MAX_STREAMS', '50')))
+
+# Fertig serialisierte Antworten pro Cache: name -> ((generation, stale), encoded)
+encoded_responses = {}
+first_responses = {}
+
+# Aktive Paare aus der Instrument-Registry (Umgebungsvariable INSTRUMENTS)
+INSTRUMENTS = instruments.active()
+
+# Kursquellen: EZB-Tageskurse und - mit TICK_FEED - echte H1/H4/D1 Bars aus Ticks
+daily_feed = feeds.DailyFeed(rate_history)
+intraday_feed = feeds.from_env([i.symbol for i in INSTRUMENTS])
+
+# News-Feeds (kommagetrennte URLs oder Dateipfade); liest pro Refresh nur Neues
+news_pipeline = news.NewsPipeline([f.strip() for f in os.getenv('NEWS_FEEDS', '').split(',') if f.strip()])
+
+# Wirtschaftskalender aus CALENDAR_FILES (ICS/JSON/CSV), sonst die Standardwoche
+econ_calendar_store = econ_calendar.from_env()
+
+# Alarm-Regeln: die Regeln liegen im Cache ('alert_rules'), ausgelöste Alarme
+# in 'alerts' (seq -> Alarm), der Zustand der Auswertung in 'alert_state'
+alert_engine = alerts.AlertEngine()
+alert_conditions = {}       # Bedingung -> Trigger, geteilt von allen Regeln
+alert_versions = {'rules': None, 'state': None}
+alert_lock = threading.Lock()
+MAX_ALERT_RULES = 50000
+ALERT_HISTORY = 500
+
+# Zugang zu den Regeln: ALERT_TOKENS="name:token,..." - jede Regel gehört dem
+# Namen, mit dessen Token sie angelegt wurde. Ohne Tokens keine Regel-Endpoints
+ALERT_TOKENS = {}           # Token -> Name
+for entry in os.getenv('ALERT_TOKENS', '').split(','):
+    name, _, token = entry.strip().partition(':')
+    if name and token:
+        ALERT_TOKENS[token] = name
+snapshot_pending = threading.Event()
 
 def calculate_ema(prices, period):
-    """Berechnet Exponential Moving Average - Pure Python"""
+    """Berechnet Exponential Moving Average - Wrapper um die Indikator-Engine"""
     if len(prices) < period:
         return None
-    
-    multiplier = 2 / (period + 1)
-    
-    # Start with SMA
-    sma = sum(prices[:period]) / period
-    ema = sma
-    
-    # Calculate EMA
-    for price in prices[period:]:
-        ema = (price - ema) * multiplier + ema
-    
-    return ema
+
+    return float(indicators.ema(prices, period)[-1, 0])
 
 def calculate_rsi(prices, period=14):
-    """Berechnet RSI - Pure Python"""
+    """Berechnet RSI - Wrapper um die Indikator-Engine"""
     if len(prices) < period + 1:
         return None
-    
-    gains = []
-    losses = []
-    
-    for i in range(1, len(prices)):
-        change = prices[i] - prices[i-1]
-        if change > 0:
-            gains.append(change)
-            losses.append(0)
-        else:
-            gains.append(0)
-            losses.append(abs(change))
-    
-    if len(gains) < period:
+
+    return rsi_value(indicators.rsi(prices, period)[-1, 0])
+
+def rsi_value(rsi):
+    """RSI wie im Dashboard: 100 ohne Verluste, sonst auf eine Stelle gerundet"""
+    if rsi is None:
         return None
-    
-    avg_gain = sum(gains[-period:]) / period
-    avg_loss = sum(losses[-period:]) / period
-    
-    if avg_loss == 0:
+    if rsi == 100:
         return 100
-    
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-    
-    return round(rsi, 1)
+    return round(float(rsi), 1)
 
 def find_support_resistance(prices, window=20):
-    """Findet Support und Resistance - Pure Python"""
+    """Findet Support und Resistance - Wrapper um die Indikator-Engine"""
     if len(prices) < window:
         return None, None
-    
-    recent_prices = prices[-window:]
-    
-    support = min(recent_prices)
-    resistance = max(recent_prices)
-    
-    return support, resistance
+
+    support, resistance = indicators.support_resistance(prices, window)
+    return float(support[-1, 0]), float(resistance[-1, 0])
 
 def get_current_forex_rate(pair):
     """Holt ECHTE LIVE Forex-Kurse von Frankfurter API (100% kostenlos, keine Limits)"""
     try:
-        # Frankfurter API - basiert auf EZB-Daten, kostenlos, zuverlässig
-        url = 'https://api.frankfurter.app/latest?from=USD'
-        
-        response = requests.get(url, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            rates = data.get('rates', {})
-            
-            # Berechne Forex-Kurse
-            if pair == 'EURUSD':
-                # USD -> EUR invertieren für EUR/USD
-                eur_rate = rates.get('EUR')
-                if eur_rate:
-                    return 1 / eur_rate
-            
-            elif pair == 'GBPUSD':
-                # USD -> GBP invertieren für GBP/USD
-                gbp_rate = rates.get('GBP')
-                if gbp_rate:
-                    return 1 / gbp_rate
-            
-            elif pair == 'USDJPY':
-                # USD -> JPY direkt
-                jpy_rate = rates.get('JPY')
-                if jpy_rate:
-                    return jpy_rate
-        
+        # Frankfurter API - basiert auf EZB-Daten, kommt aus der gemeinsamen Kursmatrix
+        rate_history.ensure_fresh()
+        instrument = instruments.get(pair)
+        if instrument:
+            return instrument.price(rate_history.latest())
+
     except Exception as e:
         print(f"Frankfurter API error for {pair}: {e}")
-    
+
     return None
 
 def get_historical_data(pair_symbol, interval='1h', limit=100):
-    """Holt ECHTE historische Forex-Daten von Frankfurter API"""
+    """Liefert ECHTE historische Forex-Daten: Bars im gewünschten Intervall aus
+    dem Tick-Feed, sonst die EZB-Tageskurse aus der gemeinsamen Kursmatrix"""
     try:
-        # Frankfurter hat historische Daten für die letzten 90 Tage
-        from datetime import timedelta
-        
-        # Berechne Datumsbereich (letzte 100 Tage für genug Daten)
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=100)
-        
-        url = f'https://api.frankfurter.app/{start_date.strftime("%Y-%m-%d")}..{end_date.strftime("%Y-%m-%d")}'
-        params = {'from': 'USD'}
-        
-        response = requests.get(url, params=params, timeout=15)
-        
-        if response.status_code == 200:
-            data = response.json()
-            rates_data = data.get('rates', {})
-            
-            prices = []
-            
-            # Sortiere Daten nach Datum
-            sorted_dates = sorted(rates_data.keys())
-            
-            for date in sorted_dates:
-                day_rates = rates_data[date]
-                
-                if pair_symbol == 'EURUSD':
-                    eur_rate = day_rates.get('EUR')
-                    if eur_rate:
-                        prices.append(1 / eur_rate)
-                
-                elif pair_symbol == 'GBPUSD':
-                    gbp_rate = day_rates.get('GBP')
-                    if gbp_rate:
-                        prices.append(1 / gbp_rate)
-                
-                elif pair_symbol == 'USDJPY':
-                    jpy_rate = day_rates.get('JPY')
-                    if jpy_rate:
-                        prices.append(jpy_rate)
-            
-            # Nimm die letzten 'limit' Preise
-            if len(prices) >= 20:  # Minimum für Analyse
-                return prices[-limit:] if len(prices) > limit else prices
-    
+        if not instruments.get(pair_symbol):
+            return None
+
+        prices = None
+        if intraday_feed and interval in feeds.TIMEFRAMES:
+            prices = intraday_feed.closes(pair_symbol.upper(), interval, limit)
+        if not prices or len(prices) < 20:
+            # Lädt höchstens einmal pro Refresh - alle weiteren Aufrufe lesen nur
+            prices = daily_feed.closes(pair_symbol, interval, limit)
+
+        if len(prices) >= 20:  # Minimum für Analyse
+            return prices
+
     except Exception as e:
         print(f"Frankfurter historical data error for {pair_symbol}: {e}")
-    
+
     return None
 
-def analyze_pair(pair_name, pair_symbol):
-    """Führt komplette technische Analyse für ein Paar durch"""
+def get_price_matrix(pair_symbols, limit=100, after=None, with_dates=False):
+    """Kursmatrix (Tage x Paare) aller Paare aus der gemeinsamen Kursmatrix"""
+    rate_history.ensure_fresh()
+
+    selected = [instruments.get(s) for s in pair_symbols]
+    currencies = instruments.currencies(selected)
+    dates, rates = rate_history.matrix(currencies, limit, after=after, with_dates=True)
+
+    matrix = instruments.price_matrix(rates, currencies, selected)
+    return (dates, matrix) if with_dates else matrix
+
+def get_pair_prices(pair_symbols):
+    """Kursreihen der Paare, jede nur über die Tage, an denen ihre eigenen
+    beiden Währungen notiert sind - so hängt das Ergebnis eines Paares nicht
+    davon ab, welche Paare mit angefragt werden (die gemeinsame Matrix lässt
+    jeden Tag aus, an dem irgendeine Währung fehlt).
+
+    Liefert [(Indizes in pair_symbols, Matrix Tage x Paare)]: ohne Lücken
+    eine einzige Matrix für alle, sonst eine pro Paar."""
+    rate_history.ensure_fresh()
+    columns = rate_history.rates
+    needed = instruments.currencies([instruments.get(s) for s in pair_symbols])
+    if all(None not in columns.get(c, [None]) for c in needed):
+        return [(list(range(len(pair_symbols))), get_price_matrix(pair_symbols, None))]
+    return [([n], get_price_matrix([symbol], None)) for n, symbol in enumerate(pair_symbols)]
+
+def update_indicator_state(pair_symbols):
+    """Schreibt die laufenden Indikatoren mit den neuen Tageskursen fort.
+
+    Beim ersten Aufruf wird der Zustand aus dem Checkpoint im Cache geladen
+    oder über das 100-Tage-Fenster aufgebaut; danach kostet jeder neue Kurs
+    konstanten Aufwand, egal wie lang die Historie ist."""
+    if indicator_state['pairs'].keys() != set(pair_symbols):
+        checkpoint = cache.get('indicator_state')
+        if checkpoint and set(checkpoint['data']['pairs']) == set(pair_symbols):
+            indicator_state['date'] = checkpoint['data']['date']
+            indicator_state['pairs'] = {
+                symbol: indicators.IndicatorSet.from_dict(state)
+                for symbol, state in checkpoint['data']['pairs'].items()
+            }
+        else:
+            indicator_state['date'] = None
+            indicator_state['pairs'] = {
+                symbol: indicators.IndicatorSet(ema_period=50, rsi_period=14, sr_window=20)
+                for symbol in pair_symbols
+            }
+
+    after = indicator_state['date']
+    if after is None:
+        # Aufwärmen über das Analyse-Fenster (wie früher die 100-Tage-Abfrage)
+        after = (datetime.now().date() - timedelta(days=ANALYSIS_DAYS + 1)).isoformat()
+    dates, prices = get_price_matrix(pair_symbols, None, after=after, with_dates=True)
+    if not dates:
+        return
+
+    # Spaltenweise, damit die Laufzeit pro Paar gemessen werden kann
+    for column, symbol in enumerate(pair_symbols):
+        state = indicator_state['pairs'][symbol]
+        with metrics.STAGE_SECONDS.time(stage='indicators', instrument=symbol):
+            for price in prices[:, column].tolist():
+                state.update(price)
+    indicator_state['date'] = dates[-1]
+
+    # Checkpoint neben den gecachten Daten, übersteht Neustarts (SQLite-Backend)
+    cache.set('indicator_state', {
+        'date': indicator_state['date'],
+        'pairs': {symbol: state.to_dict() for symbol, state in indicator_state['pairs'].items()}
+    })
+
+TREND_TEXT = {'bull': 'Bullisch ↑', 'bear': 'Bearisch ↓', 'neutral': 'Seitwärts →'}
+SETUP_TEXT = {'long': 'Long Setup 👀', 'short': 'Short Setup 👀', 'wait': 'Abwarten ⏳'}
+
+def analyze_pair(pair_name, pair_symbol, levels=None):
+    """Führt komplette technische Analyse für ein Paar durch.
+
+    levels sind die bereits berechneten Indikatorwerte des Paares (siehe
+    IndicatorSet.latest); ohne levels werden die Daten einzeln geholt."""
     try:
-        # Hole H4 Daten für EMA
-        h4_data = get_historical_data(pair_symbol, '4h', 100)
-        # Hole H1 Daten für RSI und Support/Resistance
-        h1_data = get_historical_data(pair_symbol, '1h', 100)
-        
-        if not h4_data or not h1_data:
+        if levels is None:
+            # Hole H4 Daten für EMA
+            h4_data = get_historical_data(pair_symbol, '4h', 100)
+            # Hole H1 Daten für RSI und Support/Resistance
+            h1_data = get_historical_data(pair_symbol, '1h', 100)
+
+            if not h4_data or not h1_data:
+                return None
+
+            support, resistance = find_support_resistance(h1_data, 20)
+            levels = {
+                'price': h1_data[-1],
+                'ema': calculate_ema(h4_data, 50),
+                'rsi': calculate_rsi(h1_data, 14),
+                'support': support,
+                'resistance': resistance
+            }
+        elif levels['price'] is None:
             return None
-        
-        current_price = h1_data[-1]
-        
-        # Berechne 50 EMA auf H4
-        ema_50_h4 = calculate_ema(h4_data, 50)
+
+        current_price = levels['price']
+
+        # 50 EMA auf H4
+        ema_50_h4 = levels['ema']
         
         # Trend bestimmen
-        if ema_50_h4:
-            if current_price > ema_50_h4:
-                trend = 'bull'
-                trend_text = 'Bullisch ↑'
-            else:
-                trend = 'bear'
-                trend_text = 'Bearisch ↓'
-        else:
-            trend = 'neutral'
-            trend_text = 'Seitwärts →'
+        trend = setups.trend(current_price, ema_50_h4)
+        trend_text = TREND_TEXT[trend]
         
-        # Berechne RSI auf H1
-        rsi = calculate_rsi(h1_data, 14)
+        # RSI auf H1
+        rsi = rsi_value(levels['rsi'])
         
         # RSI Interpretation
         if rsi:
@@ -208,29 +321,17 @@ def analyze_pair(pair_name, pair_symbol):
             rsi_zone = 'N/A'
             rsi_color = 'warning'
         
-        # Finde Support und Resistance
-        support, resistance = find_support_resistance(h1_data, 20)
+        # Support und Resistance
+        support, resistance = levels['support'], levels['resistance']
         
-        # Format basierend auf Paar
-        if pair_symbol == 'USDJPY':
-            price_format = '.3f'
-            support_str = f"{support:.3f}" if support else "N/A"
-            resistance_str = f"{resistance:.3f}" if resistance else "N/A"
-        else:
-            price_format = '.5f'
-            support_str = f"{support:.5f}" if support else "N/A"
-            resistance_str = f"{resistance:.5f}" if resistance else "N/A"
+        # Format laut Instrument-Registry
+        instrument = instruments.get(pair_symbol)
+        support_str = instrument.format(support) if support else "N/A"
+        resistance_str = instrument.format(resistance) if resistance else "N/A"
         
-        # Setup Bestimmung
-        if trend == 'bull' and rsi and 30 < rsi < 60:
-            setup = 'long'
-            setup_text = 'Long Setup 👀'
-        elif trend == 'bear' and rsi and 40 < rsi < 70:
-            setup = 'short'
-            setup_text = 'Short Setup 👀'
-        else:
-            setup = 'wait'
-            setup_text = 'Abwarten ⏳'
+        # Setup Bestimmung (Regeln in setups.py, auch für den Backtest)
+        setup = setups.setup(trend, rsi)
+        setup_text = SETUP_TEXT[setup]
         
         # Tagesanalyse generieren
         analysis_parts = []
@@ -272,7 +373,7 @@ def analyze_pair(pair_name, pair_symbol):
             'setup': setup_text,
             'setup_badge': setup,
             'analysis': analysis_text,
-            'current_price': f"{current_price:{price_format}}"
+            'current_price': instrument.format(current_price)
         }
         
     except Exception as e:
@@ -286,74 +387,195 @@ def health():
         'timestamp': datetime.now().isoformat()
     })
 
+def encode_response(payload):
+    """JSON einmal serialisieren, dazu ETag (Inhalts-Hash) und komprimierte Varianten"""
+    body = (app.json.dumps(payload) + '\n').encode('utf-8')
+    encoded = {
+        'etag': hashlib.blake2b(body, digest_size=12).hexdigest(),
+        'identity': body,
+        'gzip': gzip.compress(body, compresslevel=6, mtime=0)
+    }
+    if brotli:
+        encoded['br'] = brotli.compress(body)
+    return encoded
+
+def send_encoded(encoded, age=None):
+    """Antwort aus vorserialisierten Bytes: 304 bei passendem If-None-Match,
+    sonst die passende Kompression laut Accept-Encoding. Jede Kompression ist
+    eine eigene Repräsentation mit eigenem ETag (Endung -gzip/-br)."""
+    encoding = next((e for e in ('br', 'gzip')
+                     if e in encoded and request.accept_encodings[e] > 0), 'identity')   # q=0 heißt "nicht"
+    etag = encoded['etag'] if encoding == 'identity' else f"{encoded['etag']}-{encoding}"
+    headers = {'ETag': f'"{etag}"', 'Vary': 'Accept-Encoding', 'Cache-Control': 'no-cache'}
+    if age is not None:
+        headers['Age'] = str(int(age))
+
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers=headers)
+
+    if encoding != 'identity':
+        headers['Content-Encoding'] = encoding
+    return Response(encoded[encoding], mimetype='application/json', headers=headers)
+
+def snapshot_response(name, **extra):
+    """Antwortet sofort mit dem letzten guten Stand eines Caches.
+
+    Der Body wird pro Cache-Generation nur einmal serialisiert und
+    komprimiert; das Alter steht im Age-Header."""
+    snapshot = scheduler.snapshot(name)
+
+    if snapshot['data'] is None:
+        return jsonify({
+            'success': False,
+            'error': 'Daten werden geladen'
+        }), 503
+
+    key = (snapshot['generation'], snapshot['stale'])
+    if name not in first_responses:
+        # Zeit vom Start bis zur ersten Antwort mit Daten
+        first_responses[name] = time.perf_counter() - STARTED
+        metrics.STATE.set(first_responses[name], name=f'first_response_seconds_{name}')
+
+    memo = encoded_responses.get(name)
+    if not memo or memo[0] != key:
+        with metrics.SERIALIZE_SECONDS.time(cache=name):
+            encoded = encode_response({
+                'success': True,
+                'data': snapshot['data'],
+                'cached': True,
+                'stale': snapshot['stale'],
+                **extra,
+                'timestamp': snapshot['timestamp'].isoformat()
+            })
+        memo = (key, encoded)
+        encoded_responses[name] = memo
+
+    return send_encoded(memo[1], snapshot['age'])
+
+def analyze_instrument(instrument, levels, budget):
+    """Pipeline eines Paares im Analyse-Pool, mit dem Rest des Refresh-Budgets
+    für eventuelle Upstream-Aufrufe (die Deadline gilt pro Thread).
+
+    Liefert (analysis, stale): analysis ist None, wenn keine Analyse möglich
+    war; stale, ob sie auf dem letzten guten Kursstand beruht."""
+    with frankfurter.deadline(budget):
+        if intraday_feed and intraday_feed.has(instrument.symbol):
+            # Echte H4/H1 Bars - analyze_pair holt sie über get_historical_data
+            levels = None
+        stale = rate_history.stale
+        with metrics.STAGE_SECONDS.time(stage='analysis', instrument=instrument.symbol):
+            analysis = analyze_pair(instrument.name, instrument.symbol, levels)
+        return analysis, stale or rate_history.stale
+
+# Platzhalter, solange für ein Paar noch keine Analyse vorliegt
+PENDING_RATES = {
+    'price': '—',
+    'change': '0.00',
+    'direction': 'neutral',
+    'trend': 'Daten laden...',
+    'rsi': 50,
+    'rsi_zone': 'N/A',
+    'rsi_color': 'warning',
+    'support': 'N/A',
+    'resistance': 'N/A',
+    'setup': 'Prüfe Chart',
+    'setup_badge': 'wait',
+    'analysis': 'Technische Daten werden geladen...'
+}
+
+def build_rates():
+    """Führt die Analyse für alle Paare durch (läuft im Hintergrund)"""
+    deadline = time.monotonic() + REFRESH_DEADLINE
+    rates_data = {}
+    analyzed = 0
+
+    # Indikatoren aller Paare mit den neuen Tageskursen fortschreiben
+    symbols = [instrument.symbol for instrument in INSTRUMENTS]
+    with frankfurter.deadline(REFRESH_DEADLINE):
+        update_indicator_state(symbols)
+    try:
+        with metrics.STAGE_SECONDS.time(stage='alerts', instrument='all'):
+            update_alerts()
+    except Exception as e:
+        # Alarme dürfen die Analyse nicht aufhalten
+        print(f"Alert evaluation error: {e}")
+    if indicator_state['pairs'][symbols[0]].levels.count >= 20:  # Minimum für Analyse
+        all_levels = [indicator_state['pairs'][symbol].latest() for symbol in symbols]
+    else:
+        all_levels = [{'price': None}] * len(symbols)
+
+    if intraday_feed:
+        # Neue Ticks seit dem letzten Refresh in die Bars einarbeiten
+        with metrics.STAGE_SECONDS.time(stage='ticks', instrument='all'):
+            intraday_feed.poll()
+
+    futures = {}
+    for instrument, levels in zip(INSTRUMENTS, all_levels):
+        running = analysis_running.get(instrument.symbol)
+        if running and not running.done():
+            continue
+        futures[instrument.symbol] = analysis_running[instrument.symbol] = analysis_pool.submit(
+            analyze_instrument, instrument, levels, max(0.0, deadline - time.monotonic()))
+    # Gesamtzeit richtet sich nach dem langsamsten Paar, höchstens bis zur Deadline
+    wait(futures.values(), timeout=max(0.0, deadline - time.monotonic()))
+
+    previous = cache.get('analysis')
+    last_good = previous['data'] if previous else {}
+
+    for instrument in INSTRUMENTS:
+        pair_key = instrument.key
+        future = futures.get(instrument.symbol)
+        analysis, stale = None, False
+        if future is None:
+            reason = 'busy'
+        elif not future.done():
+            future.cancel()
+            reason = 'late'
+        else:
+            try:
+                analysis, stale = future.result()
+            except Exception as e:
+                print(f"Error analyzing {instrument.name}: {e}")
+            reason = 'error'
+
+        if analysis:
+            analyzed += 1
+            rates_data[pair_key] = {
+                'price': analysis['current_price'],
+                'change': '0.00',
+                'direction': 'neutral',
+                'trend': analysis['trend'],
+                'rsi': analysis['rsi'],
+                'rsi_zone': analysis['rsi_zone'],
+                'rsi_color': analysis['rsi_color'],
+                'support': analysis['support'],
+                'resistance': analysis['resistance'],
+                'setup': analysis['setup'],
+                'setup_badge': analysis['setup_badge'],
+                'analysis': analysis['analysis'],
+                # Upstream nicht erreichbar - Analyse auf dem letzten guten Stand
+                'stale': stale
+            }
+        elif last_good.get(pair_key, PENDING_RATES) != PENDING_RATES:
+            # Zu spät oder fehlgeschlagen: letzte echte Analyse, als veraltet markiert
+            metrics.ANALYSIS_FALLBACKS.inc(instrument=instrument.symbol, reason=reason)
+            rates_data[pair_key] = dict(last_good[pair_key], stale=True)
+        else:
+            # Fallback
+            rates_data[pair_key] = dict(PENDING_RATES)
+
+    if not analyzed and previous:
+        # Upstream komplett ausgefallen - letzten guten Stand behalten
+        raise RuntimeError('Keine Analyse möglich')
+
+    return rates_data
+
 @app.route('/api/rates', methods=['GET'])
 def get_rates():
     """Holt Forex-Kurse mit echter technischer Analyse"""
     try:
-        # Check cache (5 Min)
-        if analysis_cache['data'] and analysis_cache['timestamp']:
-            if (datetime.now() - analysis_cache['timestamp']).seconds < 300:
-                return jsonify({
-                    'success': True,
-                    'data': analysis_cache['data'],
-                    'cached': True,
-                    'timestamp': analysis_cache['timestamp'].isoformat()
-                })
-        
-        # Führe Analyse für alle 3 Paare durch
-        pairs = {
-            'eurusd': ('EUR/USD', 'EURUSD'),
-            'gbpusd': ('GBP/USD', 'GBPUSD'),
-            'usdjpy': ('USD/JPY', 'USDJPY')
-        }
-        
-        rates_data = {}
-        
-        for pair_key, (pair_name, pair_symbol) in pairs.items():
-            analysis = analyze_pair(pair_name, pair_symbol)
-            
-            if analysis:
-                rates_data[pair_key] = {
-                    'price': analysis['current_price'],
-                    'change': '0.00',
-                    'direction': 'neutral',
-                    'trend': analysis['trend'],
-                    'rsi': analysis['rsi'],
-                    'rsi_zone': analysis['rsi_zone'],
-                    'rsi_color': analysis['rsi_color'],
-                    'support': analysis['support'],
-                    'resistance': analysis['resistance'],
-                    'setup': analysis['setup'],
-                    'setup_badge': analysis['setup_badge'],
-                    'analysis': analysis['analysis']
-                }
-            else:
-                # Fallback
-                rates_data[pair_key] = {
-                    'price': '—',
-                    'change': '0.00',
-                    'direction': 'neutral',
-                    'trend': 'Daten laden...',
-                    'rsi': 50,
-                    'rsi_zone': 'N/A',
-                    'rsi_color': 'warning',
-                    'support': 'N/A',
-                    'resistance': 'N/A',
-                    'setup': 'Prüfe Chart',
-                    'setup_badge': 'wait',
-                    'analysis': 'Technische Daten werden geladen...'
-                }
-        
-        analysis_cache['data'] = rates_data
-        analysis_cache['timestamp'] = datetime.now()
-        
-        return jsonify({
-            'success': True,
-            'data': rates_data,
-            'source': 'live-analysis',
-            'timestamp': datetime.now().isoformat()
-        })
-        
+        return snapshot_response('analysis', source='live-analysis')
+
     except Exception as e:
         print(f"Error in rates: {e}")
         return jsonify({
@@ -361,170 +583,574 @@ def get_rates():
             'error': str(e)
         }), 500
 
-@app.route('/api/news', methods=['GET'])
-def get_news():
-    """Holt Forex-News - ohne feedparser"""
+def select_instruments(pairs):
+    """Instrumente aus ?pairs= (sonst die aktiven). ValueError, wenn ein Paar
+    ungültig ist oder eine Währung fehlt, die die Kursmatrix nicht kennt - ein
+    solches Paar würde die gemeinsame Matrix leeren"""
+    if not pairs:
+        return INSTRUMENTS
+    available = rate_history.latest().keys()
+    selected, unknown = [], []
+    for symbol in (s.strip() for s in pairs.split(',')):
+        if not symbol:
+            continue
+        instrument = instruments.get(symbol)
+        # Ohne geladene Kurse (Upstream aus) lässt sich nichts prüfen
+        if instrument and (not available or instruments.supported(instrument, available)):
+            selected.append(instrument)
+        else:
+            unknown.append(symbol)
+    if unknown:
+        raise ValueError(f"Unbekannte Paare: {', '.join(unknown)}")
+    if not selected:
+        raise ValueError('Keine gültigen Paare')
+    return selected
+
+INDICATOR_PARAMS = ('ema', 'rsi', 'sr')
+_MISSING = object()
+
+def parse_periods(value, default):
+    """'20,50,200' -> [20, 50, 200]; nur positive Perioden bis 1000"""
+    if value is None:
+        return default
+    periods = sorted({int(p) for p in value.split(',') if p.strip()})
+    if any(p < 1 or p > 1000 for p in periods):
+        raise ValueError(f'Ungültige Periode: {value}')
+    return periods
+
+def compute_indicator(indicator, period, prices):
+    """Letzte Werte eines Indikators für alle Spalten der Kursmatrix"""
+    if indicator == 'ema':
+        return [indicators.to_float(v) for v in indicators.ema(prices, period)[-1]]
+    if indicator == 'rsi':
+        return [rsi_value(indicators.to_float(v)) for v in indicators.rsi(prices, period)[-1]]
+    support, resistance = indicators.support_resistance(prices, period)
+    return [{'support': indicators.to_float(s), 'resistance': indicators.to_float(r)}
+            for s, r in zip(support[-1], resistance[-1])]
+
+@app.route('/api/indicators', methods=['GET'])
+def get_indicators():
+    """Mehrere Paare und Indikator-Parameter in einem Aufruf, z.B.
+    /api/indicators?pairs=EURUSD,GBPJPY&ema=20,50,200&rsi=14&sr=20"""
     try:
-        if news_cache['data'] and news_cache['timestamp']:
-            if (datetime.now() - news_cache['timestamp']).seconds < 300:
-                return jsonify({
-                    'success': True,
-                    'data': news_cache['data'],
-                    'cached': True,
-                    'timestamp': news_cache['timestamp'].isoformat()
-                })
-        
-        # Verwende direkt Fallback-News (funktioniert immer)
-        now = datetime.now().strftime('%H:%M')
-        all_news = [
-            {'time': f'{now}', 'headline': 'EUR/USD stabil - EZB im Fokus', 'url': 'https://de.investing.com/currencies/eur-usd', 'text': 'eur usd ezb'},
-            {'time': 'Vor 1 Std', 'headline': 'Dollar schwächer nach US-Daten', 'url': 'https://de.investing.com/currencies/eur-usd', 'text': 'dollar usd'},
-            {'time': 'Vor 2 Std', 'headline': 'Eurozone Wirtschaft zeigt Stärke', 'url': 'https://de.investing.com/currencies/eur-usd', 'text': 'eurozone euro'},
-            {'time': f'{now}', 'headline': 'GBP/USD steigt - BoE hawkish', 'url': 'https://de.investing.com/currencies/gbp-usd', 'text': 'gbp usd pound boe'},
-            {'time': 'Vor 1 Std', 'headline': 'UK Inflation besser als erwartet', 'url': 'https://de.investing.com/currencies/gbp-usd', 'text': 'uk pound inflation'},
-            {'time': 'Vor 3 Std', 'headline': 'Britisches Pfund profitiert', 'url': 'https://de.investing.com/currencies/gbp-usd', 'text': 'uk britain gbp'},
-            {'time': f'{now}', 'headline': 'USD/JPY volatil - BoJ Intervention droht', 'url': 'https://de.investing.com/currencies/usd-jpy', 'text': 'usd jpy yen boj'},
-            {'time': 'Vor 1 Std', 'headline': 'Yen gewinnt an Stärke', 'url': 'https://de.investing.com/currencies/usd-jpy', 'text': 'yen japan'},
-            {'time': 'Vor 2 Std', 'headline': 'Japan Inflation weiter hoch', 'url': 'https://de.investing.com/currencies/usd-jpy', 'text': 'japan inflation jpy'},
-        ]
-        
-        news_data = {'eurusd': [], 'gbpusd': [], 'usdjpy': []}
-        
-        eur_keywords = ['eur', 'euro', 'eurozone', 'ecb', 'ezb']
-        gbp_keywords = ['gbp', 'pound', 'sterling', 'uk', 'britain', 'boe']
-        jpy_keywords = ['jpy', 'yen', 'japan', 'boj']
-        
-        for item in all_news:
-            text = item['text']
-            assigned = False
-            
-            if any(kw in text for kw in eur_keywords) and len(news_data['eurusd']) < 3:
-                news_data['eurusd'].append({'time': item['time'], 'headline': item['headline'], 'url': item['url']})
-                assigned = True
-            
-            if not assigned and any(kw in text for kw in gbp_keywords) and len(news_data['gbpusd']) < 3:
-                news_data['gbpusd'].append({'time': item['time'], 'headline': item['headline'], 'url': item['url']})
-                assigned = True
-            
-            if not assigned and any(kw in text for kw in jpy_keywords) and len(news_data['usdjpy']) < 3:
-                news_data['usdjpy'].append({'time': item['time'], 'headline': item['headline'], 'url': item['url']})
-                assigned = True
-        
-        # Fülle auf
-        generic = [n for n in all_news if 'forex' in n['text'] or 'dollar' in n['text'] or 'währung' in n['text']]
-        for pair in ['eurusd', 'gbpusd', 'usdjpy']:
-            idx = 0
-            while len(news_data[pair]) < 3 and idx < len(generic):
-                if generic[idx] not in [n for sublist in news_data.values() for n in sublist]:
-                    news_data[pair].append({'time': generic[idx]['time'], 'headline': generic[idx]['headline'], 'url': generic[idx]['url']})
-                idx += 1
-        
-        fallback_urls = {
-            'eurusd': 'https://de.investing.com/currencies/eur-usd',
-            'gbpusd': 'https://de.investing.com/currencies/gbp-usd',
-            'usdjpy': 'https://de.investing.com/currencies/usd-jpy'
-        }
-        
-        for pair in ['eurusd', 'gbpusd', 'usdjpy']:
-            while len(news_data[pair]) < 3:
-                news_data[pair].append({
-                    'time': 'Heute',
-                    'headline': f'{pair.upper()} - Aktuelle Analyse',
-                    'url': fallback_urls[pair]
-                })
-        
-        news_cache['data'] = news_data
-        news_cache['timestamp'] = datetime.now()
-        
+        with frankfurter.deadline(REFRESH_DEADLINE):
+            rate_history.ensure_fresh()
+
+        try:
+            selected = select_instruments(request.args.get('pairs'))
+            params = {
+                'ema': parse_periods(request.args.get('ema'), [50]),
+                'rsi': parse_periods(request.args.get('rsi'), [14]),
+                'sr': parse_periods(request.args.get('sr'), [20]),
+            }
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+
+        version = rate_history.version
+        symbols = [i.symbol for i in selected]
+
+        results = {i.key: {'price': None, 'ema': {}, 'rsi': {}, 'sr': {}} for i in selected}
+        groups = None
+
+        for indicator in INDICATOR_PARAMS:
+            for period in params[indicator]:
+                values = [indicator_memo.get((s, indicator, period, version), _MISSING) for s in symbols]
+
+                if _MISSING in values:
+                    # Alle fehlenden Paare einer Gruppe in einem Durchlauf über ihre Kursmatrix
+                    if groups is None:
+                        groups = get_pair_prices(symbols)
+                    for columns, prices in groups:
+                        missing = [k for k, n in enumerate(columns) if values[n] is _MISSING]
+                        if not missing:
+                            continue
+                        computed = compute_indicator(indicator, period, prices[:, missing])
+                        for k, value in zip(missing, computed):
+                            n = columns[k]
+                            indicator_memo.set((symbols[n], indicator, period, version), value)
+                            values[n] = value
+
+                for instrument, value in zip(selected, values):
+                    results[instrument.key][indicator][str(period)] = value
+
+        latest = rate_history.latest()
+        for instrument in selected:
+            results[instrument.key]['price'] = instrument.price(latest)
+
+        with metrics.SERIALIZE_SECONDS.time(cache='indicators'):
+            return jsonify({
+                'success': True,
+                'data': results,
+                'version': version,
+                'cache': indicator_memo.stats(),
+                'timestamp': datetime.now().isoformat()
+            })
+
+    except Exception as e:
+        print(f"Error in indicators: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def update_risk(symbols, window):
+    """Rollierende Summen für (Paare, Fenster) auf den aktuellen Datenstand bringen"""
+    key = (tuple(symbols), window)
+    with risk_lock:
+        state = risk_state.get(key)
+        if state is None:
+            state = {'date': None, 'version': None, 'risk': risk.RollingRisk(window, len(symbols))}
+            risk_state.set(key, state)
+
+        if state['version'] != rate_history.version:
+            # Nur die Tage nach dem letzten eingerechneten
+            dates, prices = get_price_matrix(symbols, None, after=state['date'], with_dates=True)
+            if dates:
+                state['risk'].extend(prices)
+                state['date'] = dates[-1]
+            state['version'] = rate_history.version
+        return state
+
+@app.route('/api/correlation', methods=['GET'])
+def get_correlation():
+    """Korrelationsmatrix, Volatilität und ATR-Spanne über rollierende Fenster, z.B.
+    /api/correlation?pairs=EURUSD,GBPUSD,USDJPY&windows=20,60 (pairs=all: jede Währung gegen USD)"""
+    try:
+        with frankfurter.deadline(REFRESH_DEADLINE):
+            rate_history.ensure_fresh()
+
+        pairs = request.args.get('pairs')
+        if pairs == 'all':
+            selected = [instruments.get(c + instruments.BASE_CURRENCY) for c in sorted(rate_history.latest())
+                        if c != instruments.BASE_CURRENCY]
+            if not selected:
+                return jsonify({'success': False, 'error': 'Keine gültigen Paare'}), 400
+        else:
+            try:
+                selected = select_instruments(pairs)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+        try:
+            windows = parse_periods(request.args.get('windows'), [20, 60])
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        if windows[0] < 2:
+            return jsonify({'success': False, 'error': 'Fenster ab 2 Tagen'}), 400
+
+        symbols = [i.symbol for i in selected]
+        data = {}
+        last_date = None
+        for window in windows:
+            with metrics.STAGE_SECONDS.time(stage='risk', instrument='all'):
+                state = update_risk(symbols, window)
+                rolling = state['risk']
+                last_date = state['date']
+                if not rolling.ready:
+                    data[str(window)] = None     # noch nicht genug Tage
+                    continue
+                correlation = risk.to_rows(rolling.correlation(), 4)
+                volatility = rolling.volatility()
+                atr = rolling.atr()
+                last = rolling.last
+
+            data[str(window)] = {
+                'correlation': correlation,
+                'volatility': {i.key: round(v * 100, 2) for i, v in zip(selected, volatility.tolist())},
+                'atr': {i.key: round(a, i.precision + 1) for i, a in zip(selected, atr.tolist())},
+                'atr_pct': {i.key: round(a / p * 100, 3) for i, a, p in zip(selected, atr.tolist(), last.tolist())},
+            }
+
+        with metrics.SERIALIZE_SECONDS.time(cache='correlation'):
+            return jsonify({
+                'success': True,
+                'pairs': [i.key for i in selected],
+                'data': data,
+                'date': last_date,
+                'version': rate_history.version,
+                'timestamp': datetime.now().isoformat()
+            })
+
+    except Exception as e:
+        print(f"Error in correlation: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def update_alerts():
+    """Alarm-Regeln mit den neuen Tageskursen auswerten und ausgelöste Alarme
+    an 'alerts' anhängen. Zwischen Workern wertet über die Lease immer nur
+    einer aus; wer zuletzt nicht dran war, übernimmt den Zustand aus dem Cache."""
+    with alert_lock:
+        if not cache.acquire('alerts', scheduler.owner, 60):
+            return []
+        try:
+            entry = cache.get('alert_rules')
+            generation = entry['generation'] if entry else 0
+            if alert_versions['rules'] != generation:
+                alert_engine.load(alerts.compile_rules(entry['data']['rules'] if entry else [], alert_conditions))
+                alert_versions['rules'] = generation
+            checkpoint = cache.get('alert_state')
+            if checkpoint and checkpoint['generation'] != alert_versions['state']:
+                alert_engine.restore(checkpoint['data'])
+                alert_versions['state'] = checkpoint['generation']
+
+            # Nur Paare, deren Währungen die Kursmatrix kennt - eine fehlende Spalte
+            # würde die gemeinsame Matrix und damit alle Alarme leeren
+            available = rate_history.latest().keys()
+            symbols = [s for s in alert_engine.plan.symbols
+                       if instruments.supported(instruments.get(s), available)]
+            if not symbols:
+                return []
+            armed = len(alert_engine.armed)
+            dates, prices = get_price_matrix(symbols, None, after=alert_engine.after, with_dates=True)
+            fired = alert_engine.update(dates, prices, symbols)
+            if dates or fired or len(alert_engine.armed) != armed:
+                alert_versions['state'] = cache.set('alert_state', alert_engine.export())
+
+            if fired:
+                log = cache.get('alerts')
+                history = dict(log['data']) if log else {}
+                seq = max(map(int, history), default=0)
+                now = datetime.now().isoformat()
+                for alert in fired:
+                    seq += 1
+                    history[str(seq)] = dict(alert, seq=seq, time=now)
+                for key in sorted(history, key=int)[:-ALERT_HISTORY]:
+                    del history[key]
+                cache.set('alerts', history)
+            return fired
+        finally:
+            cache.release('alerts', scheduler.owner)
+
+def edit_alert_rules(change):
+    """Regeln ändern: change(rules) bekommt die Liste zum Bearbeiten. Die
+    Lease 'alert_rules' verhindert, dass sich zwei Worker überschreiben."""
+    deadline = time.time() + 5
+    with alert_lock:
+        while not cache.acquire('alert_rules', scheduler.owner, 10):
+            if time.time() > deadline:
+                raise RuntimeError('Regeln werden gerade geändert')
+            time.sleep(0.05)
+        try:
+            entry = cache.get('alert_rules')
+            rules = list(entry['data']['rules']) if entry else []
+            result = change(rules)
+            cache.set('alert_rules', {'rules': rules})
+            return result
+        finally:
+            cache.release('alert_rules', scheduler.owner)
+
+def alert_owner():
+    """Name zum Token im Header 'Authorization: Bearer <token>', sonst None"""
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return None
+    for known, name in ALERT_TOKENS.items():
+        if hmac.compare_digest(known, token.strip()):
+            return name
+    return None
+
+def owned_rules(owner):
+    entry = cache.get('alert_rules')
+    return [r for r in (entry['data']['rules'] if entry else []) if r.get('owner') == owner]
+
+def save_state_soon():
+    """Snapshot im Hintergrund schreiben statt im Request; mehrere Änderungen
+    kurz hintereinander ergeben einen Schreibvorgang"""
+    if snapshot_pending.is_set():
+        return
+    snapshot_pending.set()
+
+    def run():
+        time.sleep(1)
+        snapshot_pending.clear()
+        save_state()
+
+    threading.Thread(target=run, name='snapshot', daemon=True).start()
+
+UNAUTHORIZED = ({'success': False, 'error': 'Token fehlt oder ungültig (Authorization: Bearer ...)'}, 401)
+
+def parse_alert_rule(item, available, owner):
+    """{'symbol', 'condition'} aus dem Request prüfen -> Regel-Dict (ValueError bei Fehlern);
+    available sind die Währungen der Kursmatrix"""
+    if not isinstance(item, dict):
+        raise ValueError('Regel muss ein Objekt mit symbol und condition sein')
+    instrument = instruments.get(str(item.get('symbol') or ''))
+    if instrument is None or not instruments.supported(instrument, available):
+        raise ValueError(f"Ungültiges Paar: {item.get('symbol')}")
+    condition = ' '.join(str(item.get('condition') or '').split())
+    alerts.parse(condition)
+    return {'id': uuid.uuid4().hex[:12], 'symbol': instrument.symbol, 'condition': condition,
+            'owner': owner, 'created': datetime.now().isoformat()}
+
+@app.route('/api/alerts/rules', methods=['GET'])
+def get_alert_rules():
+    """Eigene Alarm-Regeln (Token), optional ?symbol=EURUSD"""
+    owner = alert_owner()
+    if owner is None:
+        return jsonify(UNAUTHORIZED[0]), UNAUTHORIZED[1]
+    rules = owned_rules(owner)
+    symbol = request.args.get('symbol')
+    if symbol:
+        symbol = symbol.upper().replace('/', '')
+        rules = [r for r in rules if r['symbol'] == symbol]
+    return jsonify({'success': True, 'data': rules, 'count': len(rules)})
+
+@app.route('/api/alerts/rules', methods=['POST'])
+def add_alert_rules():
+    """Regeln anlegen: {"symbol": "EURUSD", "condition": "RSI(14) < 30"} oder
+    {"rules": [...]}. Bedingungen: "RSI(14) < 30", "price crosses EMA(50)",
+    "within 0.2% of support", "EMA(20) crosses above EMA(50)" ...
+
+    Schreibende Endpoints brauchen ein Token - sonst könnte jede Seite, die
+    ein Nutzer besucht, über CORS Regeln anlegen oder löschen."""
+    owner = alert_owner()
+    if owner is None:
+        return jsonify(UNAUTHORIZED[0]), UNAUTHORIZED[1]
+    body = request.get_json(silent=True)
+    items = body.get('rules') if isinstance(body, dict) and 'rules' in body else [body]
+    if not isinstance(items, list) or not items:
+        return jsonify({'success': False, 'error': 'Keine Regeln'}), 400
+    with frankfurter.deadline(REFRESH_DEADLINE):
+        rate_history.ensure_fresh()
+    available = rate_history.latest().keys()
+    if not available:
+        return jsonify({'success': False, 'error': 'Keine Kursdaten - Paare können nicht geprüft werden'}), 503
+    try:
+        new_rules = [parse_alert_rule(item, available, owner) for item in items]
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    def add(rules):
+        if len(rules) + len(new_rules) > MAX_ALERT_RULES:
+            return False
+        rules.extend(new_rules)
+        return True
+
+    try:
+        if not edit_alert_rules(add):
+            return jsonify({'success': False, 'error': f'Maximal {MAX_ALERT_RULES} Regeln'}), 400
+        # Neue Regeln gleich prüfen - bereits erfüllte Bedingungen lösen sofort aus
+        with frankfurter.deadline(REFRESH_DEADLINE):
+            update_alerts()
+        save_state_soon()
+    except Exception as e:
+        print(f"Error in alert rules: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    return jsonify({'success': True, 'data': new_rules}), 201
+
+@app.route('/api/alerts/rules/<rule_id>', methods=['DELETE'])
+def delete_alert_rule(rule_id):
+    owner = alert_owner()
+    if owner is None:
+        return jsonify(UNAUTHORIZED[0]), UNAUTHORIZED[1]
+
+    def remove(rules):
+        # Fremde Regeln gelten als nicht vorhanden
+        kept = [r for r in rules if r['id'] != rule_id or r.get('owner') != owner]
+        removed = len(kept) != len(rules)
+        rules[:] = kept
+        return removed
+
+    try:
+        if not edit_alert_rules(remove):
+            return jsonify({'success': False, 'error': 'Regel nicht gefunden'}), 404
+        save_state_soon()
+    except Exception as e:
+        print(f"Error in alert rules: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    return jsonify({'success': True})
+
+@app.route('/api/alerts', methods=['GET'])
+def get_alerts():
+    """Ausgelöste Alarme der eigenen Regeln (Token), älteste zuerst; ?since=<seq>
+    nur die neueren, ?symbol=EURUSD nur ein Paar. Nicht im öffentlichen
+    /api/stream - Clients fragen mit ?since=<seq> nach."""
+    owner = alert_owner()
+    if owner is None:
+        return jsonify(UNAUTHORIZED[0]), UNAUTHORIZED[1]
+    try:
+        rule_ids = {r['id'] for r in owned_rules(owner)}
+        since = request.args.get('since', 0, type=int)
+        symbol = request.args.get('symbol')
+        entry = cache.get('alerts')
+        items = sorted(entry['data'].values(), key=lambda a: a['seq']) if entry else []
+        items = [a for a in items if a['seq'] > since and a['rule'] in rule_ids]
+        if symbol:
+            symbol = symbol.upper().replace('/', '')
+            items = [a for a in items if a['symbol'] == symbol]
         return jsonify({
             'success': True,
-            'data': news_data,
+            'data': items,
+            'seq': items[-1]['seq'] if items else since,
+            'rules': len(rule_ids),
             'timestamp': datetime.now().isoformat()
         })
-        
+    except Exception as e:
+        print(f"Error in alerts: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def build_news():
+    """Stellt die News pro Paar zusammen (RSS/Atom aus NEWS_FEEDS, sonst Fallback-News)"""
+    now = datetime.now().strftime('%H:%M')
+    all_news = [
+        {'time': f'{now}', 'headline': 'EUR/USD stabil - EZB im Fokus', 'url': 'https://de.investing.com/currencies/eur-usd', 'text': 'eur usd ezb'},
+        {'time': 'Vor 1 Std', 'headline': 'Dollar schwächer nach US-Daten', 'url': 'https://de.investing.com/currencies/eur-usd', 'text': 'dollar usd'},
+        {'time': 'Vor 2 Std', 'headline': 'Eurozone Wirtschaft zeigt Stärke', 'url': 'https://de.investing.com/currencies/eur-usd', 'text': 'eurozone euro'},
+        {'time': f'{now}', 'headline': 'GBP/USD steigt - BoE hawkish', 'url': 'https://de.investing.com/currencies/gbp-usd', 'text': 'gbp usd pound boe'},
+        {'time': 'Vor 1 Std', 'headline': 'UK Inflation besser als erwartet', 'url': 'https://de.investing.com/currencies/gbp-usd', 'text': 'uk pound inflation'},
+        {'time': 'Vor 3 Std', 'headline': 'Britisches Pfund profitiert', 'url': 'https://de.investing.com/currencies/gbp-usd', 'text': 'uk britain gbp'},
+        {'time': f'{now}', 'headline': 'USD/JPY volatil - BoJ Intervention droht', 'url': 'https://de.investing.com/currencies/usd-jpy', 'text': 'usd jpy yen boj'},
+        {'time': 'Vor 1 Std', 'headline': 'Yen gewinnt an Stärke', 'url': 'https://de.investing.com/currencies/usd-jpy', 'text': 'yen japan'},
+        {'time': 'Vor 2 Std', 'headline': 'Japan Inflation weiter hoch', 'url': 'https://de.investing.com/currencies/usd-jpy', 'text': 'japan inflation jpy'},
+    ]
+
+    # Ohne konfigurierte Feeds (oder solange sie nichts liefern) dieselbe
+    # Zuordnung über die Fallback-Liste
+    pipeline = news_pipeline
+    if pipeline.sources:
+        pipeline.refresh()
+    if not pipeline:
+        pipeline = news.NewsPipeline()
+        pipeline.add(reversed(all_news))
+
+    return pipeline.news(INSTRUMENTS)
+
+@app.route('/api/news', methods=['GET'])
+def get_news():
+    """Holt Forex-News - ohne feedparser"""
+    try:
+        return snapshot_response('news')
+
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def build_calendar():
+    """Wirtschaftskalender für heute"""
+    econ_calendar_store.refresh()
+    today = datetime.now().date()
+    todays = [
+        {'time': e['time'], 'currency': e['currency'], 'event': e['event'], 'impact': e['impact'], 'url': e['url']}
+        for e in econ_calendar_store.calendar.query(today, today)
+    ]
+
+    if today.weekday() >= 5 and not todays:
+        return [{
+            'time': '—',
+            'currency': 'INFO',
+            'event': 'Wochenende - keine Events',
+            'impact': 'low',
+            'url': econ_calendar.CALENDAR_URL
+        }]
+
+    return [{
+        'time': '→',
+        'currency': 'INFO',
+        'event': 'Für vollständige Liste HIER KLICKEN',
+        'impact': 'high',
+        'url': econ_calendar.CALENDAR_URL
+    }] + todays
+
+def parse_day(value, default):
+    """YYYY-MM-DD aus einem Query-Parameter"""
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else default
+
 @app.route('/api/calendar', methods=['GET'])
 def get_calendar():
-    """Wirtschaftskalender"""
+    """Wirtschaftskalender: ohne Parameter heute, sonst ?from=&to=&currency=&impact="""
     try:
-        if calendar_cache['data'] and calendar_cache['timestamp']:
-            if (datetime.now() - calendar_cache['timestamp']).seconds < 600:
-                return jsonify({
-                    'success': True,
-                    'data': calendar_cache['data'],
-                    'cached': True,
-                    'timestamp': calendar_cache['timestamp'].isoformat()
-                })
-        
-        today = datetime.now()
-        weekday = today.weekday()
-        
-        weekday_events = {
-            0: [
-                {'time': '10:00', 'currency': 'EUR', 'event': 'Eurozone Industrieproduktion', 'impact': 'medium'},
-                {'time': '14:30', 'currency': 'USD', 'event': 'US Einzelhandelsumsätze', 'impact': 'high'},
-            ],
-            1: [
-                {'time': '11:00', 'currency': 'EUR', 'event': 'Deutsche ZEW Konjunkturerwartungen', 'impact': 'high'},
-                {'time': '14:30', 'currency': 'USD', 'event': 'US CPI Verbraucherpreise', 'impact': 'high'},
-            ],
-            2: [
-                {'time': '14:30', 'currency': 'USD', 'event': 'US PPI Erzeugerpreise', 'impact': 'high'},
-                {'time': '20:00', 'currency': 'USD', 'event': 'FOMC Sitzungsprotokoll', 'impact': 'high'},
-            ],
-            3: [
-                {'time': '08:00', 'currency': 'GBP', 'event': 'UK BIP-Wachstum', 'impact': 'high'},
-                {'time': '14:30', 'currency': 'USD', 'event': 'US Erstanträge Arbeitslosenhilfe', 'impact': 'medium'},
-            ],
-            4: [
-                {'time': '14:30', 'currency': 'USD', 'event': 'US Arbeitsmarktbericht (NFP)', 'impact': 'high'},
-                {'time': '16:00', 'currency': 'USD', 'event': 'US Uni Michigan Vertrauen', 'impact': 'medium'},
-            ],
-            5: [],
-            6: []
-        }
-        
-        events = []
-        
-        if weekday >= 5:
-            events = [{
-                'time': '—',
-                'currency': 'INFO',
-                'event': 'Wochenende - keine Events',
-                'impact': 'low',
-                'url': 'https://de.investing.com/economic-calendar/'
-            }]
-        else:
-            events = [{
-                'time': '→',
-                'currency': 'INFO',
-                'event': 'Für vollständige Liste HIER KLICKEN',
-                'impact': 'high',
-                'url': 'https://de.investing.com/economic-calendar/'
-            }]
-            
-            for evt in weekday_events.get(weekday, []):
-                events.append({
-                    'time': evt['time'],
-                    'currency': evt['currency'],
-                    'event': evt['event'],
-                    'impact': evt['impact'],
-                    'url': 'https://de.investing.com/economic-calendar/'
-                })
-        
-        calendar_cache['data'] = events
-        calendar_cache['timestamp'] = datetime.now()
-        
-        return jsonify({
-            'success': True,
-            'data': events,
-            'timestamp': datetime.now().isoformat()
-        })
-        
+        if not any(name in request.args for name in ('from', 'to', 'currency', 'impact')):
+            return snapshot_response('calendar')
+
+        try:
+            start = parse_day(request.args.get('from'), datetime.now().date())
+            end = parse_day(request.args.get('to'), start)
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Datum im Format YYYY-MM-DD erwartet'}), 400
+        if end < start:
+            return jsonify({'success': False, 'error': 'to liegt vor from'}), 400
+
+        # Bereichsabfrage direkt auf dem Index, aus den vorserialisierten Tagen.
+        # Jeder Worker hält seinen eigenen Index, auch wenn er den Cache nie baut
+        econ_calendar_store.refresh()
+        calendar = econ_calendar_store.calendar
+        events = calendar.query_json(start, end, request.args.get('currency'), request.args.get('impact'))
+        body = b''.join([
+            b'{"success":true,"from":"', start.isoformat().encode(), b'","to":"', end.isoformat().encode(),
+            b'","data":', events, b'}\n'
+        ])
+        return send_encoded({'etag': hashlib.blake2b(body, digest_size=12).hexdigest(), 'identity': body})
+
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/stream', methods=['GET'])
+def get_stream():
+    """Server-Sent Events: sendet nur, wenn ein Refresh einen neuen Stand liefert"""
+    scheduler.start()
+
+    connection = update_stream.connect(request.headers.get('Last-Event-ID'))
+    if connection is None:
+        # Alle Plätze belegt - der Client bleibt beim Abfragen von /api/rates
+        return jsonify({'success': False, 'error': 'Zu viele Stream-Verbindungen'}), 503, {'Retry-After': '30'}
+    return Response(connection, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Laufzeiten, Cache-Treffer und Upstream-Fehler im Prometheus-Textformat"""
+    metrics.STATE.set(int(rate_history.stale), name='history_stale')
+    metrics.STATE.set(rate_history.version, name='history_version')
+    metrics.STATE.set(len(rate_history.dates), name='history_days')
+    metrics.STATE.set(int(frankfurter.breaker.state != 'closed'), name='circuit_open')
+    metrics.STATE.set(len(alert_engine.plan), name='alert_rules')
+    for key, value in indicator_memo.stats().items():
+        metrics.STATE.set(value, name=f'indicator_memo_{key}')
+
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+scheduler.register('analysis', build_rates, ttl=300)
+scheduler.register('news', build_news, ttl=300)
+scheduler.register('calendar', build_calendar, ttl=600)
+
+def save_state(name=None):
+    """Startup-Snapshot schreiben (nach jedem Refresh und beim Beenden)"""
+    caches = {n: cache.get(n) for n in (*scheduler.jobs, 'indicator_state', 'alert_rules', 'alerts', 'alert_state')}
+    if not rate_history.dates and not any(caches.values()):
+        return 0    # nichts geladen - einen vorhandenen Snapshot nicht überschreiben
+    try:
+        return state_snapshot.save({
+            'history': rate_history.export(),
+            'caches': caches,
+            'encoded': dict(encoded_responses),
+        })
+    except Exception as e:
+        print(f"State snapshot write error: {e}")
+        return 0
+
+def restore_state():
+    """Snapshot laden, bevor der erste Request kommt. Caches, die schon einen
+    Stand haben (SQLite-Backend, anderer Worker), bleiben unverändert."""
+    state = state_snapshot.load()
+    if not state:
+        return False
+
+    rate_history.restore(state['history'])
+    for name, entry in state['caches'].items():
+        if entry is None or cache.get(name) is not None:
+            continue
+        generation = cache.set(name, entry['data'], entry['timestamp'])
+        memo = state['encoded'].get(name)
+        if memo and memo[0][0] == entry['generation']:
+            # Serialisierte Antwort gehört zu diesem Stand - unter der neuen Generation übernehmen
+            encoded_responses[name] = ((generation, memo[0][1]), memo[1])
+    return True
+
+scheduler.on_refresh = save_state
+atexit.register(save_state)
+
+restored = restore_state()
+STARTUP_SECONDS = time.perf_counter() - STARTED
+metrics.STATE.set(STARTUP_SECONDS, name='startup_seconds')
+metrics.STATE.set(int(restored), name='startup_from_snapshot')
+print(f"Startup in {STARTUP_SECONDS * 1000:.0f} ms" + (" (Snapshot geladen)" if restored else ""))
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=10000)
@@ -0,0 +1,359 @@
+"""Vektorisierter Backtest der Dashboard-Setups über lange Historien.
+
+Die Regeln kommen aus setups.py, sind also dieselben wie in analyze_pair.
+Gerechnet wird auf der ganzen Kursmatrix (Tage x Instrumente) auf einmal.
+Bei einem Parameter-Sweep werden EMA und RSI pro Periode nur einmal
+berechnet und die Vorwärts-Renditen nur einmal für alle Kombinationen.
+
+Kennzahlen pro Regel (long/short) und Paar:
+- signals: Tage mit Setup
+- hit_rate: Anteil der Signale, nach denen der Kurs `horizon` Tage später in
+  Setup-Richtung steht
+- avg_return: mittlere Rendite nach `horizon` Tagen in Setup-Richtung
+- avg_mfe / avg_mae: mittlere günstigste / ungünstigste Auslenkung innerhalb
+  des Horizonts
+- max_drawdown: größter Rückgang der Equity-Kurve, wenn die Position gehalten
+  wird, solange das Setup besteht
+
+Ergebnisse werden pro Parameter-Kombination und Datenstand als JSON-Datei
+gecacht (Verzeichnis BACKTEST_CACHE), ein wiederholter Sweep liest nur noch.
+
+Die Kurse kommen aus dem RateStore (rate_store.py); fehlende Jahre werden
+beim ersten Lauf in Stücken von der Frankfurter API nachgeladen, danach wird
+nur noch gelesen.
+
+    python backtest.py --years 25 --pairs all --ema 20,50,100,200 --rsi 7,14,21 \\
+        --long-band 30-60,25-55 --short-band 40-70,45-75
+    python backtest.py --fixture bench/fixtures/frankfurter_usd.json
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+import indicators
+import instruments
+import setups
+from rate_store import FIRST_FIXING, RateStore
+from upstream import UpstreamClient
+
+HORIZON = 10
+CACHE_DIR = os.environ.get('BACKTEST_CACHE', os.path.join(tempfile.gettempdir(), 'trading-backtest'))
+
+# Bei Änderungen an Regeln oder Kennzahlen erhöhen - alte Cache-Einträge gelten dann nicht mehr
+CACHE_VERSION = 1
+
+
+def load_rates(years=25, store=None, client=None):
+    """(dates, currencies, matrix) der letzten `years` Jahre aus dem RateStore;
+    fehlende Tage werden vorher von der Frankfurter API nachgeladen"""
+    store = store or RateStore()
+    since = max(FIRST_FIXING, date.today() - timedelta(days=round(years * 365.25)))
+    if client is None:
+        client = UpstreamClient(os.environ.get('FRANKFURTER_URL', 'https://api.frankfurter.app'),
+                                timeout=30)
+    store.backfill(client, since)
+    dates, matrix = store.matrix(store.currencies, since)
+    return dates, store.currencies, matrix
+
+
+def load_fixture(path):
+    """Kurse aus einer Datei im Frankfurter-Zeitreihenformat"""
+    with open(path) as f:
+        return json.load(f)['rates']
+
+
+def rates_to_matrix(rates):
+    """{datum: {währung: kurs}} -> (dates, currencies, matrix) mit NaN für fehlende Kurse"""
+    dates = sorted(rates)
+    currencies = sorted({c for day in rates.values() for c in day})
+    index = {c: n for n, c in enumerate(currencies)}
+
+    matrix = np.full((len(dates), len(currencies)), np.nan)
+    for row, day in enumerate(dates):
+        for currency, value in rates[day].items():
+            matrix[row, index[currency]] = value
+    return dates, currencies, matrix
+
+
+def select_instruments(pairs, currencies, latest_row):
+    """Instrumente für --pairs: 'all' = jede aktuell notierte Währung gegen USD"""
+    if pairs == 'all':
+        quoted = [c for c, v in zip(currencies, latest_row) if not np.isnan(v)]
+        return [instruments.get(c + instruments.BASE_CURRENCY) for c in quoted]
+    selected = instruments.active(pairs.split(',') if pairs else None)
+    available = set(currencies) | {instruments.BASE_CURRENCY}
+    return [i for i in selected if i.base in available and i.quote in available]
+
+
+def fill_forward(prices):
+    """Lücken mit dem letzten Kurs füllen; liefert (gefüllt, valid) mit
+    valid = ursprünglich vorhandene Kurse. Führende NaN bleiben stehen."""
+    valid = ~np.isnan(prices)
+    index = np.where(valid, np.arange(len(prices))[:, None], 0)
+    np.maximum.accumulate(index, axis=0, out=index)
+    return np.take_along_axis(prices, index, axis=0), valid
+
+
+def by_start(func, prices, period):
+    """Indikator ab dem ersten Kurs jedes Instruments - Instrumente mit
+    gleichem Startdatum werden in einem Aufruf gerechnet"""
+    result = np.full(prices.shape, np.nan)
+    has_price = ~np.isnan(prices)
+    first = np.where(has_price.any(axis=0), has_price.argmax(axis=0), -1)
+    for start in np.unique(first[first >= 0]):
+        columns = np.flatnonzero(first == start)
+        result[start:, columns] = func(prices[start:, columns], period)
+    return result
+
+
+def forward_outcomes(prices, valid, horizon=HORIZON):
+    """Für jeden Einstiegstag: Rendite nach `horizon` Tagen sowie höchster und
+    tiefster Kurs dazwischen, jeweils relativ zum Einstieg"""
+    n = len(prices) - horizon
+    entry = prices[:n]
+    windows = np.lib.stride_tricks.sliding_window_view(prices[1:], horizon, axis=0)
+    with np.errstate(invalid='ignore'):
+        return {
+            'return': prices[horizon:] / entry - 1,
+            'high': windows.max(axis=-1) / entry - 1,
+            'low': windows.min(axis=-1) / entry - 1,
+            # Einstieg und Ausstieg an Tagen mit echtem Kurs
+            'usable': valid[:n] & valid[horizon:],
+            'daily': np.log(prices[1:] / prices[:-1]),
+        }
+
+
+def evaluate(signals, outcomes):
+    """Kennzahlen pro Regel als Arrays (eine Zahl pro Instrument)"""
+    n = len(outcomes['return'])
+    result = {}
+    for rule, direction in (('long', setups.LONG), ('short', setups.SHORT)):
+        mask = (signals[:n] == direction) & outcomes['usable']
+        count = mask.sum(axis=0)
+        returns = outcomes['return'] * direction
+        if direction == setups.LONG:
+            favourable, adverse = outcomes['high'], outcomes['low']
+        else:
+            favourable, adverse = -outcomes['low'], -outcomes['high']
+
+        def mean(values):
+            total = np.where(mask, values, 0.0).sum(axis=0)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return np.where(count > 0, total / count, np.nan)
+
+        # Equity-Kurve (log) bei gehaltener Position, solange das Setup besteht
+        held = signals[:-1] == direction
+        equity = np.cumsum(np.where(held, outcomes['daily'] * direction, 0.0), axis=0)
+        peak = np.maximum.accumulate(np.maximum(equity, 0.0), axis=0)
+        drawdown = 1 - np.exp(-(peak - equity).max(axis=0, initial=0.0))
+
+        result[rule] = {
+            'signals': count,
+            'hits': (mask & (returns > 0)).sum(axis=0),
+            'avg_return': mean(returns),
+            'avg_mfe': mean(favourable),
+            'avg_mae': mean(adverse),
+            'max_drawdown': drawdown,
+        }
+    return result
+
+
+def to_report(evaluated, symbols):
+    """Arrays aus evaluate() -> {regel: {symbol: kennzahlen, 'all': gesamt}}"""
+    report = {}
+    for rule, values in evaluated.items():
+        per_pair = {}
+        for k, symbol in enumerate(symbols):
+            signals = int(values['signals'][k])
+            per_pair[symbol] = {
+                'signals': signals,
+                'hit_rate': _ratio(values['hits'][k], signals),
+                'avg_return': indicators.to_float(values['avg_return'][k]),
+                'avg_mfe': indicators.to_float(values['avg_mfe'][k]),
+                'avg_mae': indicators.to_float(values['avg_mae'][k]),
+                'max_drawdown': float(values['max_drawdown'][k]),
+            }
+
+        # Gesamt über alle Paare, gewichtet mit der Anzahl Signale
+        signals = int(values['signals'].sum())
+        weighted = {key: float(np.nansum(values[key] * values['signals'])) / signals if signals else None
+                    for key in ('avg_return', 'avg_mfe', 'avg_mae')}
+        per_pair['all'] = {
+            'signals': signals,
+            'hit_rate': _ratio(values['hits'].sum(), signals),
+            **weighted,
+            'max_drawdown': float(values['max_drawdown'].max()) if len(symbols) else 0.0,
+        }
+        report[rule] = per_pair
+    return report
+
+
+def _ratio(hits, count):
+    return float(hits) / count if count else None
+
+
+def fingerprint(dates, symbols, prices):
+    """Hash des Datenstands - Teil jedes Cache-Schlüssels"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps([dates[0] if dates else None, dates[-1] if dates else None,
+                              symbols]).encode())
+    digest.update(np.ascontiguousarray(prices).tobytes())
+    return digest.hexdigest()
+
+
+def cache_key(params, data_hash):
+    payload = json.dumps({'version': CACHE_VERSION, 'params': params, 'data': data_hash},
+                         sort_keys=True)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+def sweep(dates, symbols, prices, grid, horizon=HORIZON, cache_dir=CACHE_DIR):
+    """Backtest für jede Kombination aus grid['ema'], grid['rsi'],
+    grid['long_band'] und grid['short_band']. Liefert eine Liste von
+    {'params', 'rules'}; Kombinationen aus dem Cache werden nicht neu gerechnet."""
+    data_hash = fingerprint(dates, symbols, prices)
+    filled, valid = fill_forward(prices)
+    outcomes = None
+    emas, rsis = {}, {}
+
+    results = []
+    for ema_period, rsi_period, long_band, short_band in itertools.product(
+            grid['ema'], grid['rsi'], grid['long_band'], grid['short_band']):
+        params = {'ema': ema_period, 'rsi': rsi_period, 'long_band': list(long_band),
+                  'short_band': list(short_band), 'horizon': horizon}
+        path = os.path.join(cache_dir, cache_key(params, data_hash) + '.json') if cache_dir else None
+
+        if path and os.path.exists(path):
+            with open(path) as f:
+                results.append(json.load(f))
+            continue
+
+        if outcomes is None:
+            outcomes = forward_outcomes(filled, valid, horizon)
+        if ema_period not in emas:
+            emas[ema_period] = by_start(indicators.ema, filled, ema_period)
+        if rsi_period not in rsis:
+            rsis[rsi_period] = by_start(indicators.rsi, filled, rsi_period)
+
+        with np.errstate(invalid='ignore'):
+            signals = setups.setup_matrix(filled, emas[ema_period], rsis[rsi_period],
+                                          long_band, short_band)
+        signals[~valid] = setups.WAIT
+
+        result = {'params': params, 'rules': to_report(evaluate(signals, outcomes), symbols)}
+        if path:
+            os.makedirs(cache_dir, exist_ok=True)
+            # Erst in eine temporäre Datei, dann umbenennen - parallele Läufe sehen nie halbe Dateien
+            tmp = f'{path}.{os.getpid()}.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(result, f)
+            os.replace(tmp, path)
+        results.append(result)
+
+    return results
+
+
+def expectancy(result):
+    """Mittlere Rendite aller Signale (long und short zusammen)"""
+    total = signals = 0
+    for rule in result['rules'].values():
+        if rule['all']['signals']:
+            total += rule['all']['avg_return'] * rule['all']['signals']
+            signals += rule['all']['signals']
+    return total / signals if signals else float('-inf')
+
+
+def parse_bands(value):
+    """'30-60,25-55' -> [(30, 60), (25, 55)]"""
+    bands = []
+    for band in value.split(','):
+        low, _, high = band.partition('-')
+        bands.append((float(low), float(high)))
+    return bands
+
+
+def _pct(value):
+    return '     —' if value is None else f'{value * 100:6.2f}'
+
+
+def print_results(results, top):
+    print(f"\n{'EMA':>4} {'RSI':>4} {'Long-Band':>10} {'Short-Band':>10} | "
+          f"{'Long n':>7} {'Treffer':>7} {'Ø %':>6} | {'Short n':>7} {'Treffer':>7} {'Ø %':>6}")
+    for result in sorted(results, key=expectancy, reverse=True)[:top]:
+        p = result['params']
+        long_all, short_all = result['rules']['long']['all'], result['rules']['short']['all']
+        print(f"{p['ema']:>4} {p['rsi']:>4} {'%g-%g' % tuple(p['long_band']):>10} "
+              f"{'%g-%g' % tuple(p['short_band']):>10} | "
+              f"{long_all['signals']:>7} {_pct(long_all['hit_rate']):>7} {_pct(long_all['avg_return'])} | "
+              f"{short_all['signals']:>7} {_pct(short_all['hit_rate']):>7} {_pct(short_all['avg_return'])}")
+
+
+def print_pairs(result):
+    p = result['params']
+    print(f"\nPro Paar (EMA {p['ema']}, RSI {p['rsi']}), Horizont {p['horizon']} Tage, Werte in %:")
+    print(f"{'Paar':8} {'Regel':6} {'n':>6} {'Treffer':>7} {'Ø':>6} {'MFE':>6} {'MAE':>6} {'MaxDD':>6}")
+    for rule, pairs in result['rules'].items():
+        for symbol, r in pairs.items():
+            print(f"{symbol:8} {rule:6} {r['signals']:>6} {_pct(r['hit_rate']):>7} {_pct(r['avg_return'])} "
+                  f"{_pct(r['avg_mfe'])} {_pct(r['avg_mae'])} {_pct(r['max_drawdown'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtest der Dashboard-Setups')
+    parser.add_argument('--years', type=float, default=25)
+    parser.add_argument('--fixture', help='Kurse aus Datei (Frankfurter-Zeitreihenformat) statt API')
+    parser.add_argument('--pairs', help="Symbole mit Komma oder 'all' (Standard: INSTRUMENTS)")
+    parser.add_argument('--ema', default='50', help='EMA-Perioden, z.B. 20,50,200')
+    parser.add_argument('--rsi', default='14', help='RSI-Perioden, z.B. 7,14,21')
+    parser.add_argument('--long-band', default='30-60', help='RSI-Bänder für Long, z.B. 30-60,25-55')
+    parser.add_argument('--short-band', default='40-70', help='RSI-Bänder für Short')
+    parser.add_argument('--horizon', type=int, default=HORIZON, help='Haltedauer in Tagen')
+    parser.add_argument('--top', type=int, default=10, help='beste Kombinationen anzeigen')
+    parser.add_argument('--json', help='alle Ergebnisse als JSON schreiben')
+    parser.add_argument('--no-cache', action='store_true')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.fixture:
+        dates, currencies, matrix = rates_to_matrix(load_fixture(args.fixture))
+    else:
+        dates, currencies, matrix = load_rates(args.years)
+    selected = select_instruments(args.pairs, currencies, matrix[-1])
+    if not selected:
+        print('Keine passenden Paare in den Daten')
+        return 1
+    prices = instruments.price_matrix(matrix, currencies, selected)
+    loaded = time.perf_counter()
+
+    grid = {
+        'ema': sorted({int(p) for p in args.ema.split(',')}),
+        'rsi': sorted({int(p) for p in args.rsi.split(',')}),
+        'long_band': parse_bands(args.long_band),
+        'short_band': parse_bands(args.short_band),
+    }
+    symbols = [i.symbol for i in selected]
+    results = sweep(dates, symbols, prices, grid, args.horizon,
+                    cache_dir=None if args.no_cache else CACHE_DIR)
+    done = time.perf_counter()
+
+    print(f"{len(dates)} Tage ({dates[0]} bis {dates[-1]}) x {len(symbols)} Paare, "
+          f"{len(results)} Kombinationen: Laden {loaded - start:.2f}s, Backtest {done - loaded:.2f}s")
+    print_results(results, args.top)
+    print_pairs(max(results, key=expectancy))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,441 @@
+"""Benchmarks für Indikatoren und Endpoints.
+
+Upstream-Aufrufe gehen an stub_frankfurter.py, der die aufgezeichneten
+Frankfurter-Antworten aus bench/fixtures abspielt (Daten auf heute verschoben).
+
+    python bench/run.py                    # Indikatoren + Endpoints (Flask Test-Client)
+    python bench/run.py --gunicorn         # zusätzlich Durchsatz unter gunicorn
+    python bench/run.py --only feed        # nur eine Gruppe
+    python bench/run.py --only alerts      # Alarm-Regeln: 10k Regeln auf 50 Instrumenten
+    python bench/run.py --only startup     # neuer Prozess bis zur ersten Antwort
+    python bench/run.py --quick            # kleinere Größen, für schnelle Checks
+    python bench/run.py --save-baseline    # aktuelle Werte als Baseline speichern
+    python bench/run.py --record           # Fixture von der echten API neu aufnehmen
+
+Ausgabe pro Messung: p50/p95/p99 in Millisekunden und ops/s. Liegt ein p50
+mehr als --tolerance (und mindestens --min-delta ms) über der Baseline, wird
+das als Regression markiert und das Skript endet mit Exit-Code 1. Die
+Baseline gilt für die Maschine, auf der sie gespeichert wurde.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+
+from stub_frankfurter import StubServer  # noqa: E402
+
+FIXTURE = os.path.join(BENCH_DIR, 'fixtures', 'frankfurter_usd.json')
+BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+
+POINTS = [100, 1000, 10000, 100000]
+INSTRUMENTS = [3, 30, 100]
+
+
+def measure(fn, repeat, warmup=1):
+    """Laufzeiten von fn() in Sekunden"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def summarize(name, samples, ops=None):
+    ordered = sorted(samples)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000
+
+    return {
+        'name': name,
+        'n': len(samples),
+        'p50': pct(50),
+        'p95': pct(95),
+        'p99': pct(99),
+        'ops': ops if ops is not None else len(samples) / sum(samples),
+    }
+
+
+def random_prices(points, instruments, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.cumprod(1 + rng.normal(0, 0.004, (points, instruments)), axis=0)
+
+
+def bench_indicators(quick):
+    import app
+    import indicators
+
+    results = []
+    points = POINTS[:3] if quick else POINTS
+
+    for n in points:
+        prices = random_prices(n, 1)[:, 0].tolist()
+        repeat = max(3, min(200, 200000 // n))
+        results.append(summarize(f'calculate_ema[{n}]', measure(lambda: app.calculate_ema(prices, 50), repeat)))
+        results.append(summarize(f'calculate_rsi[{n}]', measure(lambda: app.calculate_rsi(prices, 14), repeat)))
+        results.append(summarize(f'find_support_resistance[{n}]',
+                                 measure(lambda: app.find_support_resistance(prices, 20), repeat)))
+
+    for k in INSTRUMENTS:
+        n = 1000 if quick else 10000
+        matrix = random_prices(n, k)
+        repeat = 3 if k * n > 100000 else 10
+        results.append(summarize(f'batch_ema[{n}x{k}]', measure(lambda: indicators.ema(matrix, 50), repeat)))
+        results.append(summarize(f'batch_rsi[{n}x{k}]', measure(lambda: indicators.rsi(matrix, 14), repeat)))
+        results.append(summarize(f'batch_support_resistance[{n}x{k}]',
+                                 measure(lambda: indicators.support_resistance(matrix, 20), repeat)))
+
+    # Ein neuer Tageskurs für alle Instrumente im Streaming-Zustand
+    for k in INSTRUMENTS:
+        states = [indicators.IndicatorSet() for _ in range(k)]
+        row = random_prices(200, k)
+        for r in row[:-1]:
+            for state, price in zip(states, r.tolist()):
+                state.update(price)
+        last = row[-1].tolist()
+
+        def step():
+            for state, price in zip(states, last):
+                state.update(price)
+
+        results.append(summarize(f'streaming_update[x{k}]', measure(step, 200)))
+
+    return results
+
+
+def bench_feed(quick):
+    """Tick-Replay: CSV parsen und H1/H4/D1 Bars bilden; ops/s = Ticks pro Sekunde"""
+    import feeds
+
+    n = 200000 if quick else 2000000
+    rng = np.random.default_rng(0)
+    timestamps = 1.7e9 + np.cumsum(rng.uniform(0, 0.5, n))
+    symbols = np.array([b'EURUSD', b'GBPUSD', b'USDJPY', b'EURGBP', b'EURJPY', b'GBPJPY'])[rng.integers(0, 6, n)]
+    prices = np.exp(np.cumsum(rng.normal(0, 1e-5, n)))
+
+    path = os.path.join(tempfile.mkdtemp(), 'ticks.csv')
+    with open(path, 'w') as f:
+        f.write('timestamp,symbol,price\n')
+        f.writelines(f'{t:.3f},{s.decode()},{p:.6f}\n'
+                     for t, s, p in zip(timestamps.tolist(), symbols.tolist(), prices.tolist()))
+
+    results = []
+    samples = measure(lambda: feeds.IntradayFeed(feeds.CSVTickSource(path)).poll(), 3)
+    results.append(summarize(f'tick_replay_csv[{n}]', samples, ops=n / min(samples)))
+    samples = measure(lambda: feeds.Resampler().update_batch(symbols, timestamps, prices), 5)
+    results.append(summarize(f'resample_batch[{n}]', samples, ops=n / min(samples)))
+
+    resampler = feeds.Resampler()
+    resampler.update_batch(symbols[:-1000], timestamps[:-1000], prices[:-1000])
+    tail = list(zip(symbols[-1000:].tolist(), timestamps[-1000:].tolist(), prices[-1000:].tolist()))
+
+    def single():
+        for tick in tail:
+            resampler.update(*tick)
+
+    samples = measure(single, 1, warmup=0)
+    results.append(summarize('resample_tick[x1000]', [s / 1000 for s in samples], ops=1000 / samples[0]))
+    return results
+
+
+ALERT_CONDITIONS = ['RSI(14) < {low}', 'RSI(14) > {high}', 'price crosses EMA(50)',
+                    'within {pct}% of support', 'within {pct}% of resistance',
+                    'EMA(20) crosses above EMA(50)', 'RSI(7) >= {high}', 'price < {level}']
+
+
+def bench_alerts(quick):
+    """Alarm-Regeln kompilieren und einen neuen Tag für alle Instrumente auswerten"""
+    import alerts
+
+    rules_count = 2000 if quick else 10000
+    symbols = [f'I{n:02d}' for n in range(50)]
+    rng = np.random.default_rng(0)
+    rules = []
+    for n in range(rules_count):
+        template = ALERT_CONDITIONS[n % len(ALERT_CONDITIONS)]
+        condition = template.format(low=int(rng.integers(10, 45)), high=int(rng.integers(55, 90)),
+                                    pct=round(float(rng.uniform(0.1, 3)), 1), level=round(float(rng.uniform(0.9, 1.1)), 3))
+        rules.append({'id': str(n), 'symbol': symbols[int(rng.integers(0, 50))], 'condition': condition})
+
+    repeat = 100
+    prices = random_prices(300 + repeat + 1, len(symbols))
+    dates = [(date(2020, 1, 1) + timedelta(days=n)).isoformat() for n in range(len(prices))]
+
+    results = [summarize(f'alerts_compile[{rules_count}]', measure(lambda: alerts.compile_rules(rules), 3))]
+
+    engine = alerts.AlertEngine()
+    engine.load(alerts.compile_rules(rules))
+    engine.update(dates[:300], prices[:300], symbols)
+    rows = iter(range(300, len(prices)))
+
+    def step():
+        row = next(rows)
+        engine.update(dates[row:row + 1], prices[row:row + 1], symbols)
+
+    results.append(summarize(f'alerts_update[{rules_count}x50]', measure(step, repeat)))
+    return results
+
+
+COLD_SCRIPT = """
+import time
+import app
+start = time.perf_counter()
+response = app.app.test_client().get('/api/rates')
+print(time.perf_counter() - start, response.status_code)
+"""
+
+
+def cold_rates(quick):
+    """Erster /api/rates-Aufruf, der den Cache inline berechnet - pro Messung
+    ein neuer Prozess ohne Snapshot, die Kurse liegen schon auf der Platte"""
+    workdir = tempfile.mkdtemp()
+    env = dict(os.environ, CACHE_BACKEND='memory', STATE_SNAPSHOT=os.path.join(workdir, 'state.json'))
+
+    def run():
+        if os.path.exists(env['STATE_SNAPSHOT']):
+            os.unlink(env['STATE_SNAPSHOT'])
+        out = subprocess.run([sys.executable, '-c', COLD_SCRIPT], cwd=ROOT, env=env,
+                             capture_output=True, text=True, check=True)
+        seconds, status = out.stdout.split()[-2:]
+        assert status == '200', out.stdout
+        return float(seconds)
+
+    run()   # füllt RATE_STORE, falls noch leer
+    return [run() for _ in range(5 if quick else 15)]
+
+
+def bench_endpoints(quick):
+    results = [summarize('cold /api/rates', cold_rates(quick))]
+
+    import app
+
+    client = app.app.test_client()
+    repeat = 200 if quick else 2000
+    for path, headers in [
+        ('/api/rates', {}),
+        ('/api/rates', {'Accept-Encoding': 'gzip'}),
+        ('/api/news', {}),
+        ('/api/calendar', {}),
+        ('/api/indicators?ema=20,50,200&rsi=14&sr=20', {}),
+        ('/api/correlation?windows=20,60', {}),
+    ]:
+        name = path + (' (gzip)' if headers else '')
+        results.append(summarize(name, measure(lambda: client.get(path, headers=headers), repeat, warmup=5)))
+
+    return results
+
+
+STARTUP_SCRIPT = """
+import time
+start = time.perf_counter()
+import app
+response = app.app.test_client().get('/api/rates')
+print(time.perf_counter() - start, app.STARTUP_SECONDS, response.status_code)
+"""
+
+
+def bench_startup(stub_url, quick):
+    """Neuer Prozess bis zur ersten /api/rates-Antwort: ohne Daten auf der
+    Platte und mit Startup-Snapshot (state_snapshot.py)"""
+    workdir = tempfile.mkdtemp()
+    snapshot = os.path.join(workdir, 'state.json')
+    env = dict(os.environ, FRANKFURTER_URL=stub_url, CACHE_BACKEND='memory',
+               RATE_STORE=os.path.join(workdir, 'rates'), STATE_SNAPSHOT=snapshot)
+
+    def run():
+        out = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], cwd=ROOT, env=env,
+                             capture_output=True, text=True, check=True)
+        first, startup, status = out.stdout.split()[-3:]
+        assert status == '200', out.stdout
+        return float(first), float(startup)
+
+    repeat = 3 if quick else 5
+    cold, warm = [], []
+    for _ in range(repeat):
+        shutil.rmtree(env['RATE_STORE'], ignore_errors=True)
+        if os.path.exists(snapshot):
+            os.unlink(snapshot)
+        cold.append(run())
+    # Der letzte Lauf hat beim Beenden den Snapshot geschrieben
+    for _ in range(repeat):
+        warm.append(run())
+
+    return [
+        summarize('startup import app (snapshot)', [startup for _, startup in warm]),
+        summarize('startup cold /api/rates', [first for first, _ in cold]),
+        summarize('startup snapshot /api/rates', [first for first, _ in warm]),
+    ]
+
+
+def bench_gunicorn(stub_url, quick, workers=2, threads=8, clients=16):
+    port = 18000 + os.getpid() % 1000
+    env = dict(os.environ, FRANKFURTER_URL=stub_url, CACHE_BACKEND='sqlite',
+               CACHE_PATH=os.path.join(tempfile.mkdtemp(), 'cache.sqlite3'))
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'app:app', '--worker-class', 'gthread',
+         '--workers', str(workers), '--threads', str(threads), '--bind', f'127.0.0.1:{port}',
+         '--log-level', 'warning'],
+        cwd=ROOT, env=env)
+    base = f'http://127.0.0.1:{port}'
+    results = []
+
+    try:
+        for _ in range(100):
+            try:
+                requests.get(base + '/health', timeout=1)
+                break
+            except requests.RequestException:
+                time.sleep(0.1)
+        # Caches füllen, bevor gemessen wird
+        for path in ('/api/rates', '/api/news', '/api/calendar'):
+            requests.get(base + path, timeout=30)
+
+        per_client = 50 if quick else 500
+        for path in ('/api/rates', '/api/news', '/api/calendar'):
+            samples = []
+            lock = threading.Lock()
+
+            def worker():
+                session = requests.Session()
+                local = []
+                for _ in range(per_client):
+                    start = time.perf_counter()
+                    session.get(base + path, timeout=30)
+                    local.append(time.perf_counter() - start)
+                with lock:
+                    samples.extend(local)
+
+            start = time.perf_counter()
+            pool = [threading.Thread(target=worker) for _ in range(clients)]
+            for t in pool:
+                t.start()
+            for t in pool:
+                t.join()
+            elapsed = time.perf_counter() - start
+            results.append(summarize(f'gunicorn {path}', samples, ops=len(samples) / elapsed))
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+    return results
+
+
+def load_fixture():
+    """Fixture laden und die Daten so verschieben, dass der letzte Tag der
+    letzte Werktag vor heute ist (Verschiebung in ganzen Wochen)"""
+    with open(FIXTURE) as f:
+        rates = json.load(f)['rates']
+    last = date.fromisoformat(max(rates))
+    weeks = (date.today() - last).days // 7
+    shift = timedelta(weeks=weeks)
+    return {(date.fromisoformat(d) + shift).isoformat(): r for d, r in rates.items()}
+
+
+def record_fixture(days=420):
+    """Zeitreihe (Basis USD) von der echten Frankfurter API aufnehmen"""
+    end = date.today()
+    start = end - timedelta(days=days)
+    response = requests.get(f'https://api.frankfurter.app/{start}..{end}', params={'from': 'USD'}, timeout=30)
+    response.raise_for_status()
+    with open(FIXTURE, 'w') as f:
+        json.dump(response.json(), f, separators=(',', ':'), sort_keys=True)
+    print(f"Fixture aufgenommen: {FIXTURE}")
+
+
+def compare(results, baseline, tolerance, min_delta):
+    regressions = []
+    print(f"\n{'Messung':48} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'ops/s':>12}  Baseline")
+    for r in results:
+        base = baseline.get(r['name'])
+        note = ''
+        if base:
+            ratio = r['p50'] / base['p50'] if base['p50'] else 1.0
+            note = f'{ratio:5.2f}x'
+            if ratio > 1 + tolerance and r['p50'] - base['p50'] > min_delta:
+                note += '  REGRESSION'
+                regressions.append(r['name'])
+        print(f"{r['name']:48} {r['p50']:10.3f} {r['p95']:10.3f} {r['p99']:10.3f} {r['ops']:12.1f}  {note}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Trading-Backend Benchmarks')
+    parser.add_argument('--only', choices=['indicators', 'feed', 'alerts', 'endpoints', 'startup', 'gunicorn'])
+    parser.add_argument('--gunicorn', action='store_true', help='auch unter gunicorn messen')
+    parser.add_argument('--quick', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='erlaubte p50-Abweichung')
+    parser.add_argument('--min-delta', type=float, default=0.2,
+                        help='kleinere p50-Abweichungen (ms) gelten als Rauschen')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--output', help='Ergebnisse zusätzlich als JSON schreiben')
+    parser.add_argument('--record', action='store_true')
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixture()
+        return 0
+
+    stub = StubServer(load_fixture())
+    os.environ['FRANKFURTER_URL'] = stub.start()
+    # Kursdateien und Snapshot des Stubs nicht mit denen des echten Dienstes mischen
+    workdir = tempfile.mkdtemp()
+    os.environ['RATE_STORE'] = os.path.join(workdir, 'rates')
+    os.environ['STATE_SNAPSHOT'] = os.path.join(workdir, 'state.json')
+
+    groups = [args.only] if args.only else ['indicators', 'feed', 'alerts', 'endpoints', 'startup'] + (['gunicorn'] if args.gunicorn else [])
+    results = []
+    for group in groups:
+        if group == 'indicators':
+            results += bench_indicators(args.quick)
+        elif group == 'feed':
+            results += bench_feed(args.quick)
+        elif group == 'alerts':
+            results += bench_alerts(args.quick)
+        elif group == 'endpoints':
+            results += bench_endpoints(args.quick)
+        elif group == 'startup':
+            results += bench_startup(stub.url, args.quick)
+        else:
+            results += bench_gunicorn(stub.url, args.quick)
+
+    baseline = {}
+    if os.path.exists(BASELINE):
+        with open(BASELINE) as f:
+            baseline = {r['name']: r for r in json.load(f)}
+
+    regressions = compare(results, baseline, args.tolerance, args.min_delta)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        merged = dict(baseline, **{r['name']: r for r in results})
+        with open(BASELINE, 'w') as f:
+            json.dump(sorted(merged.values(), key=lambda r: r['name']), f, indent=2)
+        print(f"\nBaseline gespeichert: {BASELINE}")
+        return 0
+
+    if regressions:
+        print(f"\n{len(regressions)} Regression(en): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""Cache-Backends für analysis/news/calendar.
+
+MemoryCache hält die Einträge pro Prozess. SQLiteCache legt sie in eine
+gemeinsame Datei, damit alle gunicorn-Worker denselben Stand lesen und nur
+einer (der Inhaber der Lease) die Upstream-Daten neu berechnet. Die Datei
+(CACHE_PATH) liegt standardmäßig in state/ neben app.py, nur für den eigenen
+Nutzer lesbar.
+
+Ein Eintrag ist ein Dict {'data', 'timestamp', 'generation'}; timestamp ist
+ein Unix-Zeitstempel, generation steigt bei jedem Schreiben um eins.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryCache:
+    """Cache im Prozess-Speicher (ein Worker)"""
+
+    def __init__(self):
+        self._entries = {}
+        self._leases = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        return self._entries.get(name)
+
+    def set(self, name, data, timestamp=None):
+        with self._lock:
+            old = self._entries.get(name)
+            generation = old['generation'] + 1 if old else 1
+            # Neues Dict statt Update - Leser sehen immer einen ganzen Eintrag
+            self._entries[name] = {
+                'data': data,
+                'timestamp': timestamp or time.time(),
+                'generation': generation
+            }
+        return generation
+
+    def acquire(self, name, owner, ttl=60):
+        now = time.time()
+        with self._lock:
+            holder = self._leases.get(name)
+            if holder and holder[0] != owner and holder[1] > now:
+                return False
+            self._leases[name] = (owner, now + ttl)
+            return True
+
+    def release(self, name, owner):
+        with self._lock:
+            if self._leases.get(name, (None,))[0] == owner:
+                del self._leases[name]
+
+
+class SQLiteCache:
+    """Cache in einer SQLite-Datei, gemeinsam für alle Worker eines Hosts"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        # Zuletzt gelesener Eintrag pro Name - JSON wird nur bei neuer
+        # Generation erneut geparst
+        self._seen = {}
+        with self._connect() as db:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('''CREATE TABLE IF NOT EXISTS entries (
+                name TEXT PRIMARY KEY,
+                generation INTEGER NOT NULL,
+                timestamp REAL NOT NULL,
+                data TEXT NOT NULL)''')
+            db.execute('''CREATE TABLE IF NOT EXISTS leases (
+                name TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires REAL NOT NULL)''')
+
+    def _connect(self):
+        # Eine Verbindung pro Thread und Prozess (nie über einen Fork teilen)
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=10)
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def get(self, name):
+        db = self._connect()
+        row = db.execute('SELECT generation FROM entries WHERE name = ?', (name,)).fetchone()
+        if not row:
+            return None
+
+        seen = self._seen.get(name)
+        if seen and seen['generation'] == row[0]:
+            return seen
+
+        row = db.execute(
+            'SELECT generation, timestamp, data FROM entries WHERE name = ?', (name,)
+        ).fetchone()
+        entry = {'data': json.loads(row[2]), 'timestamp': row[1], 'generation': row[0]}
+        self._seen[name] = entry
+        return entry
+
+    def set(self, name, data, timestamp=None):
+        payload = json.dumps(data)
+        timestamp = timestamp or time.time()
+        db = self._connect()
+        # Eine Transaktion - andere Worker sehen den alten oder den neuen Stand
+        with db:
+            db.execute('''INSERT INTO entries (name, generation, timestamp, data)
+                VALUES (?, 1, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    generation = generation + 1,
+                    timestamp = excluded.timestamp,
+                    data = excluded.data''', (name, timestamp, payload))
+            row = db.execute('SELECT generation FROM entries WHERE name = ?', (name,)).fetchone()
+        return row[0]
+
+    def acquire(self, name, owner, ttl=60):
+        now = time.time()
+        db = self._connect()
+        with db:
+            db.execute('INSERT OR IGNORE INTO leases (name, owner, expires) VALUES (?, ?, 0)',
+                       (name, owner))
+            cursor = db.execute('''UPDATE leases SET owner = ?, expires = ?
+                WHERE name = ? AND (owner = ? OR expires < ?)''',
+                                (owner, now + ttl, name, owner, now))
+        return cursor.rowcount == 1
+
+    def release(self, name, owner):
+        db = self._connect()
+        with db:
+            db.execute('DELETE FROM leases WHERE name = ? AND owner = ?', (name, owner))
+
+
+class LRUCache:
+    """Begrenzter Memo-Cache (least recently used) mit Treffer-Zählern"""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'size': len(self._entries), 'maxsize': self.maxsize}
+
+
+# Nicht im geteilten /tmp: eine dort vorab angelegte Datei könnte allen
+# Workern Einträge und Leases unterschieben
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'state', 'trading-cache.sqlite3')
+
+
+def make_cache(kind=None, path=None):
+    """Backend laut CACHE_BACKEND ('memory' oder 'sqlite') erzeugen"""
+    kind = kind or os.environ.get('CACHE_BACKEND', 'memory')
+    if kind == 'sqlite':
+        path = path or os.environ.get('CACHE_PATH', DEFAULT_PATH)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), mode=0o700, exist_ok=True)
+        return SQLiteCache(path)
+    return MemoryCache()
@@ -0,0 +1,308 @@
+"""Wirtschaftskalender: Termine aus ICS-, JSON- oder CSV-Dateien, indiziert
+für Datumsbereichs-Abfragen.
+
+- alle Termine nach (Datum, Uhrzeit) sortiert, jeder genau einmal als JSON
+  serialisiert
+- pro Filter (alle, Währung, Impact, Währung+Impact) ein fertiger JSON-Block
+  mit allen passenden Terminen und pro Tag die Position seiner Bytes darin
+- eine Abfrage from/to sucht per bisect den Tagesbereich im passenden Index
+  und schneidet ihn aus dem Block aus - ohne Scan über die Termine
+
+Ohne Kalenderdateien (CALENDAR_FILES) gibt es die Standardwoche des
+Dashboards (WEEKLY_EVENTS) für die Wochen um heute.
+"""
+import csv
+import json
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from datetime import date, datetime, timedelta, timezone
+
+CALENDAR_URL = 'https://de.investing.com/economic-calendar/'
+
+IMPACTS = ('low', 'medium', 'high')
+
+# Wiederkehrende Termine pro Wochentag (0 = Montag)
+WEEKLY_EVENTS = {
+    0: [
+        ('10:00', 'EUR', 'Eurozone Industrieproduktion', 'medium'),
+        ('14:30', 'USD', 'US Einzelhandelsumsätze', 'high'),
+    ],
+    1: [
+        ('11:00', 'EUR', 'Deutsche ZEW Konjunkturerwartungen', 'high'),
+        ('14:30', 'USD', 'US CPI Verbraucherpreise', 'high'),
+    ],
+    2: [
+        ('14:30', 'USD', 'US PPI Erzeugerpreise', 'high'),
+        ('20:00', 'USD', 'FOMC Sitzungsprotokoll', 'high'),
+    ],
+    3: [
+        ('08:00', 'GBP', 'UK BIP-Wachstum', 'high'),
+        ('14:30', 'USD', 'US Erstanträge Arbeitslosenhilfe', 'medium'),
+    ],
+    4: [
+        ('14:30', 'USD', 'US Arbeitsmarktbericht (NFP)', 'high'),
+        ('16:00', 'USD', 'US Uni Michigan Vertrauen', 'medium'),
+    ],
+}
+
+
+class Event(namedtuple('Event', 'day time currency event impact url')):
+    """Ein Termin; day ist ein date, time 'HH:MM' (leer bei ganztägigen)"""
+    __slots__ = ()
+
+    def to_dict(self):
+        return {'date': self.day.isoformat(), 'time': self.time, 'currency': self.currency,
+                'event': self.event, 'impact': self.impact, 'url': self.url}
+
+
+def make_event(day, time='', currency='', event='', impact='', url=''):
+    """Event mit normalisierten Feldern (Währung groß, Impact low/medium/high)"""
+    if isinstance(day, str):
+        day = date.fromisoformat(day.strip()[:10])
+    impact = (impact or 'low').strip().lower()
+    if impact not in IMPACTS:
+        raise ValueError(f'Unbekannter Impact: {impact}')
+    return Event(day, (time or '').strip()[:5], (currency or '').strip().upper(),
+                 (event or '').strip(), impact, (url or '').strip() or CALENDAR_URL)
+
+
+def load_json(path):
+    """Liste von Objekten mit date (oder datetime), time, currency, event, impact, url"""
+    with open(path, encoding='utf-8') as f:
+        rows = json.load(f)
+    if isinstance(rows, dict):
+        rows = rows.get('events', [])
+    return [_from_row(row) for row in rows]
+
+
+def load_csv(path):
+    """CSV mit Kopfzeile date,time,currency,event,impact[,url]"""
+    with open(path, encoding='utf-8', newline='') as f:
+        return [_from_row(row) for row in csv.DictReader(f)]
+
+
+def _from_row(row):
+    day, time = row.get('date', ''), row.get('time', '')
+    if 'datetime' in row:
+        moment = _local(datetime.fromisoformat(row['datetime']))
+        day, time = moment.date(), moment.strftime('%H:%M')
+    return make_event(day, time, row.get('currency'), row.get('event'),
+                      row.get('impact'), row.get('url'))
+
+
+def load_ics(path):
+    """VEVENTs einer iCalendar-Datei. Währung aus X-CURRENCY oder CATEGORIES,
+    Impact aus X-IMPACT oder PRIORITY (1-4 high, 5 medium, sonst low)."""
+    events = []
+    props = None
+    for line in _unfold(path):
+        if line == 'BEGIN:VEVENT':
+            props = {}
+        elif line == 'END:VEVENT' and props is not None:
+            if 'DTSTART' in props:
+                events.append(_from_ics(props))
+            props = None
+        elif props is not None and ':' in line:
+            name, value = line.split(':', 1)
+            name, _, params = name.partition(';')
+            props[name.upper()] = (value, params)
+    return events
+
+
+def _unfold(path):
+    # Folgezeilen (beginnen mit Leerzeichen/Tab) gehören zur vorherigen Zeile
+    with open(path, encoding='utf-8') as f:
+        current = None
+        for line in f:
+            line = line.rstrip('\r\n')
+            if line[:1] in (' ', '\t') and current is not None:
+                current += line[1:]
+                continue
+            if current is not None:
+                yield current
+            current = line
+        if current is not None:
+            yield current
+
+
+def _from_ics(props):
+    value, params = props['DTSTART']
+    if 'VALUE=DATE' in params.upper() or len(value) == 8:
+        day, time = datetime.strptime(value[:8], '%Y%m%d').date(), ''
+    else:
+        moment = datetime.strptime(value.rstrip('Z'), '%Y%m%dT%H%M%S')
+        if value.endswith('Z'):
+            moment = _local(moment.replace(tzinfo=timezone.utc))
+        day, time = moment.date(), moment.strftime('%H:%M')
+
+    text = lambda name: _ics_text(props.get(name, ('', ''))[0])
+    currency = text('X-CURRENCY') or text('CATEGORIES').split(',')[0]
+    impact = text('X-IMPACT')
+    if not impact and text('PRIORITY').isdigit():
+        priority = int(text('PRIORITY'))
+        impact = 'high' if 1 <= priority <= 4 else 'medium' if priority == 5 else 'low'
+    return make_event(day, time, currency, text('SUMMARY'), impact, text('URL'))
+
+
+def _ics_text(value):
+    return value.replace('\\n', ' ').replace('\\,', ',').replace('\\;', ';').replace('\\\\', '\\')
+
+
+def _local(moment):
+    # Zeiten mit Zeitzone in Ortszeit, wie datetime.now() im Dashboard
+    return moment.astimezone().replace(tzinfo=None) if moment.tzinfo else moment
+
+
+LOADERS = {'.ics': load_ics, '.json': load_json, '.csv': load_csv}
+
+
+def load(path):
+    """Termine einer Datei, Format laut Endung"""
+    loader = LOADERS.get(os.path.splitext(path)[1].lower())
+    if loader is None:
+        raise ValueError(f'Unbekanntes Kalenderformat: {path}')
+    return loader(path)
+
+
+def weekly(start, end, template=None):
+    """Termine der Standardwoche für alle Tage von start bis end"""
+    template = WEEKLY_EVENTS if template is None else template
+    events = []
+    day = start
+    while day <= end:
+        for time, currency, event, impact in template.get(day.weekday(), []):
+            events.append(make_event(day, time, currency, event, impact))
+        day += timedelta(days=1)
+    return events
+
+
+class _Index(namedtuple('_Index', 'days starts ends body')):
+    """Ein Filter: alle passenden Termine als ein JSON-Block (body, kommagetrennt)
+    und pro Tag mit Terminen (days, Ordinalzahlen, sortiert) Anfang und Ende
+    seiner Bytes"""
+    __slots__ = ()
+
+    @classmethod
+    def build(cls, by_day):
+        days, starts, ends, parts = [], [], [], []
+        offset = 0
+        for day, chunks in by_day.items():
+            chunk = b','.join(chunks)
+            if parts:
+                offset += 1     # Komma zwischen den Tagen
+            days.append(day)
+            starts.append(offset)
+            offset += len(chunk)
+            ends.append(offset)
+            parts.append(chunk)
+        return cls(days, starts, ends, b','.join(parts))
+
+    def span(self, first, last):
+        return bisect_left(self.days, first), bisect_right(self.days, last)
+
+
+class EventCalendar:
+    """Unveränderlicher Index über eine Menge von Terminen"""
+
+    def __init__(self, events):
+        self.events = sorted(events, key=lambda e: (e.day, e.time, e.currency, e.event))
+        serialized = [json.dumps(e.to_dict(), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+                      for e in self.events]
+
+        # Schlüssel (Währung oder None, Impact oder None) -> Tag -> JSON-Teile
+        buckets = {}
+        for event, body in zip(self.events, serialized):
+            day = event.day.toordinal()
+            for key in ((None, None), (event.currency, None), (None, event.impact),
+                        (event.currency, event.impact)):
+                by_day = buckets.setdefault(key, {})
+                by_day.setdefault(day, []).append(body)
+
+        # Die Termine sind sortiert, also auch die Tage jedes Index
+        self.indexes = {key: _Index.build(by_day) for key, by_day in buckets.items()}
+        self.currencies = sorted({e.currency for e in self.events})
+
+    def __len__(self):
+        return len(self.events)
+
+    def _index(self, currency, impact):
+        return self.indexes.get((currency.upper() if currency else None,
+                                 impact.lower() if impact else None))
+
+    def query_json(self, start, end, currency=None, impact=None):
+        """Termine von start bis end (inklusive) als JSON-Array (bytes) -
+        ein zusammenhängender Ausschnitt aus dem vorserialisierten Block"""
+        index = self._index(currency, impact)
+        if index is None:
+            return b'[]'
+        lo, hi = index.span(start.toordinal(), end.toordinal())
+        if lo == hi:
+            return b'[]'
+        return b'[' + index.body[index.starts[lo]:index.ends[hi - 1]] + b']'
+
+    def query(self, start, end, currency=None, impact=None):
+        """Wie query_json, aber als Liste von Dicts"""
+        return json.loads(self.query_json(start, end, currency, impact))
+
+
+class CalendarStore:
+    """Kalender aus Dateien; refresh() liest neu ein, sobald sich eine ändert.
+
+    Der Index wird neu gebaut und als Ganzes ausgetauscht - Abfragen sehen
+    immer einen vollständigen Stand. refresh() ist billig (nur os.stat) und
+    kann vor jeder Abfrage aufgerufen werden; gebaut wird höchstens einmal
+    gleichzeitig."""
+
+    def __init__(self, paths=(), weeks=8):
+        self.paths = list(paths)
+        self.weeks = weeks
+        self.calendar = EventCalendar([])
+        self.generation = 0
+        self._state = None
+        self._lock = threading.Lock()
+
+    def refresh(self, today=None):
+        """Index neu bauen, wenn sich Dateien (oder ohne Dateien: die Woche) geändert haben"""
+        with self._lock:
+            return self._refresh(today)
+
+    def _refresh(self, today):
+        if self.paths:
+            state = []
+            for path in self.paths:
+                try:
+                    stat = os.stat(path)
+                    state.append((path, stat.st_mtime_ns, stat.st_size))
+                except OSError as e:
+                    print(f"Calendar file error for {path}: {e}")
+            state = tuple(state)
+        else:
+            today = today or date.today()
+            state = today - timedelta(days=today.weekday())
+
+        if state == self._state:
+            return False
+
+        if self.paths:
+            events = []
+            for path, _, _ in state:
+                try:
+                    events.extend(load(path))
+                except (OSError, ValueError, KeyError, csv.Error) as e:
+                    print(f"Calendar file error for {path}: {e}")
+        else:
+            events = weekly(state - timedelta(weeks=self.weeks),
+                            state + timedelta(weeks=self.weeks, days=6))
+
+        self.calendar = EventCalendar(events)
+        self.generation += 1
+        self._state = state
+        return True
+
+
+def from_env():
+    """CalendarStore für die Dateien in CALENDAR_FILES (kommagetrennt)"""
+    paths = [p.strip() for p in os.getenv('CALENDAR_FILES', '').split(',') if p.strip()]
+    return CalendarStore(paths)
@@ -0,0 +1,321 @@
+"""Kursquellen für die Analyse: EZB-Tageskurse und Intraday-Ticks.
+
+DailyFeed liefert wie bisher die Tagesfixings der Frankfurter API - für
+jedes Intervall dieselbe Reihe. IntradayFeed baut aus Ticks echte H1/H4/D1
+Bars (OHLC). Die Ticks kommen aus einer Tick-Quelle, z.B. CSVTickSource, die
+eine CSV-Datei abspielt und danach weiter liest, was angehängt wird.
+
+Beide Feeds haben dieselbe Schnittstelle: closes(symbol, interval, limit).
+
+Bars werden inkrementell fortgeschrieben: pro Instrument und Zeitrahmen gibt
+es die laufende Bar und einen Ring fester Größe mit den abgeschlossenen Bars.
+Der Speicher ist damit pro Instrument und Zeitrahmen begrenzt. Im Batch
+(ein ganzer Block Ticks) wird mit NumPy gruppiert (reduceat), nicht Tick
+für Tick.
+
+    TICK_FEED=ticks.csv gunicorn app:app
+"""
+import os
+
+import numpy as np
+
+import instruments
+
+# Zeitrahmen in Sekunden; Bars beginnen an vollen Stunden bzw. um 00:00 UTC
+TIMEFRAMES = {'1h': 3600, '4h': 4 * 3600, '1d': 86400}
+
+# Abgeschlossene Bars pro Instrument und Zeitrahmen
+DEFAULT_CAPACITY = 500
+
+
+class DailyFeed:
+    """EZB-Tageskurse aus der gemeinsamen Kursmatrix (RateHistory)"""
+
+    def __init__(self, history):
+        self.history = history
+
+    def closes(self, symbol, interval='1d', limit=100):
+        """Tageskurse, älteste zuerst - das Intervall spielt keine Rolle,
+        die EZB veröffentlicht nur ein Fixing pro Tag"""
+        instrument = instruments.get(symbol)
+        if not instrument:
+            return None
+        self.history.ensure_fresh()
+        currencies = instruments.currencies([instrument])
+        rates = self.history.matrix(currencies, limit)
+        return instruments.price_matrix(rates, currencies, [instrument])[:, 0].tolist()
+
+
+class BarRing:
+    """Die letzten `capacity` abgeschlossenen Bars in festen Arrays"""
+
+    __slots__ = ('capacity', 'start', 'open', 'high', 'low', 'close', 'head', 'size')
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.start = np.zeros(capacity, dtype=np.int64)
+        self.open = np.zeros(capacity)
+        self.high = np.zeros(capacity)
+        self.low = np.zeros(capacity)
+        self.close = np.zeros(capacity)
+        self.head = 0       # nächste Schreibposition
+        self.size = 0
+
+    def push(self, start, open_, high, low, close):
+        i = self.head
+        self.start[i], self.open[i], self.high[i], self.low[i], self.close[i] = start, open_, high, low, close
+        self.head = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def extend(self, start, open_, high, low, close):
+        """Mehrere Bars (Arrays, älteste zuerst) auf einmal anhängen"""
+        n = len(start)
+        if n > self.capacity:
+            # Nur die jüngsten passen in den Ring
+            start, open_, high, low, close = (a[-self.capacity:] for a in (start, open_, high, low, close))
+            self.head = (self.head + n - self.capacity) % self.capacity
+            n = self.capacity
+        index = (self.head + np.arange(n)) % self.capacity
+        self.start[index] = start
+        self.open[index] = open_
+        self.high[index] = high
+        self.low[index] = low
+        self.close[index] = close
+        self.head = (self.head + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def ordered(self, field, limit=None):
+        """Werte eines Feldes ('start', 'open', ...) in zeitlicher Reihenfolge"""
+        size = self.size if limit is None else min(limit, self.size)
+        index = (self.head - size + np.arange(size)) % self.capacity
+        return getattr(self, field)[index]
+
+
+class BarSeries:
+    """Bars eines Instruments in einem Zeitrahmen: laufende Bar plus Ring"""
+
+    __slots__ = ('seconds', 'bars', 'current')
+
+    def __init__(self, seconds, capacity=DEFAULT_CAPACITY):
+        self.seconds = seconds
+        self.bars = BarRing(capacity)
+        self.current = None     # [start, open, high, low, close] der laufenden Bar
+
+    def update(self, timestamp, price):
+        """Ein Tick; Ticks vor der laufenden Bar werden ignoriert"""
+        start = int(timestamp // self.seconds) * self.seconds
+        current = self.current
+        if current is None or start > current[0]:
+            if current is not None:
+                self.bars.push(*current)
+            self.current = [start, price, price, price, price]
+        elif start == current[0]:
+            if price > current[2]:
+                current[2] = price
+            elif price < current[3]:
+                current[3] = price
+            current[4] = price
+
+    def update_batch(self, timestamps, prices):
+        """Ein Block Ticks (zeitlich sortiert) in einem Durchlauf"""
+        starts = (timestamps // self.seconds).astype(np.int64) * self.seconds
+        current = self.current
+        if current is not None:
+            keep = starts >= current[0]
+            if not keep.all():
+                starts, prices = starts[keep], prices[keep]
+        if not len(starts):
+            return
+
+        first = np.concatenate([[0], np.flatnonzero(np.diff(starts)) + 1])
+        last = np.concatenate([first[1:] - 1, [len(starts) - 1]])
+        bar_start = starts[first]
+        bar_open = prices[first]
+        bar_high = np.maximum.reduceat(prices, first)
+        bar_low = np.minimum.reduceat(prices, first)
+        bar_close = prices[last]
+
+        if current is not None:
+            if bar_start[0] == current[0]:
+                # Erste Gruppe gehört noch zur laufenden Bar
+                bar_open[0] = current[1]
+                bar_high[0] = max(bar_high[0], current[2])
+                bar_low[0] = min(bar_low[0], current[3])
+            else:
+                self.bars.push(*current)
+
+        if len(bar_start) > 1:
+            self.bars.extend(bar_start[:-1], bar_open[:-1], bar_high[:-1], bar_low[:-1], bar_close[:-1])
+        self.current = [int(bar_start[-1]), float(bar_open[-1]), float(bar_high[-1]),
+                        float(bar_low[-1]), float(bar_close[-1])]
+
+    def closes(self, limit=None, include_current=True):
+        closes = self.bars.ordered('close', limit).tolist()
+        if include_current and self.current is not None:
+            closes.append(self.current[4])
+            if limit is not None and len(closes) > limit:
+                closes = closes[-limit:]
+        return closes
+
+    def __len__(self):
+        return self.bars.size + (self.current is not None)
+
+
+class Resampler:
+    """Bars aller Instrumente und Zeitrahmen aus einem Tick-Strom"""
+
+    def __init__(self, timeframes=tuple(TIMEFRAMES), capacity=DEFAULT_CAPACITY, symbols=None):
+        self.timeframes = {tf: TIMEFRAMES[tf] for tf in timeframes}
+        self.capacity = capacity
+        self.symbols = set(symbols) if symbols else None    # None = alle
+        self.series = {}        # (symbol, timeframe) -> BarSeries
+        self.ticks = 0
+
+    def _series(self, symbol):
+        if (symbol, next(iter(self.timeframes))) not in self.series:
+            for tf, seconds in self.timeframes.items():
+                self.series[(symbol, tf)] = BarSeries(seconds, self.capacity)
+        return [self.series[(symbol, tf)] for tf in self.timeframes]
+
+    def update(self, symbol, timestamp, price):
+        symbol = _symbol(symbol)
+        if self.symbols is not None and symbol not in self.symbols:
+            return
+        for series in self._series(symbol):
+            series.update(timestamp, price)
+        self.ticks += 1
+
+    def update_batch(self, symbols, timestamps, prices):
+        """Ticks als parallele Arrays; innerhalb eines Symbols zeitlich sortiert.
+        Symbole wie 'EUR/USD' oder b'eurusd' werden zu 'EURUSD'."""
+        symbols = np.asarray(symbols)
+        # Kurze Byte-Strings als uint64 gruppieren - viel schneller als Strings zu sortieren
+        keys = symbols.view(np.uint64) if symbols.dtype == np.dtype('S8') else symbols
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+
+        normalized = [_symbol(name) for name in symbols[first].tolist()]
+        names = sorted(set(normalized))
+        lookup = {name: k for k, name in enumerate(names)}
+        codes = np.array([lookup[name] for name in normalized])[inverse]
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(names) + 1))
+
+        for k, symbol in enumerate(names):
+            if self.symbols is not None and symbol not in self.symbols:
+                continue
+            index = order[bounds[k]:bounds[k + 1]]
+            ts, px = timestamps[index], prices[index]
+            if len(ts) > 1 and (np.diff(ts) < 0).any():
+                sort = np.argsort(ts, kind='stable')
+                ts, px = ts[sort], px[sort]
+            for series in self._series(symbol):
+                series.update_batch(ts, px)
+            self.ticks += len(ts)
+
+    def get(self, symbol, interval):
+        return self.series.get((symbol, interval))
+
+
+class CSVTickSource:
+    """Ticks aus einer CSV-Datei mit Kopfzeile:
+
+        timestamp,symbol,price          oder
+        timestamp,symbol,bid,ask        (Mittelkurs)
+
+    timestamp ist Unix-Zeit in Sekunden (auch mit Nachkommastellen) oder
+    ISO-8601 in UTC, symbol höchstens 8 Zeichen (EURUSD, EUR/USD). read() liefert alle vollständigen Zeilen seit dem letzten
+    Aufruf - eine Datei, an die weiter geschrieben wird, wird so fortlaufend
+    abgespielt."""
+
+    def __init__(self, path, chunk_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.chunk_bytes = chunk_bytes
+        self.offset = 0
+        self.columns = None
+
+    def read(self):
+        """(symbols, timestamps, prices) der neuen Ticks oder None"""
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(self.chunk_bytes)
+        end = data.rfind(b'\n')
+        if end < 0:
+            return None
+        data = data[:end + 1]
+        self.offset += len(data)
+
+        if self.columns is None:
+            header, _, data = data.partition(b'\n')
+            self.columns = [c.strip() for c in header.decode().lower().split(',')]
+        if not data.strip():
+            return None
+        return self._parse(data.decode())
+
+    def _parse(self, text):
+        lines = text.splitlines()
+        index = {c: n for n, c in enumerate(self.columns)}
+        fields = ['timestamp', 'symbol'] + (['price'] if 'price' in index else ['bid', 'ask'])
+
+        # Zahlen direkt als float64 parsen (loadtxt in C), nur ISO-Zeitstempel als Text
+        first = lines[0].split(',')[index['timestamp']]
+        numeric = first.replace('.', '', 1).isdigit()
+        types = {'timestamp': np.float64 if numeric else 'U32', 'symbol': 'S8'}
+        dtype = [(f, types.get(f, np.float64)) for f in fields]
+        raw = np.loadtxt(lines, delimiter=',', dtype=dtype, usecols=[index[f] for f in fields], ndmin=1)
+
+        symbols = raw['symbol']
+        timestamps = raw['timestamp'] if numeric else _timestamps(raw['timestamp'])
+        if 'price' in index:
+            prices = raw['price']
+        else:
+            prices = (raw['bid'] + raw['ask']) / 2
+        return symbols, timestamps, prices
+
+
+def _symbol(name):
+    if isinstance(name, bytes):
+        name = name.decode()
+    return name.strip().upper().replace('/', '')
+
+
+def _timestamps(values):
+    """Unix-Sekunden (float64) aus ISO-Zeitstempeln in UTC"""
+    stamps = np.char.rstrip(values, 'Z').astype('datetime64[ms]')
+    return stamps.astype(np.int64) / 1000.0
+
+
+class IntradayFeed:
+    """H1/H4/D1 Bars aus einer Tick-Quelle"""
+
+    def __init__(self, source, timeframes=tuple(TIMEFRAMES), capacity=DEFAULT_CAPACITY, symbols=None):
+        self.source = source
+        self.resampler = Resampler(timeframes, capacity, symbols)
+
+    def poll(self):
+        """Neue Ticks der Quelle einarbeiten; liefert die Anzahl Ticks"""
+        total = 0
+        while True:
+            batch = self.source.read()
+            if batch is None:
+                return total
+            self.resampler.update_batch(*batch)
+            total += len(batch[0])
+
+    def has(self, symbol):
+        return any(self.resampler.get(symbol, tf) for tf in self.resampler.timeframes)
+
+    def closes(self, symbol, interval='1h', limit=100):
+        """Schlusskurse der letzten `limit` Bars inklusive der laufenden; None,
+        wenn es für das Instrument oder das Intervall keine Bars gibt"""
+        series = self.resampler.get(symbol, interval)
+        if series is None or not len(series):
+            return None
+        return series.closes(limit)
+
+
+def from_env(symbols=None):
+    """IntradayFeed laut TICK_FEED (Pfad einer Tick-CSV) oder None"""
+    path = os.environ.get('TICK_FEED')
+    if not path:
+        return None
+    return IntradayFeed(CSVTickSource(path), symbols=symbols)
@@ -0,0 +1,186 @@
+"""Gemeinsamer Kursverlauf aller Währungen (USD-Basis) von der Frankfurter API.
+
+Statt für jedes Paar und jedes Intervall dieselbe 100-Tage-Reihe erneut
+herunterzuladen, hält RateHistory die komplette Kursmatrix (Datum x Währung)
+im Speicher. Der erste Aufruf lädt das ganze Fenster, spätere Aktualisierungen
+holen nur noch die Tage nach dem letzten gespeicherten Datum.
+
+Mit einem RateStore (rate_store.py) kommt das Fenster beim Start aus den
+Dateien auf der Platte statt von der API, und neue Tage werden dort ergänzt.
+Mit einer Lease (mehrere Worker auf einem Store) fragt nur ihr Inhaber die
+API; die anderen lesen die neuen Tage aus dem Store.
+"""
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+import metrics
+from upstream import UpstreamError
+
+
+class RateHistory:
+    """USD-Basis Kursmatrix, einmal geladen und danach inkrementell ergänzt"""
+
+    def __init__(self, client, days=100, max_age=300, base='USD', store=None, lease=None):
+        self.client = client        # UpstreamClient für die Frankfurter API
+        self.store = store          # optionaler RateStore (gemeinsam für alle Prozesse)
+        self.lease = lease          # optional: () -> True, wenn dieser Prozess Upstream fragen darf
+        self.days = days            # Fenster in Kalendertagen
+        self.max_age = max_age      # Sekunden bis zur nächsten Aktualisierung
+        self.base = base
+        self.dates = []             # sortierte ISO-Daten
+        self.rates = {}             # Währung -> Kurse, parallel zu self.dates
+        self.version = 0            # steigt bei jeder Änderung der Daten
+        self.last_update = None
+        self.stale = False          # True, solange Upstream nicht erreichbar ist
+        self._lock = threading.Lock()
+
+    def ensure_fresh(self):
+        """Aktualisiert die Matrix, falls sie älter als max_age ist"""
+        with self._lock:
+            if self.last_update and time.time() - self.last_update < self.max_age:
+                return True
+            try:
+                self.stale = self._update()
+                return True
+            except UpstreamError as e:
+                # Letzten guten Stand weiter ausliefern, aber als veraltet markieren
+                print(f"Frankfurter history update error: {e}")
+                self.stale = bool(self.dates)
+                return False
+            except Exception as e:
+                print(f"Frankfurter history update error: {e}")
+                return False
+
+    def _update(self):
+        """Lädt neue Tage nach; True, wenn nur der letzte gute Stand kam"""
+        today = datetime.now().date()
+        dates = list(self.dates)
+        rates = {c: list(col) for c, col in self.rates.items()}
+
+        changed = stale = False
+        if self.store is not None:
+            # Was ein anderer Prozess (oder der Backfill) schon gespeichert hat
+            with metrics.STAGE_SECONDS.time(stage='store', instrument='all'):
+                after = dates[-1] if dates else (today - timedelta(days=self.days + 1)).isoformat()
+                changed |= _append(dates, rates, self._from_store(after))
+
+        if dates:
+            # Nur die Tage nach dem letzten bekannten Kurs nachladen
+            start = date.fromisoformat(dates[-1]) + timedelta(days=1)
+        else:
+            start = today - timedelta(days=self.days)
+
+        waiting = False
+        if start <= today and self.lease is not None and not self.lease():
+            # Ein anderer Worker holt die neuen Tage und schreibt sie in den
+            # RateStore - von dort kommen sie bei der nächsten Aktualisierung
+            stale = self.stale and not changed
+            waiting = not dates
+        elif start <= today:
+            with metrics.STAGE_SECONDS.time(stage='fetch', instrument='all'):
+                result = self.client.get_json(f'/{start.isoformat()}..', {'from': self.base})
+            rates_data = result.data.get('rates', {})
+            with metrics.STAGE_SECONDS.time(stage='parse', instrument='all'):
+                changed |= _append(dates, rates, rates_data)
+            stale = result.stale
+            if self.store is not None and not stale:
+                try:
+                    self.store.extend(rates_data)
+                except OSError as e:
+                    print(f"Rate store write error: {e}")
+
+        changed |= _trim(dates, rates, today - timedelta(days=self.days))
+
+        if changed:
+            # Neue Listen erst komplett aufbauen, dann tauschen - Leser sehen
+            # so nie einen halb aktualisierten Stand
+            self.dates, self.rates = dates, rates
+            self.version += 1
+        if not waiting:
+            # Noch gar keine Kurse: beim nächsten Aufruf gleich wieder im Store nachsehen
+            self.last_update = time.time()
+        return stale
+
+    def export(self):
+        """Daten und Kurse für den Startup-Snapshot"""
+        dates, rates = self.dates, self.rates
+        return {'base': self.base, 'dates': list(dates), 'rates': {c: list(col) for c, col in rates.items()}}
+
+    def restore(self, state):
+        """Stand aus einem Snapshot übernehmen, solange noch nichts geladen ist.
+        Die nächste Aktualisierung holt dann nur die Tage danach."""
+        with self._lock:
+            if self.dates or state.get('base') != self.base or not state.get('dates'):
+                return False
+            self.dates, self.rates = list(state['dates']), {c: list(col) for c, col in state['rates'].items()}
+            self.version += 1
+            return True
+
+    def _from_store(self, after):
+        """Tage nach dem ISO-Datum `after` aus dem RateStore, im Frankfurter-Format"""
+        self.store.refresh()
+        start = date.fromisoformat(after) + timedelta(days=1)
+        days = self.store.dates(start)
+        if not days:
+            return {}
+        columns = {c: self.store.column(c, start).tolist() for c in self.store.currencies}
+        # NaN (kein Kurs an diesem Tag) auslassen
+        return {day: {c: values[n] for c, values in columns.items() if values[n] == values[n]}
+                for n, day in enumerate(days)}
+
+    def matrix(self, currencies, limit=None, after=None, with_dates=False):
+        """Kursmatrix (Tage x Währungen) als float64-Array, älteste Zeile zuerst.
+        Tage, an denen eine der Währungen fehlt, werden ausgelassen; mit after
+        nur die Tage nach diesem ISO-Datum."""
+        dates, columns = self.dates, [self.rates.get(c) for c in currencies]
+        if not all(columns):
+            rows = []
+        else:
+            rows = [(day, row) for day, row in zip(dates, zip(*columns))
+                    if all(row) and (after is None or day > after)]
+        if limit and len(rows) > limit:
+            rows = rows[-limit:]
+
+        matrix = np.array([row for _, row in rows], dtype=np.float64).reshape(len(rows), len(currencies))
+        if with_dates:
+            return [day for day, _ in rows], matrix
+        return matrix
+
+    def latest(self):
+        """Letzte verfügbare Kurse aller Währungen"""
+        if not self.dates:
+            return {}
+        return {c: col[-1] for c, col in self.rates.items() if col[-1]}
+
+
+def _append(dates, rates, rates_data):
+    """Hängt neue Tage an; fehlende Kurse werden als None geführt"""
+    last = dates[-1] if dates else ''
+    new_dates = sorted(d for d in rates_data if d > last)
+
+    for day in new_dates:
+        day_rates = rates_data[day]
+        for currency in day_rates:
+            if currency not in rates:
+                rates[currency] = [None] * len(dates)
+        for currency, column in rates.items():
+            column.append(day_rates.get(currency))
+        dates.append(day)
+
+    return bool(new_dates)
+
+
+def _trim(dates, rates, cutoff):
+    """Verwirft Tage, die vor dem Fenster liegen"""
+    cutoff = cutoff.isoformat()
+    drop = 0
+    while drop < len(dates) and dates[drop] < cutoff:
+        drop += 1
+    if drop:
+        del dates[:drop]
+        for column in rates.values():
+            del column[:drop]
+    return bool(drop)
@@ -0,0 +1,348 @@
+"""Indikator-Engine auf einer Kursmatrix (Zeit x Instrument) mit NumPy.
+
+Alle Funktionen nehmen ein 2D-Array (Zeilen = Tage, älteste zuerst;
+Spalten = Instrumente) oder eine einfache Kursliste und rechnen alle
+Instrumente in einem Durchlauf. Das Ergebnis hat dieselbe Form wie die
+Eingabe; Zeilen, für die noch nicht genug Daten vorliegen, sind NaN.
+
+Summen werden bewusst in derselben Reihenfolge gebildet wie in den alten
+Pure-Python-Funktionen, damit die Ergebnisse bitgenau übereinstimmen.
+
+Für den laufenden Betrieb gibt es zusätzlich Streaming-Varianten
+(StreamingEMA, StreamingRSI, RollingMinMax), die pro neuem Kurs nur
+konstanten Aufwand haben und sich als Dict speichern lassen.
+"""
+from collections import deque
+
+import numpy as np
+
+
+# Bis zu so vielen Instrumenten laufen die Rekursionen (EMA, Wilder) spaltenweise
+# über Python-Floats - bei wenigen Spalten ist das schneller als eine NumPy-Operation
+# pro Zeile, das Ergebnis ist bitgleich
+PYTHON_COLUMNS = 32
+
+
+def as_matrix(prices):
+    """Kursliste oder Matrix als float64-Array (Zeit x Instrument)"""
+    matrix = np.asarray(prices, dtype=np.float64)
+    if matrix.ndim == 1:
+        matrix = matrix[:, None]
+    return matrix
+
+
+def _rolling_sum(values, window):
+    """Summe der letzten `window` Zeilen für jede Zeile ab window-1.
+
+    Addiert Zeile für Zeile von links nach rechts (wie sum() in Python),
+    vektorisiert über alle Fenster und Instrumente gleichzeitig."""
+    n = len(values) - window + 1
+    total = values[0:n].copy()
+    for offset in range(1, window):
+        total += values[offset:offset + n]
+    return total
+
+
+def ema(prices, period):
+    """Exponential Moving Average, mit SMA der ersten `period` Kurse als Start"""
+    prices = as_matrix(prices)
+    result = np.full(prices.shape, np.nan)
+    if len(prices) < period:
+        return result
+
+    multiplier = 2 / (period + 1)
+    value = _rolling_sum(prices[:period], period)[0] / period
+    result[period - 1] = value
+
+    if prices.shape[1] <= PYTHON_COLUMNS:
+        for k in range(prices.shape[1]):
+            column = _ema_column(prices[period:, k].tolist(), float(value[k]), multiplier)
+            result[period:, k] = column
+        return result
+
+    for t in range(period, len(prices)):
+        value = (prices[t] - value) * multiplier + value
+        result[t] = value
+
+    return result
+
+
+def _ema_column(prices, value, multiplier):
+    out = []
+    for price in prices:
+        value = (price - value) * multiplier + value
+        out.append(value)
+    return out
+
+
+def _gains_losses(prices):
+    change = np.diff(prices, axis=0)
+    gains = np.where(change > 0, change, 0.0)
+    losses = np.where(change > 0, 0.0, np.abs(change))
+    return gains, losses
+
+
+def _rsi_from_averages(avg_gain, avg_loss):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        rsi = 100 - (100 / (1 + rs))
+    return np.where(avg_loss == 0, 100.0, rsi)
+
+
+def rsi(prices, period=14, wilder=False):
+    """Relative Strength Index.
+
+    Standard ist der Durchschnitt der letzten `period` Gewinne/Verluste (wie
+    bisher im Dashboard); mit wilder=True werden die Durchschnitte nach
+    Wilder geglättet."""
+    prices = as_matrix(prices)
+    result = np.full(prices.shape, np.nan)
+    if len(prices) < period + 1:
+        return result
+
+    gains, losses = _gains_losses(prices)
+
+    if not wilder:
+        avg_gain = _rolling_sum(gains, period) / period
+        avg_loss = _rolling_sum(losses, period) / period
+        result[period:] = _rsi_from_averages(avg_gain, avg_loss)
+        return result
+
+    avg_gain = _rolling_sum(gains[:period], period)[0] / period
+    avg_loss = _rolling_sum(losses[:period], period)[0] / period
+    result[period] = _rsi_from_averages(avg_gain, avg_loss)
+
+    if prices.shape[1] <= PYTHON_COLUMNS:
+        for k in range(prices.shape[1]):
+            gain_avgs = _wilder_column(gains[period:, k].tolist(), float(avg_gain[k]), period)
+            loss_avgs = _wilder_column(losses[period:, k].tolist(), float(avg_loss[k]), period)
+            result[period + 1:, k] = _rsi_from_averages(np.array(gain_avgs), np.array(loss_avgs))
+        return result
+
+    for t in range(period, len(gains)):
+        avg_gain = (avg_gain * (period - 1) + gains[t]) / period
+        avg_loss = (avg_loss * (period - 1) + losses[t]) / period
+        result[t + 1] = _rsi_from_averages(avg_gain, avg_loss)
+
+    return result
+
+
+def _wilder_column(values, average, period):
+    out = []
+    for value in values:
+        average = (average * (period - 1) + value) / period
+        out.append(average)
+    return out
+
+
+def support_resistance(prices, window=20):
+    """Rollendes Minimum (Support) und Maximum (Resistance) über `window` Kurse"""
+    prices = as_matrix(prices)
+    support = np.full(prices.shape, np.nan)
+    resistance = np.full(prices.shape, np.nan)
+    if len(prices) < window:
+        return support, resistance
+
+    windows = np.lib.stride_tricks.sliding_window_view(prices, window, axis=0)
+    support[window - 1:] = windows.min(axis=-1)
+    resistance[window - 1:] = windows.max(axis=-1)
+    return support, resistance
+
+
+def to_float(x):
+    """NaN -> None, sonst float (für JSON)"""
+    return None if np.isnan(x) else float(x)
+
+
+class StreamingEMA:
+    """EMA, die pro neuem Kurs in O(1) fortgeschrieben wird"""
+
+    __slots__ = ('period', 'multiplier', 'value', 'seed_sum', 'count')
+
+    def __init__(self, period):
+        self.period = period
+        self.multiplier = 2 / (period + 1)
+        self.value = None
+        self.seed_sum = 0
+        self.count = 0
+
+    def update(self, price):
+        if self.value is None:
+            # Start mit dem SMA der ersten `period` Kurse
+            self.seed_sum += price
+            self.count += 1
+            if self.count == self.period:
+                self.value = self.seed_sum / self.period
+        else:
+            self.value = (price - self.value) * self.multiplier + self.value
+        return self.value
+
+    def to_dict(self):
+        return {'period': self.period, 'value': self.value,
+                'seed_sum': self.seed_sum, 'count': self.count}
+
+    @classmethod
+    def from_dict(cls, state):
+        ema = cls(state['period'])
+        ema.value = state['value']
+        ema.seed_sum = state['seed_sum']
+        ema.count = state['count']
+        return ema
+
+
+class StreamingRSI:
+    """RSI, der pro neuem Kurs fortgeschrieben wird.
+
+    Ohne wilder wird wie in rsi() der Durchschnitt der letzten `period`
+    Bewegungen genommen; die Summe läuft über einen Ring fester Länge, der
+    Aufwand hängt also nur von `period` ab, nicht von der Historie. Mit
+    wilder=True werden die Durchschnitte nach Wilder geglättet (echtes O(1))."""
+
+    __slots__ = ('period', 'wilder', 'prev', 'gains', 'losses', 'avg_gain', 'avg_loss', 'value')
+
+    def __init__(self, period=14, wilder=False):
+        self.period = period
+        self.wilder = wilder
+        self.prev = None
+        self.gains = deque(maxlen=period)
+        self.losses = deque(maxlen=period)
+        self.avg_gain = None
+        self.avg_loss = None
+        self.value = None
+
+    def update(self, price):
+        if self.prev is None:
+            self.prev = price
+            return None
+
+        change = price - self.prev
+        self.prev = price
+        gain = change if change > 0 else 0.0
+        loss = 0.0 if change > 0 else abs(change)
+
+        if self.wilder and self.avg_gain is not None:
+            self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+        else:
+            self.gains.append(gain)
+            self.losses.append(loss)
+            if len(self.gains) < self.period:
+                return None
+            self.avg_gain = sum(self.gains) / self.period
+            self.avg_loss = sum(self.losses) / self.period
+
+        if self.avg_loss == 0:
+            self.value = 100.0
+        else:
+            rs = self.avg_gain / self.avg_loss
+            self.value = 100 - (100 / (1 + rs))
+        return self.value
+
+    def to_dict(self):
+        return {'period': self.period, 'wilder': self.wilder, 'prev': self.prev,
+                'gains': list(self.gains), 'losses': list(self.losses),
+                'avg_gain': self.avg_gain, 'avg_loss': self.avg_loss, 'value': self.value}
+
+    @classmethod
+    def from_dict(cls, state):
+        rsi = cls(state['period'], state['wilder'])
+        rsi.prev = state['prev']
+        rsi.gains.extend(state['gains'])
+        rsi.losses.extend(state['losses'])
+        rsi.avg_gain = state['avg_gain']
+        rsi.avg_loss = state['avg_loss']
+        rsi.value = state['value']
+        return rsi
+
+
+class RollingMinMax:
+    """Minimum und Maximum der letzten `window` Kurse über monotone Deques
+    (amortisiert O(1) pro Kurs)"""
+
+    __slots__ = ('window', 'count', 'lows', 'highs')
+
+    def __init__(self, window=20):
+        self.window = window
+        self.count = 0
+        self.lows = deque()     # (index, kurs), Kurse aufsteigend
+        self.highs = deque()    # (index, kurs), Kurse absteigend
+
+    def update(self, price):
+        index = self.count
+        self.count += 1
+
+        while self.lows and self.lows[-1][1] >= price:
+            self.lows.pop()
+        self.lows.append((index, price))
+        while self.highs and self.highs[-1][1] <= price:
+            self.highs.pop()
+        self.highs.append((index, price))
+
+        oldest = index - self.window + 1
+        if self.lows[0][0] < oldest:
+            self.lows.popleft()
+        if self.highs[0][0] < oldest:
+            self.highs.popleft()
+        return self.support, self.resistance
+
+    @property
+    def support(self):
+        return self.lows[0][1] if self.count >= self.window else None
+
+    @property
+    def resistance(self):
+        return self.highs[0][1] if self.count >= self.window else None
+
+    def to_dict(self):
+        return {'window': self.window, 'count': self.count,
+                'lows': [list(x) for x in self.lows], 'highs': [list(x) for x in self.highs]}
+
+    @classmethod
+    def from_dict(cls, state):
+        minmax = cls(state['window'])
+        minmax.count = state['count']
+        minmax.lows.extend(tuple(x) for x in state['lows'])
+        minmax.highs.extend(tuple(x) for x in state['highs'])
+        return minmax
+
+
+class IndicatorSet:
+    """EMA, RSI und Support/Resistance eines Instruments als laufender Zustand"""
+
+    __slots__ = ('price', 'ema', 'rsi', 'levels')
+
+    def __init__(self, ema_period=50, rsi_period=14, sr_window=20):
+        self.price = None
+        self.ema = StreamingEMA(ema_period)
+        self.rsi = StreamingRSI(rsi_period)
+        self.levels = RollingMinMax(sr_window)
+
+    def update(self, price):
+        self.price = price
+        self.ema.update(price)
+        self.rsi.update(price)
+        self.levels.update(price)
+
+    def latest(self):
+        """Letzte Werte: price, ema, rsi, support, resistance (None, wo nicht
+        genug Daten vorliegen)"""
+        return {
+            'price': self.price,
+            'ema': self.ema.value,
+            'rsi': self.rsi.value,
+            'support': self.levels.support,
+            'resistance': self.levels.resistance,
+        }
+
+    def to_dict(self):
+        return {'price': self.price, 'ema': self.ema.to_dict(),
+                'rsi': self.rsi.to_dict(), 'levels': self.levels.to_dict()}
+
+    @classmethod
+    def from_dict(cls, state):
+        indicator_set = cls.__new__(cls)
+        indicator_set.price = state['price']
+        indicator_set.ema = StreamingEMA.from_dict(state['ema'])
+        indicator_set.rsi = StreamingRSI.from_dict(state['rsi'])
+        indicator_set.levels = RollingMinMax.from_dict(state['levels'])
+        return indicator_set
@@ -0,0 +1,107 @@
+"""Instrument-Registry: welche Paare das Dashboard zeigt und wie sie entstehen.
+
+Jedes Paar wird aus dem USD-Basis Kursvektor (bzw. der Kursmatrix) der
+Frankfurter API abgeleitet: Kurs = Kurs(quote) / Kurs(base), mit USD = 1.
+Damit sind auch Kreuzkurse wie EUR/GBP ohne weiteren Upstream-Call möglich.
+
+Die aktiven Paare kommen aus der Umgebungsvariable INSTRUMENTS (Symbole mit
+Komma getrennt), sonst aus DEFAULT_SYMBOLS.
+"""
+import os
+from collections import namedtuple
+
+import numpy as np
+
+BASE_CURRENCY = 'USD'
+
+
+class Instrument(namedtuple('Instrument', 'symbol base quote precision')):
+    """Ein Währungspaar, z.B. Instrument('EURUSD', 'EUR', 'USD', 5)"""
+
+    __slots__ = ()
+
+    @property
+    def key(self):
+        return self.symbol.lower()
+
+    @property
+    def name(self):
+        return f'{self.base}/{self.quote}'
+
+    def format(self, price):
+        return f'{price:.{self.precision}f}'
+
+    def price(self, rates):
+        """Kurs aus einem USD-Basis Kursvektor {Währung: Kurs}"""
+        base = 1.0 if self.base == BASE_CURRENCY else rates.get(self.base)
+        quote = 1.0 if self.quote == BASE_CURRENCY else rates.get(self.quote)
+        if not base or not quote:
+            return None
+        return quote / base
+
+
+REGISTRY = {i.symbol: i for i in [
+    Instrument('EURUSD', 'EUR', 'USD', 5),
+    Instrument('GBPUSD', 'GBP', 'USD', 5),
+    Instrument('USDJPY', 'USD', 'JPY', 3),
+    Instrument('USDCHF', 'USD', 'CHF', 5),
+    Instrument('AUDUSD', 'AUD', 'USD', 5),
+    Instrument('USDCAD', 'USD', 'CAD', 5),
+    Instrument('NZDUSD', 'NZD', 'USD', 5),
+    Instrument('EURGBP', 'EUR', 'GBP', 5),
+    Instrument('EURJPY', 'EUR', 'JPY', 3),
+    Instrument('GBPJPY', 'GBP', 'JPY', 3),
+    Instrument('EURCHF', 'EUR', 'CHF', 5),
+]}
+
+DEFAULT_SYMBOLS = ['EURUSD', 'GBPUSD', 'USDJPY', 'EURGBP', 'EURJPY', 'GBPJPY']
+
+
+def get(symbol):
+    """Instrument zu einem Symbol; nicht registrierte Paare wie 'AUDNZD'
+    werden aus dem Symbol abgeleitet (JPY-Paare mit 3 Stellen)"""
+    symbol = symbol.upper().replace('/', '')
+    if symbol in REGISTRY:
+        return REGISTRY[symbol]
+    if len(symbol) != 6 or not symbol.isalpha():
+        return None
+    base, quote = symbol[:3], symbol[3:]
+    return Instrument(symbol, base, quote, 3 if quote == 'JPY' else 5)
+
+
+def active(symbols=None):
+    """Aktive Instrumente laut INSTRUMENTS bzw. DEFAULT_SYMBOLS"""
+    if symbols is None:
+        configured = os.environ.get('INSTRUMENTS')
+        symbols = configured.split(',') if configured else DEFAULT_SYMBOLS
+    result = [get(s.strip()) for s in symbols if s.strip()]
+    return [i for i in result if i]
+
+
+def supported(instrument, available):
+    """True, wenn Basis und Quote in den verfügbaren Währungen (Spalten der
+    USD-Basis Kursmatrix) vorkommen - aus dem Namen abgeleitete Paare wie
+    'ABCDEF' gibt es sonst gar nicht"""
+    return all(c == BASE_CURRENCY or c in available for c in (instrument.base, instrument.quote))
+
+
+def currencies(instruments):
+    """Benötigte Spalten der USD-Basis Kursmatrix (ohne USD selbst)"""
+    needed = {c for i in instruments for c in (i.base, i.quote)} - {BASE_CURRENCY}
+    return sorted(needed)
+
+
+def price_matrix(rates, columns, instruments):
+    """Kursmatrix (Tage x Instrumente) aus der USD-Basis Matrix (Tage x columns).
+
+    Alle Instrumente werden in einem Schritt abgeleitet - zusätzliche Paare
+    kosten nur eine Division pro Tag."""
+    rates = np.asarray(rates, dtype=np.float64)
+    # USD als Spalte mit 1.0 anhängen, damit base/quote immer einen Index haben
+    padded = np.hstack([rates, np.ones((len(rates), 1))])
+    index = {c: n for n, c in enumerate(columns)}
+    index[BASE_CURRENCY] = len(columns)
+
+    bases = [index[i.base] for i in instruments]
+    quotes = [index[i.quote] for i in instruments]
+    return padded[:, quotes] / padded[:, bases]
@@ -0,0 +1,166 @@
+"""Metriken im Prometheus-Textformat für /metrics.
+
+Zähler und Histogramme leben im Prozess-Speicher: ein Eintrag kostet ein
+perf_counter-Paar, eine Bisektion über die Bucket-Grenzen und ein kurzes Lock,
+also wenige Mikrosekunden - klein genug, um im Betrieb immer an zu sein.
+
+Unter gunicorn hat jeder Worker seine eigenen Werte; Prometheus sieht beim
+Scrapen den Worker, der den Request bekommt.
+
+    with metrics.STAGE_SECONDS.time(stage='analysis', instrument='EURUSD'):
+        ...
+    metrics.CACHE_REQUESTS.inc(cache='news', result='hit')
+"""
+import threading
+import time
+from bisect import bisect_left
+
+# Sekunden: von einzelnen Indikator-Updates bis zu Upstream-Timeouts
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_METRICS = []
+
+
+class Metric:
+    """Basis für eine Metrik-Familie mit festen Label-Namen"""
+
+    kind = 'untyped'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}               # Label-Werte (Tupel) -> Wert
+        self._lock = threading.Lock()
+        _METRICS.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _labels(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{n}="{_escape(v)}"' for n, v in pairs) + '}'
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key, value):
+        return [f'{self.name}{self._labels(key)} {_number(value)}']
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        # Erster Bucket mit Grenze >= value ('le' ist inklusiv), sonst +Inf
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def time(self, **labels):
+        """Context Manager, misst die Laufzeit des Blocks (auch wenn er eine
+        Exception wirft)"""
+        return _Timer(self, labels)
+
+    def _samples(self, key, state):
+        counts, total, count = state
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets + (float('inf'),), counts):
+            cumulative += n
+            le = '+Inf' if bound == float('inf') else _number(bound)
+            lines.append(f'{self.name}_bucket{self._labels(key, [("le", le)])} {cumulative}')
+        lines.append(f'{self.name}_sum{self._labels(key)} {_number(total)}')
+        lines.append(f'{self.name}_count{self._labels(key)} {count}')
+        return lines
+
+
+class _Timer:
+    # Eigene Klasse statt @contextmanager - spart den Generator pro Messung
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+def render():
+    """Alle Metriken im Prometheus-Textformat (Version 0.0.4)"""
+    lines = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Stufen eines Kurs-Refreshs: fetch und parse gelten für alle Paare gemeinsam
+# (instrument="all"), indicators und analysis pro Paar
+STAGE_SECONDS = Histogram('trading_stage_seconds', 'Laufzeit pro Verarbeitungsstufe',
+                          ['stage', 'instrument'])
+SERIALIZE_SECONDS = Histogram('trading_serialize_seconds',
+                              'JSON-Serialisierung und Kompression einer Antwort', ['cache'])
+REFRESH_SECONDS = Histogram('trading_refresh_seconds', 'Dauer eines Cache-Refreshs', ['cache'])
+REFRESH_ERRORS = Counter('trading_refresh_errors_total', 'Fehlgeschlagene Cache-Refreshs', ['cache'])
+CACHE_REQUESTS = Counter('trading_cache_requests_total',
+                         'Cache-Zugriffe nach Ergebnis (hit, miss, stale)', ['cache', 'result'])
+UPSTREAM_ERRORS = Counter('trading_upstream_errors_total',
+                          'Fehlgeschlagene Upstream-Versuche nach Fehlerart', ['upstream', 'type'])
+ANALYSIS_FALLBACKS = Counter('trading_analysis_fallbacks_total',
+                             'Paare aus dem letzten guten Stand (late, busy, error)', ['instrument', 'reason'])
+UPSTREAM_STALE = Counter('trading_upstream_stale_total',
+                         'Antworten aus dem letzten guten Stand statt vom Upstream', ['upstream'])
+# Wird beim Scrapen gesetzt (siehe /metrics in app.py)
+STATE = Gauge('trading_state', 'Aktueller Zustand einzelner Komponenten', ['name'])
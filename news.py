@@ -0,0 +1,263 @@
+"""News-Pipeline: RSS/Atom-Feeds lesen, entdoppeln, den Paaren zuordnen.
+
+- Feeds (URLs oder lokale Dateien, z.B. zum Testen) werden mit iterparse
+  gestreamt; jedes Item wird nach dem Lesen freigegeben, der Speicher hängt
+  nicht von der Feed-Größe ab
+- Conditional GET: ETag/Last-Modified pro Feed, ein unveränderter Feed
+  kostet nur ein 304 (bei Dateien: gleiche mtime und Größe)
+- Dubletten (gleicher Titel und Link, auch aus verschiedenen Feeds) werden
+  über einen Hash erkannt
+- Zuordnung über einen einzigen kompilierten regulären Ausdruck mit allen
+  Schlüsselwörtern - ein Durchlauf pro Text, egal wie viele Paare
+- pro Paar ein Ring (deque mit maxlen) mit den neuesten Items
+"""
+import hashlib
+import os
+import re
+import time
+import xml.etree.ElementTree as ET
+from collections import OrderedDict, deque
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import metrics
+
+# Schlüsselwörter pro Währung; ein Treffer zählt am Wortanfang ('eur' trifft
+# auch 'eurozone', aber nicht 'neuro')
+KEYWORDS = {
+    'EUR': ['eur', 'euro', 'eurozone', 'ecb', 'ezb'],
+    'GBP': ['gbp', 'pound', 'sterling', 'uk', 'britain', 'boe'],
+    'JPY': ['jpy', 'yen', 'japan', 'boj'],
+    'CHF': ['chf', 'franken', 'swiss', 'schweiz', 'snb'],
+    'AUD': ['aud', 'aussie', 'australia', 'australien', 'rba'],
+    'CAD': ['cad', 'loonie', 'canada', 'kanada'],
+    'NZD': ['nzd', 'kiwi', 'new zealand', 'neuseeland', 'rbnz'],
+}
+
+# Allgemeine Devisen-News zum Auffüllen, wenn ein Paar zu wenig eigene hat
+GENERIC = 'GENERIC'
+GENERIC_KEYWORDS = ['forex', 'dollar', 'währung']
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+_TAGS = re.compile(r'<[^>]+>')
+
+
+class KeywordMatcher:
+    """Alle Schlüsselwörter in einem regulären Ausdruck: match() findet in
+    einem Durchlauf über den Text alle Gruppen (Währungen), die vorkommen"""
+
+    def __init__(self, groups):
+        self.labels = {}        # Schlüsselwort -> Gruppen
+        for label, words in groups.items():
+            for word in words:
+                self.labels.setdefault(word.lower(), set()).add(label)
+        # Längste zuerst, damit 'eurozone' vor 'eur' probiert wird; der
+        # Lookahead erlaubt überlappende Treffer an jedem Wortanfang
+        alternation = '|'.join(re.escape(w) for w in sorted(self.labels, key=len, reverse=True))
+        self.pattern = re.compile(rf'\b(?=({alternation}))')
+
+    def match(self, text):
+        found = set()
+        for m in self.pattern.finditer(text.lower()):
+            found |= self.labels[m.group(1)]
+        return found
+
+
+def parse_feed(source):
+    """Items eines RSS- oder Atom-Feeds (Datei oder file-artiges Objekt) als
+    Dicts mit headline, url, text, published (Unix-Zeit oder None)"""
+    for _, elem in ET.iterparse(source, events=('end',)):
+        if elem.tag == 'item':
+            title = elem.findtext('title') or ''
+            link = elem.findtext('link') or ''
+            summary = elem.findtext('description') or ''
+            published = _rss_time(elem.findtext('pubDate'))
+        elif elem.tag == ATOM + 'entry':
+            title = elem.findtext(ATOM + 'title') or ''
+            link_elem = elem.find(ATOM + 'link')
+            link = link_elem.get('href', '') if link_elem is not None else ''
+            summary = elem.findtext(ATOM + 'summary') or elem.findtext(ATOM + 'content') or ''
+            published = _atom_time(elem.findtext(ATOM + 'published') or elem.findtext(ATOM + 'updated'))
+        else:
+            continue
+
+        title = title.strip()
+        yield {
+            'headline': title,
+            'url': link.strip(),
+            'text': f'{title} {_TAGS.sub(" ", summary)}',
+            'published': published,
+        }
+        # Verarbeitetes Item freigeben - hält den Speicher beim Streamen konstant
+        elem.clear()
+
+
+def _rss_time(value):
+    try:
+        return parsedate_to_datetime(value).timestamp() if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _atom_time(value):
+    try:
+        return datetime.fromisoformat(value.strip()).timestamp() if value else None
+    except ValueError:
+        return None
+
+
+class FeedSource:
+    """Ein Feed (URL oder Dateipfad) mit dem Stand des letzten Abrufs"""
+
+    def __init__(self, location):
+        self.location = location
+        self.etag = None
+        self.last_modified = None
+        self.file_state = None
+
+    @property
+    def is_file(self):
+        return not urlparse(self.location).scheme.startswith('http')
+
+    def items(self, session, timeout=10):
+        """Items des Feeds; leer, wenn er sich seit dem letzten Abruf nicht geändert hat"""
+        if self.is_file:
+            stat = os.stat(self.location)
+            state = (stat.st_mtime_ns, stat.st_size)
+            if state == self.file_state:
+                return
+            yield from parse_feed(self.location)
+            self.file_state = state
+            return
+
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        with session.get(self.location, headers=headers, timeout=timeout, stream=True) as response:
+            if response.status_code == 304:
+                return
+            response.raise_for_status()
+            # Direkt aus dem Socket parsen (gzip wird dabei entpackt)
+            response.raw.decode_content = True
+            yield from parse_feed(response.raw)
+            self.etag = response.headers.get('ETag')
+            self.last_modified = response.headers.get('Last-Modified')
+
+
+class NewsPipeline:
+    """Hält die neuesten News pro Paar; refresh() liest nur Neues ein"""
+
+    def __init__(self, locations=(), capacity=30, seen_limit=10000, keywords=None):
+        self.sources = [FeedSource(loc) for loc in locations]
+        self.capacity = capacity
+        self.seen_limit = seen_limit
+        self.matcher = KeywordMatcher({**(keywords or KEYWORDS), GENERIC: GENERIC_KEYWORDS})
+        self.buffers = {}           # Währung bzw. GENERIC -> deque der Items
+        self.seen = OrderedDict()   # Hash -> None, begrenzt auf seen_limit
+        self.session = None         # requests.Session, erst beim ersten HTTP-Feed
+        self._seq = 0
+
+    def refresh(self):
+        """Alle Feeds abrufen; liefert die Anzahl neuer Items"""
+        # requests erst beim ersten Abruf importieren (kürzerer Start des Dienstes)
+        import requests
+
+        if self.session is None:
+            self.session = requests.Session()
+
+        added = 0
+        for source in self.sources:
+            try:
+                # Feeds listen die neuesten Items zuerst; älteste zuerst
+                # einsortieren, damit die Ringe die neuesten behalten
+                items = list(source.items(self.session))
+                items.reverse()
+                items.sort(key=lambda item: item['published'] or 0)
+                added += self.add(items)
+            except (OSError, ET.ParseError, requests.RequestException) as e:
+                metrics.UPSTREAM_ERRORS.inc(upstream=urlparse(source.location).netloc or 'file',
+                                            type=type(e).__name__)
+                print(f"News feed error for {source.location}: {e}")
+        return added
+
+    def add(self, items):
+        """Items einsortieren, älteste zuerst (Dubletten werden übersprungen)"""
+        added = 0
+        for item in items:
+            key = hashlib.blake2b(f"{item['headline'].lower()}\n{item['url']}".encode(),
+                                  digest_size=12).digest()
+            if key in self.seen:
+                continue
+            self.seen[key] = None
+            if len(self.seen) > self.seen_limit:
+                self.seen.popitem(last=False)
+
+            self._seq += 1
+            item = dict(item, key=key, seq=self._seq)
+            for label in self.matcher.match(item['text']):
+                if label not in self.buffers:
+                    self.buffers[label] = deque(maxlen=self.capacity)
+                self.buffers[label].append(item)
+            added += 1
+        return added
+
+    def __bool__(self):
+        return bool(self.buffers)
+
+    def news(self, pairs, per_pair=3, now=None):
+        """{paar: [{'time', 'headline', 'url'}, ...]} für die Instrumente in
+        `pairs`. Jedes Item erscheint höchstens bei einem Paar (in der
+        Reihenfolge der Paare); fehlende Plätze füllen allgemeine News, dann
+        ein Link auf die Analyse-Seite des Paares."""
+        now = now or time.time()
+        used = set()
+        result = {}
+
+        for instrument in pairs:
+            candidates = []
+            for currency in {instrument.base, instrument.quote} - {'USD'}:
+                candidates.extend(self.buffers.get(currency, ()))
+            selected = _take(_newest_first(candidates), per_pair, used)
+            if len(selected) < per_pair:
+                selected += _take(_newest_first(self.buffers.get(GENERIC, ())), per_pair - len(selected), used)
+
+            url = f'https://de.investing.com/currencies/{instrument.base.lower()}-{instrument.quote.lower()}'
+            entries = [{'time': item.get('time') or format_time(item.get('published'), now),
+                        'headline': item['headline'], 'url': item['url']} for item in selected]
+            while len(entries) < per_pair:
+                entries.append({'time': 'Heute', 'headline': f'{instrument.symbol} - Aktuelle Analyse', 'url': url})
+            result[instrument.key] = entries
+
+        return result
+
+
+def _newest_first(items):
+    # Neueste zuerst; ohne Zeitstempel das zuletzt eingefügte zuerst
+    unique = {item['key']: item for item in items}
+    return sorted(unique.values(), key=lambda item: (-(item.get('published') or 0), -item['seq']))
+
+
+def _take(items, count, used):
+    selected = []
+    for item in items:
+        if len(selected) == count:
+            break
+        if item['key'] not in used:
+            used.add(item['key'])
+            selected.append(item)
+    return selected
+
+
+def format_time(published, now):
+    """'14:05' in der letzten Stunde, 'Vor 3 Std' am selben Tag, sonst das Datum"""
+    if published is None:
+        return 'Heute'
+    age = now - published
+    if age < 3600:
+        return datetime.fromtimestamp(published).strftime('%H:%M')
+    if age < 86400:
+        return f'Vor {int(age // 3600)} Std'
+    return datetime.fromtimestamp(published).strftime('%d.%m.')
@@ -0,0 +1,375 @@
+"""Persistente Kurshistorie (USD-Basis) als spaltenweise, memory-mapped Dateien.
+
+Layout unter `path` (RATE_STORE, Standard state/rates neben app.py, nur für
+den eigenen Nutzer lesbar):
+
+    meta.json                 base, generation, rows, days, currencies
+    <generation>/dates.i4     Datum jeder Zeile als Tagesnummer (date.toordinal)
+    <generation>/calendar.i4  Kalendertag (ab dem ersten Datum) -> Zeile des
+                              letzten Fixings an oder vor diesem Tag
+    <generation>/<CUR>.f8     Kurse einer Währung, NaN wo es keinen Kurs gibt
+
+Die Dateien sind rohe Arrays und werden per np.memmap gelesen: Bereiche sind
+Slices der gemappten Datei (keine Kopie, kein JSON), alle Prozesse teilen sich
+dieselben Seiten im Page Cache. Datum -> Zeile ist ein Zugriff auf calendar.
+
+Neue Tage werden an die Dateien angehängt und erst mit dem Schreiben von
+meta.json sichtbar (Leser mappen nur `rows` Zeilen). Kommen Tage vor dem
+ersten Datum dazu, wird eine neue Generation geschrieben und meta.json
+umgeschaltet. Geschrieben wird unter einem Datei-Lock, also von höchstens
+einem Prozess gleichzeitig.
+
+    python rate_store.py --backfill            # komplette Historie seit 1999
+    python rate_store.py                       # nur Stand anzeigen
+"""
+import argparse
+import fcntl
+import json
+import os
+import re
+import shutil
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import numpy as np
+
+# Erstes EZB-Fixing der Frankfurter API
+FIRST_FIXING = date(1999, 1, 4)
+
+# Nicht im geteilten /tmp: wer meta.json dort anlegen kann, bestimmt, welche
+# Dateien gelöscht und geschrieben werden
+DEFAULT_PATH = os.environ.get('RATE_STORE', os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'state', 'rates'))
+
+CURRENCY = re.compile(r'[A-Z]{3}')
+
+# Ein gemappter Stand - wird als Ganzes getauscht, Leser sehen nie eine Mischung
+_View = namedtuple('_View', 'meta dates calendar columns')
+
+_EMPTY = _View(None, np.empty(0, np.int32), np.empty(0, np.int32), {})
+
+
+class RateStore:
+    """Kurse aller Währungen seit 1999, spaltenweise auf der Platte"""
+
+    def __init__(self, path=DEFAULT_PATH, base='USD'):
+        self.path = path
+        self.base = base
+        self._view = _EMPTY
+        self._stat = None
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        self.refresh()
+
+    @property
+    def rows(self):
+        return len(self._view.dates)
+
+    @property
+    def currencies(self):
+        return list(self._view.columns)
+
+    def first_date(self):
+        view = self._view
+        return date.fromordinal(int(view.dates[0])) if len(view.dates) else None
+
+    def last_date(self):
+        view = self._view
+        return date.fromordinal(int(view.dates[-1])) if len(view.dates) else None
+
+    def refresh(self):
+        """Neu mappen, falls ein anderer Prozess geschrieben hat; True bei Änderung"""
+        try:
+            stat = os.stat(self._meta_path)
+        except FileNotFoundError:
+            return False
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if key == self._stat:
+            return False
+
+        with open(self._meta_path) as f:
+            meta = _check_meta(json.load(f))
+        directory = self._generation_path(meta['generation'])
+        rows = meta['rows']
+        self._view = _View(
+            meta,
+            _map(os.path.join(directory, 'dates.i4'), np.int32, rows),
+            _map(os.path.join(directory, 'calendar.i4'), np.int32, meta['days']),
+            {c: _map(os.path.join(directory, f'{c}.f8'), np.float64, rows) for c in meta['currencies']}
+        )
+        self._stat = key
+        return True
+
+    def row(self, day):
+        """Zeile des letzten Fixings an oder vor `day` (date oder ISO-String);
+        None, wenn day vor dem ersten Datum liegt"""
+        view = self._view
+        if not len(view.dates):
+            return None
+        offset = _ordinal(day) - int(view.dates[0])
+        if offset < 0:
+            return None
+        if offset >= len(view.calendar):
+            return len(view.dates) - 1
+        return int(view.calendar[offset])
+
+    def bounds(self, start=None, end=None):
+        """Zeilenbereich [lo, hi) für die Tage von start bis end (inklusive)"""
+        view = self._view
+        lo, hi = 0, len(view.dates)
+        if start is not None:
+            row = self.row(start)
+            if row is not None:
+                lo = row if int(view.dates[row]) >= _ordinal(start) else row + 1
+        if end is not None:
+            row = self.row(end)
+            hi = 0 if row is None else row + 1
+        return lo, max(lo, hi)
+
+    def dates(self, start=None, end=None):
+        """ISO-Daten der Zeilen von start bis end"""
+        lo, hi = self.bounds(start, end)
+        return [date.fromordinal(d).isoformat() for d in self._view.dates[lo:hi].tolist()]
+
+    def column(self, currency, start=None, end=None):
+        """Kurse einer Währung von start bis end - ein Slice der gemappten
+        Datei, also ohne Kopie (nur lesen); None für unbekannte Währungen"""
+        view = self._view
+        values = view.columns.get(currency)
+        if values is None:
+            return None
+        lo, hi = self.bounds(start, end)
+        return values[lo:hi]
+
+    def matrix(self, currencies, start=None, end=None):
+        """(ISO-Daten, Kursmatrix Tage x Währungen) mit NaN für fehlende Kurse.
+        Die Matrix ist eine Kopie; einzelne Spalten ohne Kopie liefert column()."""
+        view = self._view
+        lo, hi = self.bounds(start, end)
+        matrix = np.full((hi - lo, len(currencies)), np.nan)
+        for k, currency in enumerate(currencies):
+            if currency in view.columns:
+                matrix[:, k] = view.columns[currency][lo:hi]
+        return self.dates(start, end), matrix
+
+    def extend(self, rates_data):
+        """Tage im Frankfurter-Format {datum: {währung: kurs}} übernehmen.
+        Liefert die Anzahl neuer Zeilen; schon vorhandene Tage bleiben, wie sie sind."""
+        if not rates_data:
+            return 0
+        for day_rates in rates_data.values():
+            for currency in day_rates:
+                _check_currency(currency)
+        with self._write_lock():
+            self.refresh()
+            view = self._view
+            days = sorted(rates_data)
+            if len(view.dates) and _ordinal(days[0]) < int(view.dates[0]):
+                return self._rebuild(view, rates_data)
+
+            last = int(view.dates[-1]) if len(view.dates) else None
+            new_days = [d for d in days if last is None or _ordinal(d) > last]
+            if not new_days:
+                return 0
+            if last is None:
+                return self._rebuild(view, rates_data)
+            return self._append(view, new_days, rates_data)
+
+    def backfill(self, client, since=FIRST_FIXING, until=None, chunk_days=366):
+        """Fehlende Tage von der Frankfurter API laden: vor dem ersten
+        gespeicherten Datum bis zurück zu `since` und nach dem letzten bis
+        `until`, in Stücken von `chunk_days` Tagen. Liefert die neuen Zeilen."""
+        until = until or date.today()
+        self.refresh()
+        first, last = self.first_date(), self.last_date()
+
+        added = 0
+        if first is None:
+            added += self._fetch_range(client, since, until, chunk_days, append_each=True)
+            return added
+        if since < first:
+            # Vor dem Anfang: erst alles holen, dann einmal neu schreiben
+            added += self._fetch_range(client, since, first - timedelta(days=1), chunk_days, append_each=False)
+        if last < until:
+            added += self._fetch_range(client, last + timedelta(days=1), until, chunk_days, append_each=True)
+        return added
+
+    def _fetch_range(self, client, start, end, chunk_days, append_each):
+        collected = {}
+        added = 0
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(end, chunk_start + timedelta(days=chunk_days - 1))
+            result = client.get_json(f'/{chunk_start.isoformat()}..{chunk_end.isoformat()}',
+                                     {'from': self.base})
+            # Liegt der Bereich z.B. auf einem Wochenende, liefert die API den
+            # Werktag davor - nur Tage im angefragten Bereich übernehmen
+            lo, hi = chunk_start.isoformat(), chunk_end.isoformat()
+            chunk = {d: r for d, r in result.data.get('rates', {}).items() if lo <= d <= hi}
+            if append_each:
+                added += self.extend(chunk)
+            else:
+                collected.update(chunk)
+            chunk_start = chunk_end + timedelta(days=1)
+        if collected:
+            added += self.extend(collected)
+        return added
+
+    def _append(self, view, new_days, rates_data):
+        """Neue Tage an die Dateien der aktuellen Generation anhängen"""
+        meta = view.meta
+        directory = self._generation_path(meta['generation'])
+        rows = len(view.dates)
+        currencies = list(meta['currencies'])
+        for day in new_days:
+            for currency in rates_data[day]:
+                if currency not in currencies:
+                    currencies.append(currency)
+
+        ordinals = np.array([_ordinal(d) for d in new_days], dtype=np.int32)
+        for currency in currencies:
+            path = os.path.join(directory, f'{currency}.f8')
+            values = np.array([rates_data[d].get(currency, np.nan) for d in new_days], dtype=np.float64)
+            if currency in meta['currencies']:
+                _append_array(path, values, rows * 8)
+            else:
+                # Neue Währung: bisherige Zeilen ohne Kurs
+                np.concatenate([np.full(rows, np.nan), values]).tofile(path)
+
+        old_last = int(view.dates[-1])
+        calendar_tail = _calendar(ordinals, old_last + 1, int(ordinals[-1])) + rows
+        _append_array(os.path.join(directory, 'dates.i4'), ordinals, rows * 4)
+        _append_array(os.path.join(directory, 'calendar.i4'), calendar_tail, meta['days'] * 4)
+
+        self._write_meta(meta['generation'], rows + len(new_days),
+                         meta['days'] + len(calendar_tail), currencies)
+        return len(new_days)
+
+    def _rebuild(self, view, rates_data):
+        """Vorhandene und neue Tage in eine neue Generation schreiben"""
+        merged = {}
+        for row, ordinal in enumerate(view.dates.tolist()):
+            day = date.fromordinal(ordinal).isoformat()
+            merged[day] = {c: float(values[row]) for c, values in view.columns.items()
+                           if not np.isnan(values[row])}
+        added = sum(1 for d in rates_data if d not in merged)
+        for day, day_rates in rates_data.items():
+            merged.setdefault(day, day_rates)
+
+        days = sorted(merged)
+        currencies = sorted({c for r in merged.values() for c in r})
+        ordinals = np.array([_ordinal(d) for d in days], dtype=np.int32)
+
+        generation = (view.meta['generation'] + 1) if view.meta else 1
+        directory = self._generation_path(generation)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+        ordinals.tofile(os.path.join(directory, 'dates.i4'))
+        calendar = _calendar(ordinals, int(ordinals[0]), int(ordinals[-1]))
+        calendar.tofile(os.path.join(directory, 'calendar.i4'))
+        for currency in currencies:
+            values = np.array([merged[d].get(currency, np.nan) for d in days], dtype=np.float64)
+            values.tofile(os.path.join(directory, f'{currency}.f8'))
+
+        self._write_meta(generation, len(days), len(calendar), currencies)
+        if view.meta:
+            # Gemappte Dateien bleiben für laufende Leser gültig, bis sie neu mappen
+            shutil.rmtree(self._generation_path(view.meta['generation']), ignore_errors=True)
+        return added
+
+    def _write_meta(self, generation, rows, days, currencies):
+        meta = {'base': self.base, 'generation': generation, 'rows': rows,
+                'days': days, 'currencies': currencies}
+        tmp = f'{self._meta_path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._meta_path)
+        self.refresh()
+
+    @contextmanager
+    def _write_lock(self):
+        with open(os.path.join(self.path, 'lock'), 'w') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @property
+    def _meta_path(self):
+        return os.path.join(self.path, 'meta.json')
+
+    def _generation_path(self, generation):
+        return os.path.join(self.path, str(int(generation)))
+
+
+def _check_meta(meta):
+    """meta.json prüfen, bevor daraus Pfade werden: generation, rows und days
+    als nicht-negative Zahlen, Währungen als drei Großbuchstaben"""
+    for key in ('generation', 'rows', 'days'):
+        value = meta.get(key)
+        if type(value) is not int or value < 0:
+            raise ValueError(f"Ungültige meta.json: {key}={value!r}")
+    if not isinstance(meta.get('currencies'), list):
+        raise ValueError("Ungültige meta.json: currencies fehlt")
+    for currency in meta['currencies']:
+        _check_currency(currency)
+    return meta
+
+
+def _check_currency(currency):
+    if not isinstance(currency, str) or not CURRENCY.fullmatch(currency):
+        raise ValueError(f"Ungültige Währung: {currency!r}")
+
+
+def _map(path, dtype, length):
+    if not length:
+        return np.empty(0, dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=(length,))
+
+
+def _ordinal(day):
+    if isinstance(day, str):
+        day = date.fromisoformat(day)
+    return day.toordinal()
+
+
+def _calendar(ordinals, first_day, last_day):
+    """Für jeden Kalendertag von first_day bis last_day die Zeile (in
+    `ordinals`) des letzten Fixings an oder vor diesem Tag"""
+    days = np.arange(first_day, last_day + 1)
+    return (np.searchsorted(ordinals, days, side='right') - 1).astype(np.int32)
+
+
+def _truncate(path, size):
+    # Reste eines abgebrochenen Schreibvorgangs hinter der letzten gültigen Zeile verwerfen
+    if os.path.getsize(path) != size:
+        os.truncate(path, size)
+
+
+def _append_array(path, values, valid_size):
+    _truncate(path, valid_size)
+    with open(path, 'ab') as f:
+        f.write(values.tobytes())
+
+
+def main():
+    from upstream import UpstreamClient
+
+    parser = argparse.ArgumentParser(description='Lokale Kurshistorie (memory-mapped)')
+    parser.add_argument('--path', default=DEFAULT_PATH)
+    parser.add_argument('--backfill', action='store_true', help='fehlende Tage nachladen')
+    parser.add_argument('--since', default=FIRST_FIXING.isoformat())
+    args = parser.parse_args()
+
+    store = RateStore(args.path)
+    if args.backfill:
+        client = UpstreamClient(os.environ.get('FRANKFURTER_URL', 'https://api.frankfurter.app'), timeout=30)
+        added = store.backfill(client, date.fromisoformat(args.since))
+        print(f"{added} neue Tage")
+    print(f"{store.path}: {store.rows} Tage ({store.first_date()} bis {store.last_date()}), "
+          f"{len(store.currencies)} Währungen")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""Hintergrund-Aktualisierung der Caches (stale-while-revalidate).
+
+Jeder Cache wird als Job registriert. Ein Hintergrund-Thread berechnet ihn
+neu, bevor er abläuft, und Requests bekommen immer sofort den letzten guten
+Stand. Pro Job läuft höchstens eine Aktualisierung gleichzeitig (single-flight):
+im Prozess über ein Lock, zwischen gunicorn-Workern über die Lease im
+Cache-Backend.
+"""
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import metrics
+
+
+class RefreshJob:
+    """Ein Cache mit Builder-Funktion und Lebensdauer"""
+
+    def __init__(self, name, build, ttl, refresh_ratio=0.8):
+        self.name = name
+        self.build = build
+        self.ttl = ttl
+        self.refresh_after = ttl * refresh_ratio
+        self.lock = threading.Lock()    # single-flight im Prozess
+
+
+class RefreshScheduler:
+    """Hält registrierte Caches im Hintergrund aktuell"""
+
+    def __init__(self, cache, tick=1.0, lease_ttl=60, on_refresh=None):
+        self.cache = cache
+        self.tick = tick
+        self.lease_ttl = lease_ttl
+        self.on_refresh = on_refresh    # wird nach jedem neuen Stand mit dem Namen aufgerufen
+        self.jobs = {}
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def owner(self):
+        # Pro Prozess eindeutig, auch nach dem Fork der gunicorn-Worker
+        return f'{os.getpid()}-{_INSTANCE}'
+
+    def register(self, name, build, ttl):
+        self.jobs[name] = RefreshJob(name, build, ttl)
+
+    def age(self, name):
+        entry = self.cache.get(name)
+        if not entry:
+            return None
+        return time.time() - entry['timestamp']
+
+    def is_due(self, name):
+        age = self.age(name)
+        return age is None or age >= self.jobs[name].refresh_after
+
+    def start(self):
+        """Startet den Hintergrund-Thread (einmal pro Prozess, also nach dem Fork)"""
+        if self._thread and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='cache-refresh', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            for job in list(self.jobs.values()):
+                try:
+                    if not job.lock.locked() and self.is_due(job.name):
+                        self.refresh_async(job.name)
+                except Exception as e:
+                    print(f"Refresh scheduler error for {job.name}: {e}")
+            time.sleep(self.tick)
+
+    def refresh_async(self, name):
+        threading.Thread(target=self.refresh, args=(name, False), daemon=True).start()
+
+    def refresh(self, name, wait=True):
+        """Berechnet einen Cache neu. Läuft schon eine Aktualisierung (hier
+        oder in einem anderen Worker), wird keine zweite gestartet - mit
+        wait=True wird auf die laufende gewartet."""
+        job = self.jobs[name]
+
+        if not job.lock.acquire(blocking=False):
+            if wait:
+                with job.lock:
+                    pass
+            return False
+
+        try:
+            if not self.cache.acquire(name, self.owner, self.lease_ttl):
+                if wait:
+                    self._wait_for_other_worker(name)
+                return False
+
+            try:
+                # Ein anderer Worker könnte gerade fertig geworden sein
+                if not self.is_due(name):
+                    return False
+                with metrics.REFRESH_SECONDS.time(cache=name):
+                    data = job.build()
+                self.cache.set(name, data)
+            finally:
+                self.cache.release(name, self.owner)
+
+            if self.on_refresh:
+                try:
+                    self.on_refresh(name)
+                except Exception as e:
+                    print(f"Refresh callback error for {name}: {e}")
+            return True
+
+        except Exception as e:
+            # Letzten guten Stand behalten
+            metrics.REFRESH_ERRORS.inc(cache=name)
+            print(f"Refresh error for {name}: {e}")
+            return False
+        finally:
+            job.lock.release()
+
+    def _wait_for_other_worker(self, name):
+        deadline = time.time() + self.lease_ttl
+        while self.cache.get(name) is None and time.time() < deadline:
+            time.sleep(0.1)
+
+    def snapshot(self, name):
+        """Letzter guter Stand als Dict (data, timestamp, age, stale,
+        generation). Blockiert nur, solange noch gar kein Stand existiert
+        (Kaltstart); dann ist data None."""
+        self.start()
+        job = self.jobs[name]
+
+        entry = self.cache.get(name)
+        result = None
+        if entry is None:
+            result = 'miss'
+            self.refresh(name, wait=True)
+            entry = self.cache.get(name)
+            if entry is None:
+                metrics.CACHE_REQUESTS.inc(cache=name, result=result)
+                return {'data': None, 'timestamp': None, 'age': None, 'stale': True, 'generation': 0}
+
+        age = time.time() - entry['timestamp']
+        stale = age >= job.ttl
+        metrics.CACHE_REQUESTS.inc(cache=name, result=result or ('stale' if stale else 'hit'))
+        if stale and not job.lock.locked():
+            self.refresh_async(name)
+
+        return {
+            'data': entry['data'],
+            'timestamp': datetime.fromtimestamp(entry['timestamp']),
+            'age': age,
+            'stale': stale,
+            'generation': entry['generation']
+        }
+
+
+_INSTANCE = uuid.uuid4().hex[:8]
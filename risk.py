@@ -0,0 +1,151 @@
+"""Korrelation, Volatilität und ATR-Spanne über rollierende Fenster.
+
+Grundlage ist dieselbe Kursmatrix (Zeilen = Tage, älteste zuerst; Spalten =
+Instrumente) wie für die Indikatoren. Gerechnet wird auf Log-Renditen:
+
+- Korrelation und Volatilität aus der Kovarianzmatrix der letzten `window`
+  Renditen; die Volatilität annualisiert mit TRADING_DAYS
+- ATR-Spanne als mittlere absolute Kursänderung von Fixing zu Fixing - die
+  EZB liefert nur einen Kurs pro Tag, ohne Hoch und Tief
+
+rolling_risk rechnet ein Fenster komplett (Referenz, siehe tests/test_risk.py).
+RollingRisk hält die Summen Σr, Σr·rᵀ und Σ|Δp| der Zeilen im Fenster und
+schreibt sie pro neuem Tag mit O(k²) fort, statt O(window·k²) neu zu
+rechnen. Nach jeweils `window` Tagen werden die Summen aus dem Ring neu
+gebildet, damit sich keine Rundungsfehler aufsummieren (amortisiert
+ebenfalls O(k²)).
+"""
+import numpy as np
+
+from indicators import as_matrix
+
+TRADING_DAYS = 252
+
+
+def rolling_risk(prices, window):
+    """(Korrelation, annualisierte Volatilität, ATR-Spanne) über die letzten
+    `window` Renditen einer Kursmatrix; None ohne genug Kurse"""
+    prices = as_matrix(prices)
+    if len(prices) <= window:
+        return None
+    returns = np.diff(np.log(prices[-window - 1:]), axis=0)
+    changes = np.abs(np.diff(prices[-window - 1:], axis=0))
+    covariance = np.cov(returns, rowvar=False).reshape(prices.shape[1], prices.shape[1])
+    return _correlation(covariance), _volatility(covariance), changes.mean(axis=0)
+
+
+def _correlation(covariance):
+    std = np.sqrt(np.diag(covariance))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlation = covariance / np.outer(std, std)
+    # Konstante Kurse haben keine Korrelation
+    correlation[~np.isfinite(correlation)] = np.nan
+    np.clip(correlation, -1.0, 1.0, out=correlation)
+    return correlation
+
+
+def _volatility(covariance):
+    return np.sqrt(np.maximum(np.diag(covariance), 0) * TRADING_DAYS)
+
+
+def to_rows(matrix, digits=4):
+    """Matrix als gerundete verschachtelte Liste für JSON, NaN als None"""
+    matrix = np.round(matrix, digits)
+    rows = matrix.tolist()
+    if np.isnan(matrix).any():
+        rows = [[None if x != x else x for x in row] for row in rows]
+    return rows
+
+
+class RollingRisk:
+    """Laufende Summen über die letzten `window` Renditen von `columns` Instrumenten"""
+
+    __slots__ = ('window', 'columns', 'count', 'last', 'returns', 'changes', 'head',
+                 'total', 'cross', 'abs_total', 'since_rebuild')
+
+    def __init__(self, window, columns):
+        self.window = window
+        self.columns = columns
+        self.count = 0                                  # Renditen insgesamt
+        self.last = None                                # letzter Kurs pro Instrument
+        self.returns = np.zeros((window, columns))      # Ring der Log-Renditen
+        self.changes = np.zeros((window, columns))      # Ring der |Δp|
+        self.head = 0                                   # nächste Schreibposition
+        self.total = np.zeros(columns)                  # Σr
+        self.cross = np.zeros((columns, columns))       # Σr·rᵀ
+        self.abs_total = np.zeros(columns)              # Σ|Δp|
+        self.since_rebuild = 0
+
+    @property
+    def ready(self):
+        return self.count >= self.window
+
+    def extend(self, prices):
+        """Neue Kurszeilen (älteste zuerst) einarbeiten"""
+        prices = as_matrix(prices)
+        if not len(prices):
+            return
+        if self.last is not None:
+            prices = np.vstack([self.last, prices])
+        self.last = prices[-1].copy()
+        if len(prices) < 2:
+            return
+
+        returns = np.diff(np.log(prices), axis=0)
+        changes = np.abs(np.diff(prices, axis=0))
+
+        if len(returns) >= self.window:
+            # Mehr neue Zeilen als das Fenster: Ring direkt füllen, Summen in einem Schritt
+            self.returns[:] = returns[-self.window:]
+            self.changes[:] = changes[-self.window:]
+            self.head = 0
+            self.count += len(returns)
+            self._rebuild()
+            return
+
+        for r, c in zip(returns, changes):
+            self._push(r, c)
+
+    def _push(self, r, c):
+        if self.count >= self.window:
+            old_r = self.returns[self.head]
+            self.total -= old_r
+            self.cross -= np.outer(old_r, old_r)
+            self.abs_total -= self.changes[self.head]
+        self.returns[self.head] = r
+        self.changes[self.head] = c
+        self.head = (self.head + 1) % self.window
+        self.count += 1
+
+        self.since_rebuild += 1
+        if self.since_rebuild >= self.window:
+            self._rebuild()
+        else:
+            self.total += r
+            self.cross += np.outer(r, r)
+            self.abs_total += c
+
+    def _rebuild(self):
+        filled = min(self.count, self.window)
+        # Bei nicht vollem Ring liegen die Zeilen vor head
+        returns = self.returns if filled == self.window else self.returns[:filled]
+        changes = self.changes if filled == self.window else self.changes[:filled]
+        self.total = returns.sum(axis=0)
+        self.cross = returns.T @ returns
+        self.abs_total = changes.sum(axis=0)
+        self.since_rebuild = 0
+
+    def covariance(self):
+        n = self.window
+        return (self.cross - np.outer(self.total, self.total) / n) / (n - 1)
+
+    def correlation(self):
+        return _correlation(self.covariance())
+
+    def volatility(self):
+        """Annualisierte Volatilität der Log-Renditen"""
+        return _volatility(self.covariance())
+
+    def atr(self):
+        """Mittlere absolute Kursänderung im Fenster"""
+        return self.abs_total / self.window
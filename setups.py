@@ -0,0 +1,49 @@
+"""Setup-Regeln des Dashboards, getrennt von der Textausgabe.
+
+Trend: Kurs über der EMA -> bull, darunter -> bear, ohne EMA -> neutral.
+Long-Setup bei bull und RSI im LONG_BAND, Short-Setup bei bear und RSI im
+SHORT_BAND (jeweils exklusive Grenzen), sonst abwarten.
+
+analyze_pair wendet die Regeln auf die letzten Werte eines Paares an,
+backtest.py mit setup_matrix auf eine ganze Kursmatrix (Zeit x Instrument).
+"""
+import numpy as np
+
+LONG_BAND = (30, 60)
+SHORT_BAND = (40, 70)
+
+LONG, WAIT, SHORT = 1, 0, -1
+
+
+def trend(price, ema):
+    """'bull', 'bear' oder 'neutral' (noch keine EMA)"""
+    if not ema:
+        return 'neutral'
+    return 'bull' if price > ema else 'bear'
+
+
+def setup(trend, rsi, long_band=LONG_BAND, short_band=SHORT_BAND):
+    """'long', 'short' oder 'wait' für einen Trend und einen (gerundeten) RSI"""
+    if trend == 'bull' and rsi and long_band[0] < rsi < long_band[1]:
+        return 'long'
+    if trend == 'bear' and rsi and short_band[0] < rsi < short_band[1]:
+        return 'short'
+    return 'wait'
+
+
+def setup_matrix(prices, ema, rsi, long_band=LONG_BAND, short_band=SHORT_BAND):
+    """Setups für jede Zelle einer Kursmatrix als int8 (LONG, SHORT, WAIT).
+
+    Gleiche Regeln wie setup(): der RSI wird wie im Dashboard auf eine Stelle
+    gerundet, ein fehlender RSI zählt als 50; ohne EMA gibt es kein Setup."""
+    rsi = np.round(rsi, 1)
+    rsi = np.where(np.isnan(rsi) | (rsi == 0), 50.0, rsi)
+
+    has_ema = ~np.isnan(ema) & (ema != 0)
+    bull = has_ema & (prices > ema)
+    bear = has_ema & ~(prices > ema)
+
+    result = np.zeros(np.shape(prices), dtype=np.int8)
+    result[bull & (rsi > long_band[0]) & (rsi < long_band[1])] = LONG
+    result[bear & (rsi > short_band[0]) & (rsi < short_band[1])] = SHORT
+    return result
@@ -0,0 +1,107 @@
+"""Startup-Snapshot für einen schnellen Kaltstart.
+
+Auf dem Free-Plan legt Render den Dienst nach Inaktivität schlafen. Ohne
+Snapshot beginnt jeder Prozess mit leeren Caches, und der erste Aufruf von
+/api/rates wartet auf die Frankfurter API und den Aufbau der Indikatoren.
+
+Der Snapshot enthält den Kursverlauf, den Checkpoint der Indikatoren, die
+letzten Stände der Caches und die fertig serialisierten Antworten. app.py
+schreibt ihn nach jedem Refresh und beim Beenden und lädt ihn beim Import,
+also vor dem ersten Request. Dann kommt die erste Antwort sofort aus dem
+Snapshot (als stale markiert, falls zu alt), und der Refresh lädt im
+Hintergrund nur die fehlenden Tage nach.
+
+Die Datei (STATE_SNAPSHOT) ist JSON - Bytes (fertig komprimierte Antworten)
+als Base64 - und wird beim Laden nur als Daten gelesen, nie ausgeführt. Sie
+liegt standardmäßig in state/ neben app.py (Verzeichnis nur für den Dienst
+lesbar), nicht im für alle beschreibbaren /tmp. Geschrieben wird über eine
+temporäre Datei und os.replace, Leser sehen nie einen halben Stand.
+
+    python state_snapshot.py              # Caches berechnen und Snapshot schreiben (z.B. im Build)
+    python state_snapshot.py --path DATEI
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import tempfile
+import threading
+
+VERSION = 2
+
+DEFAULT_PATH = os.environ.get('STATE_SNAPSHOT', os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'state', 'trading-state.json'))
+
+_write_lock = threading.Lock()
+
+
+def save(state, path=None):
+    """Zustand (Dict) atomar schreiben; liefert die Größe in Bytes"""
+    path = path or DEFAULT_PATH
+    payload = json.dumps({'version': VERSION, **state}, default=_encode_bytes,
+                         separators=(',', ':')).encode('utf-8')
+    directory = os.path.dirname(os.path.abspath(path))
+    with _write_lock:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.snapshot-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    return len(payload)
+
+
+def load(path=None):
+    """Zustand aus dem Snapshot oder None (keine Datei, defekt, andere Version)"""
+    path = path or DEFAULT_PATH
+    try:
+        with open(path, 'rb') as f:
+            state = json.load(f, object_hook=_decode_bytes)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"State snapshot load error for {path}: {e}")
+        return None
+    if not isinstance(state, dict) or state.get('version') != VERSION:
+        return None
+    return state
+
+
+def _encode_bytes(value):
+    if isinstance(value, bytes):
+        return {'__bytes__': base64.b64encode(value).decode('ascii')}
+    raise TypeError(f'Nicht serialisierbar: {type(value).__name__}')
+
+
+def _decode_bytes(obj):
+    if len(obj) == 1 and '__bytes__' in obj:
+        return base64.b64decode(obj['__bytes__'])
+    return obj
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Startup-Snapshot des Trading-Backends schreiben')
+    parser.add_argument('--path', help=f'Snapshot-Datei (Standard: {DEFAULT_PATH})')
+    args = parser.parse_args()
+    if args.path:
+        os.environ['STATE_SNAPSHOT'] = os.path.abspath(args.path)
+
+    import app
+
+    for name in app.scheduler.jobs:
+        app.scheduler.refresh(name)
+    size = app.save_state()
+    if not size:
+        # Kein Abbruch (z.B. im Build): der Dienst startet dann eben ohne Snapshot
+        print("Kein Snapshot geschrieben - keine Daten geladen")
+        return 0
+    print(f"Snapshot geschrieben: {app.state_snapshot.DEFAULT_PATH} ({size} Bytes)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""Server-Sent Events für Kurs-, News- und Kalender-Updates.
+
+Ein Watcher-Thread pro Prozess beobachtet die Generationen im Cache-Backend
+(damit sieht jeder gunicorn-Worker auch Aktualisierungen, die ein anderer
+Worker berechnet hat). Nur bei einer neuen Generation wird ein Event
+erzeugt - bei den Kursen nur mit den Paaren, deren Werte sich geändert haben.
+Die Events landen in einem kleinen Ring, aus dem alle verbundenen Clients
+lesen; bei Reconnect mit Last-Event-ID werden verpasste Events nachgeliefert.
+
+Event-IDs haben die Form '<epoch>:<seq>'. Die Epoche ist pro Prozess
+eindeutig (auch nach dem Fork der gunicorn-Worker): landet ein Reconnect bei
+einem anderen Worker oder nach einem Neustart, passt sie nicht, und der
+Client bekommt den kompletten Stand statt fremder Nummern.
+
+Jede offene Verbindung belegt einen Thread (gthread-Worker). Mit max_clients
+sind es bewusst höchstens so viele gleichzeitig, damit normale Requests nicht
+verhungern; darüber antwortet /api/stream mit 503 (siehe SETUP.md).
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+
+
+class UpdateStream:
+    """Verteilt Cache-Änderungen als SSE-Events an alle Clients eines Prozesses"""
+
+    def __init__(self, cache, names, poll=1.0, history=256, heartbeat=15, max_clients=50):
+        self.cache = cache
+        self.names = names              # Cache-Name -> Event-Name
+        self.poll = poll
+        self.heartbeat = heartbeat
+        self.events = deque(maxlen=history)     # (seq, event, json)
+        self.seq = 0
+        self.generations = {}
+        self.last_data = {}
+        self.condition = threading.Condition()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.max_clients = max_clients
+        self.clients = 0
+        self._clients_lock = threading.Lock()
+        self._token = uuid.uuid4().hex[:8]
+
+    @property
+    def epoch(self):
+        # Mit der PID, damit geforkte Worker nicht dieselbe Epoche erben
+        return f'{os.getpid():x}{self._token}'
+
+    def event_id(self, seq):
+        return f'{self.epoch}:{seq}'
+
+    def parse_id(self, last_event_id):
+        """Last-Event-ID -> seq, oder None, wenn sie nicht aus diesem Prozess stammt"""
+        epoch, _, seq = (last_event_id or '').rpartition(':')
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def connect(self, last_event_id=None):
+        """Neue SSE-Verbindung (iterierbar, mit close) oder None, wenn schon
+        max_clients Verbindungen offen sind"""
+        with self._clients_lock:
+            if self.clients >= self.max_clients:
+                return None
+            self.clients += 1
+        return _Connection(self, self.subscribe(last_event_id))
+
+    def _disconnect(self):
+        with self._clients_lock:
+            self.clients -= 1
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='sse-watch', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"Stream watcher error: {e}")
+            time.sleep(self.poll)
+
+    def poll_once(self):
+        """Neue Generationen im Cache als Events veröffentlichen"""
+        for name, event in self.names.items():
+            entry = self.cache.get(name)
+            if not entry or self.generations.get(name) == entry['generation']:
+                continue
+            self.generations[name] = entry['generation']
+
+            payload = diff(self.last_data.get(name), entry['data'])
+            self.last_data[name] = entry['data']
+            if payload is not None:
+                payload['timestamp'] = datetime.fromtimestamp(entry['timestamp']).isoformat()
+                self.publish(event, payload)
+
+    def publish(self, event, payload):
+        with self.condition:
+            self.seq += 1
+            self.events.append((self.seq, event, json.dumps(payload, ensure_ascii=False)))
+            self.condition.notify_all()
+
+    def subscribe(self, last_event_id=None):
+        """Generator für eine SSE-Verbindung; last_event_id ist der Header
+        Last-Event-ID des Clients (String)"""
+        self.start()
+        yield 'retry: 5000\n\n'
+
+        last_event_id = self.parse_id(last_event_id)
+        with self.condition:
+            oldest = self.events[0][0] if self.events else self.seq + 1
+            resumable = last_event_id is not None and oldest - 1 <= last_event_id <= self.seq
+            cursor = last_event_id if resumable else self.seq
+
+        if not resumable:
+            # Neuer Client: einmal den kompletten Stand schicken
+            for name, event in self.names.items():
+                entry = self.cache.get(name)
+                if entry:
+                    payload = {'full': True, 'data': entry['data'],
+                               'timestamp': datetime.fromtimestamp(entry['timestamp']).isoformat()}
+                    yield format_event(self.event_id(cursor), event, json.dumps(payload, ensure_ascii=False))
+
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.seq > cursor, timeout=self.heartbeat)
+                pending = [e for e in self.events if e[0] > cursor]
+
+            if not pending:
+                # Kommentarzeile hält Proxies und Client-Verbindung offen
+                yield ': ping\n\n'
+                continue
+
+            for seq, event, data in pending:
+                yield format_event(self.event_id(seq), event, data)
+                cursor = seq
+
+
+def diff(old, new):
+    """Änderungen zwischen zwei Ständen; None, wenn sich nichts geändert hat.
+
+    Bei Dicts (Kurse pro Paar) nur die geänderten und entfernten Schlüssel,
+    sonst der komplette neue Stand."""
+    if old == new:
+        return None
+    if isinstance(old, dict) and isinstance(new, dict):
+        return {
+            'full': False,
+            'changed': {k: v for k, v in new.items() if old.get(k) != v},
+            'removed': [k for k in old if k not in new]
+        }
+    return {'full': True, 'data': new}
+
+
+def format_event(event_id, event, data):
+    return f'id: {event_id}\nevent: {event}\ndata: {data}\n\n'
+
+
+class _Connection:
+    """Eine offene Verbindung; close() (ruft der WSGI-Server beim Abbruch
+    auf) gibt den Platz wieder frei, auch wenn der Generator nie lief"""
+
+    def __init__(self, stream, events):
+        self.stream = stream
+        self.events = events
+        self.closed = False
+
+    def __iter__(self):
+        return self.events
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.events.close()
+            self.stream._disconnect()
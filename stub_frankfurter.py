@@ -0,0 +1,155 @@
+"""Lokaler Stub der Frankfurter API zum Testen ohne Internet.
+
+Liefert /latest und /<start>..<end> im Format der echten API (Basis USD),
+wahlweise aus einer aufgezeichneten Fixture-Datei oder aus einem
+deterministischen Random Walk. Latenz und Fehler lassen sich simulieren:
+
+    python stub_frankfurter.py --port 8081 --latency 0.2 --failure-rate 0.3
+    FRANKFURTER_URL=http://127.0.0.1:8081 gunicorn app:app
+
+Im Code: StubServer(latency=0.1).start() liefert die Basis-URL.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Ungefähre USD-Kurse der EZB-Währungen als Startwerte für den Random Walk
+START_RATES = {
+    'AUD': 1.52, 'BGN': 1.80, 'BRL': 5.0, 'CAD': 1.36, 'CHF': 0.88,
+    'CNY': 7.2, 'CZK': 23.0, 'DKK': 6.86, 'EUR': 0.92, 'GBP': 0.79,
+    'HKD': 7.8, 'HUF': 360.0, 'IDR': 15700.0, 'ILS': 3.7, 'INR': 83.0,
+    'ISK': 138.0, 'JPY': 150.0, 'KRW': 1340.0, 'MXN': 17.1, 'MYR': 4.7,
+    'NOK': 10.7, 'NZD': 1.66, 'PHP': 56.0, 'PLN': 4.0, 'RON': 4.6,
+    'SEK': 10.6, 'SGD': 1.35, 'THB': 36.0, 'TRY': 32.0, 'ZAR': 18.7,
+}
+
+
+def random_walk(start, end, seed=1):
+    """Tageskurse (nur Werktage) im Frankfurter-Format {datum: {währung: kurs}}"""
+    rng = random.Random(seed)
+    rates = dict(START_RATES)
+    result = {}
+    day = start
+    while day <= end:
+        if day.weekday() < 5:
+            for currency in rates:
+                rates[currency] *= 1 + rng.gauss(0, 0.004)
+            result[day.isoformat()] = {c: float(f'{r:.5g}') for c, r in rates.items()}
+        day += timedelta(days=1)
+    return result
+
+
+class StubServer:
+    """Frankfurter-Stub in einem Hintergrund-Thread"""
+
+    def __init__(self, rates=None, latency=0.0, failure_rate=0.0, fail_first=0,
+                 host='127.0.0.1', port=0):
+        if rates is None:
+            today = date.today()
+            rates = random_walk(today - timedelta(days=730), today)
+        self.rates = rates
+        self.dates = sorted(rates)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.fail_first = fail_first    # die ersten N Requests schlagen fehl
+        self.requests = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self.url
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def respond(self, path):
+        """(status, body) für einen Request-Pfad"""
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.requests <= self.fail_first or random.random() < self.failure_rate:
+            return 503, {'message': 'simulated failure'}
+
+        parsed = urlparse(path)
+        query = parse_qs(parsed.query)
+        base = query.get('from', ['USD'])[0]
+        if base != 'USD':
+            return 422, {'message': 'stub only supports from=USD'}
+        endpoint = parsed.path.strip('/')
+
+        if endpoint == 'latest':
+            last = self.dates[-1]
+            return 200, {'amount': 1.0, 'base': 'USD', 'date': last, 'rates': self.rates[last]}
+
+        if '..' in endpoint:
+            start, _, end = endpoint.partition('..')
+            end = end or self.dates[-1]
+            selected = {d: self.rates[d] for d in self.dates if start <= d <= end}
+            if not selected and start > self.dates[-1]:
+                # Wie die echte API: Beginn nach dem letzten Fixing -> letzter Werktag
+                selected = {self.dates[-1]: self.rates[self.dates[-1]]}
+            if not selected:
+                return 404, {'message': 'not found'}
+            return 200, {'amount': 1.0, 'base': 'USD', 'start_date': min(selected),
+                         'end_date': max(selected), 'rates': selected}
+
+        return 404, {'message': 'not found'}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                status, body = stub.respond(self.path)
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Frankfurter API Stub')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0.0, help='Sekunden pro Request')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Anteil 503-Antworten')
+    parser.add_argument('--fail-first', type=int, default=0, help='erste N Requests mit 503')
+    parser.add_argument('--fixture', help='JSON-Datei im Frankfurter-Zeitreihenformat')
+    args = parser.parse_args()
+
+    rates = None
+    if args.fixture:
+        with open(args.fixture) as f:
+            rates = json.load(f)['rates']
+
+    server = StubServer(rates, args.latency, args.failure_rate, args.fail_first, args.host, args.port)
+    print(f"Frankfurter stub on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+import os
+import sys
+
+# Die Module liegen flach neben app.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import date, timedelta  # noqa: E402
+
+import pytest  # noqa: E402
+
+from stub_frankfurter import StubServer, random_walk  # noqa: E402
+
+ALERT_TOKENS = {'alice': 'alice-token', 'bob': 'bob-token'}
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    """app.py einmal pro Testlauf, gegen den Frankfurter-Stub und mit Kursen,
+    Snapshot und Cache in einem eigenen Verzeichnis"""
+    server = StubServer(random_walk(date.today() - timedelta(days=500), date.today()))
+    workdir = tmp_path_factory.mktemp('app')
+    patch = pytest.MonkeyPatch()
+    patch.setenv('FRANKFURTER_URL', server.start())
+    patch.setenv('CACHE_BACKEND', 'memory')
+    patch.setenv('RATE_STORE', str(workdir / 'rates'))
+    patch.setenv('STATE_SNAPSHOT', str(workdir / 'state.json'))
+    patch.setenv('ALERT_TOKENS', ','.join(f'{name}:{token}' for name, token in ALERT_TOKENS.items()))
+    import app
+    app.stub = server
+    yield app
+    server.stop()
+    patch.undo()
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
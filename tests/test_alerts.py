@@ -0,0 +1,123 @@
+"""Alarm-Regeln: Parser, ThresholdIndex und AlertEngine gegen eine
+direkte Auswertung jeder Regel"""
+import random
+
+import numpy as np
+import pytest
+
+import alerts
+
+
+@pytest.mark.parametrize('condition, triggers', [
+    ('RSI(14) < 30', [('rsi(14)', '<', 30.0, False)]),
+    ('30 > rsi(14)', [('rsi(14)', '<', 30.0, False)]),
+    ('price > EMA(50)', [('price-ema(50)', '>', 0.0, False)]),
+    ('price crosses EMA(50)', [('price-ema(50)', '>', 0.0, True), ('price-ema(50)', '<', 0.0, True)]),
+    ('EMA(20) crosses above EMA(50)', [('ema(20)-ema(50)', '>', 0.0, True)]),
+    ('1.1 crosses above price', [('price', '<', 1.1, True)]),
+    ('within 0.2% of support', [('price~support(20)', '<=', 0.2, False)]),
+    ('close within 1% of resistance(10)', [('price~resistance(10)', '<=', 1.0, False)]),
+])
+def test_parse(condition, triggers):
+    assert [tuple(t) for t in alerts.parse(condition)] == triggers
+
+
+@pytest.mark.parametrize('condition', ['RSI < 30', 'price < 1 < 2', 'foo > 1', '1 < 2', 'price > price',
+                                       'RSI(1) < 30', 'price(5) > 1', 'within -1% of support'])
+def test_parse_rejects(condition):
+    with pytest.raises(ValueError):
+        alerts.parse(condition)
+
+
+@pytest.mark.parametrize('op', ['<', '<=', '>', '>='])
+def test_threshold_index_matches_direct_evaluation(op):
+    rng = random.Random(op)
+    # Schwellen mit Duplikaten, Werte genau auf den Schwellen
+    thresholds = [rng.choice([10, 20, 20, 30, 40]) + rng.choice([0, 0.5]) for _ in range(60)]
+    index = alerts.ThresholdIndex(op)
+    for n, threshold in enumerate(thresholds):
+        index.add(threshold, n, False)
+    assert index.thresholds == sorted(thresholds)
+
+    values = [5, 10, 20, 20, 20.5, 30, 45, 40, 40.5, 10, 0, 30.5, 30]
+    for old, new in zip(values, values[1:]):
+        expected = {n for n, t in enumerate(thresholds)
+                    if not alerts.holds(op, old, t) and alerts.holds(op, new, t)}
+        assert {rule_id for rule_id, _ in index.crossed(old, new)} == expected, (old, new)
+
+
+def test_engine_fires_on_transitions_only():
+    rules = [{'id': 'low', 'symbol': 'EURUSD', 'condition': 'price < 1.0'},
+             {'id': 'cross', 'symbol': 'EURUSD', 'condition': 'price crosses above 1.05'}]
+    engine = alerts.AlertEngine()
+    engine.load(alerts.compile_rules(rules))
+    closes = [0.99, 1.02, 0.98, 0.97, 1.06, 1.07, 1.04, 1.08]
+    fired = []
+    for n, price in enumerate(closes):
+        day = f'2024-01-{n + 1:02d}'
+        fired.append(sorted(a['rule'] for a in engine.update([day], np.array([[price]]), ['EURUSD'])))
+    # Erste Prüfung: bereits erfüllt -> 'low' sofort, crosses nie beim ersten Mal
+    assert fired == [['low'], [], ['low'], [], ['cross'], [], [], ['cross']]
+
+
+def test_engine_matches_brute_force():
+    rng = random.Random(7)
+    symbols = ['EURUSD', 'GBPUSD', 'USDJPY']
+    conditions = ['RSI(5) < {a}', 'RSI(5) >= {b}', 'price crosses EMA(10)', 'within {p}% of support(8)',
+                  'EMA(5) crosses below EMA(10)', 'price > {lvl}']
+    rules = [{'id': str(n), 'symbol': rng.choice(symbols),
+              'condition': rng.choice(conditions).format(a=rng.randint(20, 50), b=rng.randint(50, 80),
+                                                         p=rng.randint(1, 20) / 10, lvl=round(rng.uniform(0.95, 1.05), 3))}
+             for n in range(300)]
+    plan = alerts.compile_rules(rules)
+    matrix = np.cumprod(1 + np.random.default_rng(3).normal(0, 0.01, (80, 3)), axis=0)
+    dates = [f'2024-{n:03d}' for n in range(80)]
+
+    engine = alerts.AlertEngine()
+    engine.load(plan)
+    engine.update(dates[:30], matrix[:30], symbols)
+
+    # Referenz: eigene Indikatoren, jede Regel direkt auswerten
+    states = {s: {k: alerts.make_indicator(k) for k in plan.indicators.get(s, ())} for s in symbols}
+    truth = {}
+    for row in range(80):
+        current = {}
+        for column, symbol in enumerate(symbols):
+            price = float(matrix[row, column])
+            values = {'price': price}
+            for key, indicator in states[symbol].items():
+                indicator.update(price)
+                if key.startswith('levels'):
+                    values['support' + key[6:]] = indicator.support
+                    values['resistance' + key[6:]] = indicator.resistance
+                else:
+                    values[key] = indicator.value
+            current[symbol] = values
+        previous, truth = truth, {}
+        for rule in plan.rules.values():
+            for n, trigger in enumerate(rule.triggers):
+                value = alerts.feature_value(trigger.feature, current[rule.symbol])
+                truth[rule.id, n] = None if value is None else alerts.holds(trigger.op, value, trigger.threshold)
+        if row < 30:
+            continue
+        expected = {(rule_id, rule.triggers[n].feature) for (rule_id, n), now in truth.items()
+                    for rule in [plan.rules[rule_id]] if now and previous.get((rule_id, n)) is False}
+        fired = engine.update(dates[row:row + 1], matrix[row:row + 1], symbols)
+        assert {(a['rule'], a['feature']) for a in fired} == expected, dates[row]
+
+
+def test_engine_checkpoint_roundtrip():
+    rules = [{'id': '1', 'symbol': 'EURUSD', 'condition': 'RSI(3) > 60'}]
+    matrix = np.cumprod(1 + np.random.default_rng(5).normal(0, 0.01, (40, 1)), axis=0)
+    dates = [f'2024-{n:03d}' for n in range(40)]
+    engine = alerts.AlertEngine()
+    engine.load(alerts.compile_rules(rules))
+    engine.update(dates[:20], matrix[:20], ['EURUSD'])
+
+    restored = alerts.AlertEngine()
+    restored.load(alerts.compile_rules(rules))
+    restored.restore(engine.export())
+    assert restored.after == engine.after
+    for row in range(20, 40):
+        assert (restored.update(dates[row:row + 1], matrix[row:row + 1], ['EURUSD'])
+                == engine.update(dates[row:row + 1], matrix[row:row + 1], ['EURUSD']))
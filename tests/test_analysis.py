@@ -0,0 +1,76 @@
+"""build_rates: Analyse aller Paare mit Deadline und Rückfall auf den letzten Stand"""
+import threading
+
+import pytest
+
+import metrics
+
+
+def fallbacks(symbol, reason):
+    return metrics.ANALYSIS_FALLBACKS._values.get(metrics.ANALYSIS_FALLBACKS._key(
+        {'instrument': symbol, 'reason': reason}), 0)
+
+
+def test_late_pair_falls_back_to_last_analysis_marked_stale(app_module, client, monkeypatch):
+    assert client.get('/api/rates').status_code == 200
+    previous = app_module.cache.get('analysis')['data']
+    slow, fast = app_module.INSTRUMENTS[0], app_module.INSTRUMENTS[1]
+    assert previous[slow.key]['price'] != app_module.PENDING_RATES['price']
+
+    release = threading.Event()
+    analyze_pair = app_module.analyze_pair
+
+    def blocking(name, symbol, levels=None):
+        if symbol == slow.symbol:
+            release.wait(10)
+        return analyze_pair(name, symbol, levels)
+
+    monkeypatch.setattr(app_module, 'analyze_pair', blocking)
+    monkeypatch.setattr(app_module, 'REFRESH_DEADLINE', 0.5)
+    late, busy = fallbacks(slow.symbol, 'late'), fallbacks(slow.symbol, 'busy')
+    try:
+        data = app_module.build_rates()
+        assert data[slow.key] == dict(previous[slow.key], stale=True)
+        assert data[fast.key]['stale'] is False
+        assert fallbacks(slow.symbol, 'late') == late + 1
+
+        # Die alte Analyse läuft noch: keine zweite für dasselbe Paar
+        data = app_module.build_rates()
+        assert data[slow.key]['stale'] is True
+        assert fallbacks(slow.symbol, 'busy') == busy + 1
+    finally:
+        release.set()
+        app_module.analysis_running[slow.symbol].result(10)
+
+
+def test_failed_pair_without_previous_gets_placeholder(app_module, client, monkeypatch):
+    assert client.get('/api/rates').status_code == 200
+    failing = app_module.INSTRUMENTS[0]
+    analyze_pair = app_module.analyze_pair
+    monkeypatch.setattr(app_module, 'analyze_pair', lambda name, symbol, levels=None: (
+        None if symbol == failing.symbol else analyze_pair(name, symbol, levels)))
+
+    # Letzter Stand des Paares ist selbst nur der Platzhalter
+    get = app_module.cache.get
+    entry = get('analysis')
+    previous = dict(entry, data=dict(entry['data'], **{failing.key: dict(app_module.PENDING_RATES)}))
+    monkeypatch.setattr(app_module.cache, 'get', lambda name: previous if name == 'analysis' else get(name))
+    errors = fallbacks(failing.symbol, 'error')
+    data = app_module.build_rates()
+    assert data[failing.key] == app_module.PENDING_RATES
+    assert fallbacks(failing.symbol, 'error') == errors
+
+
+def test_nothing_analysed_keeps_previous(app_module, client, monkeypatch):
+    assert client.get('/api/rates').status_code == 200
+    monkeypatch.setattr(app_module, 'analyze_pair', lambda *args: None)
+    # Abbruch: der Scheduler behält dann den letzten guten Stand
+    with pytest.raises(RuntimeError):
+        app_module.build_rates()
+
+
+def test_stale_history_marks_fresh_analysis(app_module, client, monkeypatch):
+    assert client.get('/api/rates').status_code == 200
+    monkeypatch.setattr(app_module.rate_history, 'stale', True)
+    data = app_module.build_rates()
+    assert all(entry['stale'] is True for entry in data.values())
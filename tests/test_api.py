@@ -0,0 +1,68 @@
+"""Endpoints über den Flask-Test-Client (app gegen den Frankfurter-Stub)"""
+import gzip
+
+import numpy as np
+import pytest
+
+import indicators
+import instruments
+
+
+def test_indicators_do_not_depend_on_co_requested_pairs(app_module, client, monkeypatch):
+    history = app_module.rate_history
+    assert client.get('/api/indicators?pairs=EURUSD').status_code == 200
+    # JPY fehlt an einigen Tagen: die gemeinsame Matrix mit USDJPY hätte weniger Zeilen
+    rates = dict(history.rates, JPY=[None if n % 7 == 3 else v for n, v in enumerate(history.rates['JPY'])])
+    monkeypatch.setattr(history, 'rates', rates)
+    monkeypatch.setattr(history, 'version', history.version + 1000)
+
+    together = client.get('/api/indicators?pairs=USDJPY,EURUSD&ema=20&rsi=14&sr=20').get_json()['data']
+    alone = client.get('/api/indicators?pairs=EURUSD&ema=20&rsi=14&sr=20').get_json()['data']
+    key = instruments.get('EURUSD').key
+    assert together[key] == alone[key]
+
+    prices = app_module.get_price_matrix(['EURUSD'], None)
+    assert together[key]['ema']['20'] == indicators.to_float(indicators.ema(prices, 20)[-1, 0])
+    jpy = instruments.get('USDJPY')
+    assert len(app_module.get_price_matrix(['USDJPY'], None)) < len(prices)
+    assert together[jpy.key]['ema']['20'] == indicators.to_float(
+        indicators.ema(app_module.get_price_matrix(['USDJPY'], None), 20)[-1, 0])
+    assert np.isfinite(together[key]['ema']['20'])
+
+
+def test_rates_etag_and_304(client):
+    first = client.get('/api/rates')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert first.headers['Vary'] == 'Accept-Encoding'
+    assert 'Content-Encoding' not in first.headers
+
+    cached = client.get('/api/rates', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.headers['ETag'] == etag
+    assert not cached.data
+
+    other = client.get('/api/rates', headers={'If-None-Match': '"something-else"'})
+    assert other.status_code == 200 and other.data == first.data
+
+
+def test_gzip_is_its_own_representation(client):
+    plain = client.get('/api/rates')
+    gzipped = client.get('/api/rates', headers={'Accept-Encoding': 'gzip'})
+    assert gzipped.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(gzipped.data) == plain.data
+    assert gzipped.headers['ETag'] != plain.headers['ETag']
+
+    # Die ETag der unkomprimierten Antwort passt nicht auf die gzip-Variante
+    cross = client.get('/api/rates', headers={'Accept-Encoding': 'gzip', 'If-None-Match': plain.headers['ETag']})
+    assert cross.status_code == 200
+    same = client.get('/api/rates', headers={'Accept-Encoding': 'gzip', 'If-None-Match': gzipped.headers['ETag']})
+    assert same.status_code == 304
+
+
+@pytest.mark.parametrize('accept', ['gzip;q=0', 'gzip;q=0, identity', 'identity', 'deflate'])
+def test_refused_gzip_sends_identity(client, accept):
+    response = client.get('/api/rates', headers={'Accept-Encoding': accept})
+    assert response.status_code == 200
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_json()['success']
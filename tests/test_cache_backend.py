@@ -0,0 +1,87 @@
+"""Cache-Backends: Einträge, Leases zwischen Workern und Speicherort"""
+import threading
+import time
+
+import pytest
+
+import cache_backend
+from cache_backend import MemoryCache, SQLiteCache
+from refresh import RefreshScheduler
+
+
+def test_sqlite_default_is_private(tmp_path, monkeypatch):
+    monkeypatch.delenv('CACHE_PATH', raising=False)
+    monkeypatch.setattr(cache_backend, 'DEFAULT_PATH', str(tmp_path / 'state' / 'cache.sqlite3'))
+    cache = cache_backend.make_cache('sqlite')
+    assert isinstance(cache, SQLiteCache)
+    assert cache.path.startswith(str(tmp_path))
+    assert (tmp_path / 'state').stat().st_mode & 0o077 == 0
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def shared(request, tmp_path):
+    """Zwei Worker-Sichten auf denselben Cache: bei SQLite zwei Verbindungen
+    auf eine Datei, im Speicher dasselbe Objekt"""
+    if request.param == 'memory':
+        cache = MemoryCache()
+        return cache, cache
+    path = str(tmp_path / 'cache.sqlite3')
+    return SQLiteCache(path), SQLiteCache(path)
+
+
+def test_entries_shared_between_workers(shared):
+    a, b = shared
+    assert a.set('rates', {'EUR/USD': 1.1}, 100.0) == 1
+    assert b.get('rates') == {'data': {'EUR/USD': 1.1}, 'timestamp': 100.0, 'generation': 1}
+    assert b.set('rates', {'EUR/USD': 1.2}) == 2
+    assert a.get('rates')['data'] == {'EUR/USD': 1.2}
+
+
+def test_lease_excludes_other_owner(shared):
+    a, b = shared
+    assert a.acquire('analysis', 'worker-a', ttl=60)
+    assert not b.acquire('analysis', 'worker-b', ttl=60)
+    assert a.acquire('analysis', 'worker-a', ttl=60)     # Inhaber verlängert
+    b.release('analysis', 'worker-b')                      # fremde Lease bleibt
+    assert not b.acquire('analysis', 'worker-b', ttl=60)
+    a.release('analysis', 'worker-a')
+    assert b.acquire('analysis', 'worker-b', ttl=60)
+
+
+def test_expired_lease_can_be_taken(shared):
+    a, b = shared
+    assert a.acquire('analysis', 'worker-a', ttl=0.05)
+    time.sleep(0.1)
+    assert b.acquire('analysis', 'worker-b', ttl=60)
+    assert not a.acquire('analysis', 'worker-a', ttl=60)
+
+
+def test_refresh_runs_in_one_worker_only(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    calls, release = [], threading.Event()
+
+    def build():
+        calls.append(1)
+        release.wait(5)
+        return 'data'
+
+    class Worker(RefreshScheduler):
+        def __init__(self, owner):
+            super().__init__(SQLiteCache(path), tick=60)
+            self._owner = owner
+            self.register('analysis', build, ttl=300)
+
+        @property
+        def owner(self):
+            return self._owner
+
+    first, second = Worker('a'), Worker('b')
+    thread = threading.Thread(target=first.refresh, args=('analysis',))
+    thread.start()
+    while not calls:
+        time.sleep(0.01)
+    assert second.refresh('analysis', wait=False) is False
+    release.set()
+    thread.join(5)
+    assert calls == [1]
+    assert second.snapshot('analysis')['data'] == 'data'
@@ -0,0 +1,96 @@
+"""Wirtschaftskalender: indizierte Abfragen gegen einen Scan über alle Termine"""
+import json
+import os
+import random
+from datetime import date, timedelta
+
+import pytest
+
+import econ_calendar
+
+CURRENCIES = ['EUR', 'USD', 'GBP', 'JPY']
+
+
+def random_events(n, seed=0):
+    rng = random.Random(seed)
+    start = date(2024, 1, 1)
+    return [econ_calendar.make_event(start + timedelta(days=rng.randrange(0, 60)),
+                                     f'{rng.randrange(0, 24):02d}:{rng.choice(["00", "30"])}',
+                                     rng.choice(CURRENCIES), f'Termin {k}', rng.choice(econ_calendar.IMPACTS))
+            for k in range(n)]
+
+
+def brute_force(events, start, end, currency=None, impact=None):
+    selected = [e for e in events if start <= e.day <= end
+                and (currency is None or e.currency == currency.upper())
+                and (impact is None or e.impact == impact.lower())]
+    selected.sort(key=lambda e: (e.day, e.time, e.currency, e.event))
+    return [e.to_dict() for e in selected]
+
+
+def test_queries_match_brute_force():
+    events = random_events(400)
+    calendar = econ_calendar.EventCalendar(events)
+    rng = random.Random(1)
+    for _ in range(300):
+        start = date(2023, 12, 25) + timedelta(days=rng.randrange(0, 75))
+        end = start + timedelta(days=rng.randrange(-2, 20))
+        currency = rng.choice([None, 'eur', 'USD', 'CHF'])
+        impact = rng.choice([None, 'high', 'Medium', 'low'])
+        result = calendar.query_json(start, end, currency, impact)
+        assert json.loads(result) == brute_force(events, start, end, currency, impact), (start, end, currency, impact)
+
+
+def test_edges():
+    events = random_events(50, seed=2)
+    calendar = econ_calendar.EventCalendar(events)
+    first, last = min(e.day for e in events), max(e.day for e in events)
+    assert calendar.query(first, last) == brute_force(events, first, last)
+    assert calendar.query(first, first) == brute_force(events, first, first)
+    assert calendar.query_json(last + timedelta(days=1), last + timedelta(days=9)) == b'[]'
+    assert calendar.query_json(first, last, currency='XXX') == b'[]'
+    assert econ_calendar.EventCalendar([]).query_json(first, last) == b'[]'
+
+
+def test_store_rebuilds_on_change(tmp_path):
+    path = tmp_path / 'events.json'
+    path.write_text(json.dumps([{'date': '2024-01-02', 'time': '14:30', 'currency': 'usd',
+                                 'event': 'CPI', 'impact': 'HIGH'}]))
+    store = econ_calendar.CalendarStore([str(path)])
+    assert store.refresh()
+    assert not store.refresh()
+    assert store.calendar.query(date(2024, 1, 1), date(2024, 1, 31))[0]['currency'] == 'USD'
+
+    path.write_text(json.dumps({'events': [{'date': '2024-01-02', 'event': 'CPI'},
+                                           {'date': '2024-01-03', 'event': 'PPI', 'impact': 'low'}]}))
+    os.utime(path, ns=(1, 1))
+    assert store.refresh()
+    assert len(store.calendar) == 2
+    assert store.generation == 2
+
+
+def test_weekly_default():
+    store = econ_calendar.CalendarStore(weeks=1)
+    store.refresh(today=date(2024, 1, 10))
+    monday = date(2024, 1, 8)
+    assert store.calendar.query(monday, monday + timedelta(days=6)) == [
+        e.to_dict() for e in econ_calendar.weekly(monday, monday + timedelta(days=6))]
+    assert not store.refresh(today=date(2024, 1, 12))      # gleiche Woche
+
+
+def test_ics(tmp_path):
+    path = tmp_path / 'events.ics'
+    path.write_text('BEGIN:VCALENDAR\r\nBEGIN:VEVENT\r\nDTSTART;VALUE=DATE:20240105\r\n'
+                    'SUMMARY:US Arbeitsmarkt\\, NFP\r\nCATEGORIES:USD,Jobs\r\nPRIORITY:1\r\nEND:VEVENT\r\n'
+                    'BEGIN:VEVENT\r\nDTSTART:20240104T101500\r\nSUMMARY:ECB\r\n  Minutes\r\n'
+                    'X-CURRENCY:eur\r\nEND:VEVENT\r\nEND:VCALENDAR\r\n')
+    events = econ_calendar.load(str(path))
+    assert [(e.day, e.time, e.currency, e.event, e.impact) for e in events] == [
+        (date(2024, 1, 5), '', 'USD', 'US Arbeitsmarkt, NFP', 'high'),
+        (date(2024, 1, 4), '10:15', 'EUR', 'ECB Minutes', 'low'),
+    ]
+
+
+def test_unknown_impact_rejected():
+    with pytest.raises(ValueError):
+        econ_calendar.make_event('2024-01-02', impact='extreme')
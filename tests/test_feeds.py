@@ -0,0 +1,87 @@
+"""Intraday-Bars: Block-Verarbeitung (update_batch) gegen Tick für Tick, Tick-CSV"""
+import numpy as np
+import pytest
+
+import feeds
+
+
+def ticks(n, symbols, seed=0):
+    rng = np.random.default_rng(seed)
+    timestamps = np.sort(1_700_000_000 + rng.uniform(0, 6 * 86400, n))
+    names = rng.choice(symbols, n)
+    prices = 1 + np.cumsum(rng.normal(0, 0.0005, n))
+    prices[50:60] = prices[49]          # gleiche Kurse hintereinander
+    return names, timestamps, prices
+
+
+def bars(resampler):
+    result = {}
+    for key, series in resampler.series.items():
+        result[key] = ([series.bars.ordered(f).tolist() for f in ('start', 'open', 'high', 'low', 'close')],
+                       series.current)
+    return result
+
+
+@pytest.mark.parametrize('capacity', [5, 500])
+@pytest.mark.parametrize('chunk', [1, 7, 333, 5000])
+def test_batch_matches_tick_by_tick(capacity, chunk):
+    names, timestamps, prices = ticks(3000, ['EURUSD', 'EUR/USD', 'gbpusd', 'USDJPY'])
+    single = feeds.Resampler(capacity=capacity)
+    for name, ts, px in zip(names.tolist(), timestamps.tolist(), prices.tolist()):
+        single.update(name, ts, px)
+
+    batched = feeds.Resampler(capacity=capacity)
+    for lo in range(0, len(names), chunk):
+        batched.update_batch(names[lo:lo + chunk], timestamps[lo:lo + chunk], prices[lo:lo + chunk])
+
+    assert batched.ticks == single.ticks == 3000
+    assert bars(batched) == bars(single)
+    assert set(single.series) == {(s, tf) for s in ('EURUSD', 'GBPUSD', 'USDJPY') for tf in feeds.TIMEFRAMES}
+
+
+def test_batch_ignores_ticks_before_current_bar():
+    series, reference = feeds.BarSeries(3600), feeds.BarSeries(3600)
+    first = np.array([7200.0, 7300.0])
+    late = np.array([3600.0, 7400.0, 11000.0])
+    for ts, px in zip(first.tolist() + late.tolist(), [1.0, 1.2, 9.0, 1.1, 1.3]):
+        reference.update(ts, px)
+    series.update_batch(first, np.array([1.0, 1.2]))
+    series.update_batch(late, np.array([9.0, 1.1, 1.3]))
+    assert series.closes() == reference.closes() == [1.1, 1.3]
+    assert series.bars.ordered('high').tolist() == [1.2]
+
+
+def test_symbol_filter():
+    names, timestamps, prices = ticks(200, ['EURUSD', 'GBPUSD'])
+    resampler = feeds.Resampler(symbols=['EURUSD'])
+    resampler.update_batch(names, timestamps, prices)
+    assert {symbol for symbol, _ in resampler.series} == {'EURUSD'}
+
+
+def test_csv_source_follows_appended_file(tmp_path):
+    path = tmp_path / 'ticks.csv'
+    path.write_text('timestamp,symbol,bid,ask\n'
+                    '2024-01-02T10:00:00Z,EUR/USD,1.0990,1.1010\n'
+                    '2024-01-02T10:30:00Z,EURUSD,1.1010,1.1030\n'
+                    '2024-01-02T11:0')                          # Zeile noch nicht fertig
+    feed = feeds.IntradayFeed(feeds.CSVTickSource(str(path)))
+    assert feed.poll() == 2
+    with open(path, 'a') as f:
+        f.write('5:00Z,EURUSD,1.0980,1.1000\n')
+    assert feed.poll() == 1
+    assert feed.poll() == 0
+
+    assert feed.has('EURUSD')
+    assert feed.closes('EURUSD', '1h') == pytest.approx([1.102, 1.099])
+    series = feed.resampler.get('EURUSD', '1h')
+    assert series.bars.ordered('open').tolist() == pytest.approx([1.1])
+    assert series.bars.ordered('high').tolist() == pytest.approx([1.102])
+
+
+def test_csv_source_unix_timestamps(tmp_path):
+    path = tmp_path / 'ticks.csv'
+    path.write_text('timestamp,symbol,price\n1704189600.5,GBPUSD,1.27\n1704189601,GBPUSD,1.28\n')
+    symbols, timestamps, prices = feeds.CSVTickSource(str(path)).read()
+    assert symbols.tolist() == [b'GBPUSD', b'GBPUSD']
+    assert timestamps.tolist() == [1704189600.5, 1704189601.0]
+    assert prices.tolist() == [1.27, 1.28]
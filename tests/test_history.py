@@ -0,0 +1,57 @@
+"""RateHistory: mehrere Worker auf einem RateStore fragen Upstream nur einmal"""
+from datetime import date, timedelta
+
+import pytest
+
+from cache_backend import SQLiteCache
+from history import RateHistory
+from rate_store import RateStore
+from stub_frankfurter import StubServer, random_walk
+from upstream import UpstreamClient
+
+
+@pytest.fixture
+def stub():
+    server = StubServer(random_walk(date.today() - timedelta(days=200), date.today()))
+    server.start()
+    yield server
+    server.stop()
+
+
+def worker(stub, tmp_path, owner, max_age=60):
+    """Eine RateHistory wie in einem gunicorn-Worker: eigener Client, gemeinsamer
+    Store und gemeinsame SQLite-Datei für die Lease"""
+    cache = SQLiteCache(str(tmp_path / 'cache.sqlite3'))
+    return RateHistory(UpstreamClient(stub.url, retries=0), days=100, max_age=max_age,
+                       store=RateStore(str(tmp_path / 'rates')),
+                       lease=lambda: cache.acquire('history', owner, max_age))
+
+
+def test_only_lease_holder_fetches(stub, tmp_path):
+    workers = [worker(stub, tmp_path, f'worker-{n}') for n in range(4)]
+    for history in workers:
+        assert history.ensure_fresh()
+    assert stub.requests == 1
+    for history in workers[1:]:
+        assert history.dates == workers[0].dates
+        assert history.latest() == workers[0].latest()
+
+
+def test_waiting_worker_retries_store(stub, tmp_path):
+    holder, other = worker(stub, tmp_path, 'a'), worker(stub, tmp_path, 'b')
+    holder.lease()                  # Lease belegt, aber noch nichts geholt
+    other.ensure_fresh()
+    assert stub.requests == 0 and not other.dates
+    assert other.last_update is None
+
+    holder.ensure_fresh()
+    other.ensure_fresh()            # nicht erst nach max_age
+    assert stub.requests == 1
+    assert other.dates == holder.dates
+
+
+def test_without_lease_every_history_fetches(stub, tmp_path):
+    for n in range(2):
+        RateHistory(UpstreamClient(stub.url, retries=0), days=100, store=RateStore(str(tmp_path / 'rates'))
+                    ).ensure_fresh()
+    assert stub.requests == 2       # ohne Lease fragt jede Historie selbst
@@ -0,0 +1,79 @@
+"""Laufender Indikator-Zustand: Checkpoint (JSON) und Fortsetzung nach dem Laden"""
+import json
+
+import numpy as np
+import pytest
+
+import indicators
+
+
+def closes(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    values = np.cumprod(1 + rng.normal(0, 0.004, rows))
+    values[30:35] = values[29]          # Seitwärtsphase
+    return values.tolist()
+
+
+def checkpoint(state):
+    # Der Checkpoint liegt als JSON im Cache-Backend (SQLite) und im Snapshot
+    return type(state).from_dict(json.loads(json.dumps(state.to_dict())))
+
+
+@pytest.mark.parametrize('split', [0, 5, 13, 14, 19, 49, 50, 120])
+def test_round_trip_continues_identically(split):
+    prices = closes(160, seed=split)
+    original = indicators.IndicatorSet(ema_period=50, rsi_period=14, sr_window=20)
+    for price in prices[:split]:
+        original.update(price)
+
+    restored = checkpoint(original)
+    assert restored.latest() == original.latest()
+    for price in prices[split:]:
+        original.update(price)
+        restored.update(price)
+        assert restored.latest() == original.latest()
+
+
+@pytest.mark.parametrize('make', [
+    lambda: indicators.StreamingEMA(10),
+    lambda: indicators.StreamingRSI(14),
+    lambda: indicators.StreamingRSI(14, wilder=True),
+    lambda: indicators.RollingMinMax(7),
+])
+def test_components_round_trip(make):
+    prices = closes(80, seed=3)
+    original = make()
+    for price in prices[:40]:
+        original.update(price)
+    restored = checkpoint(original)
+    for price in prices[40:]:
+        assert restored.update(price) == original.update(price)
+
+
+def test_streaming_matches_batch():
+    prices = closes(120, seed=9)
+    state = indicators.IndicatorSet(ema_period=50, rsi_period=14, sr_window=20)
+    for price in prices:
+        state.update(price)
+    latest = state.latest()
+    support, resistance = indicators.support_resistance(prices, 20)
+    assert latest['ema'] == pytest.approx(indicators.ema(prices, 50)[-1, 0], rel=1e-12)
+    assert latest['rsi'] == pytest.approx(indicators.rsi(prices, 14)[-1, 0], rel=1e-9)
+    assert (latest['support'], latest['resistance']) == (support[-1, 0], resistance[-1, 0])
+
+
+def test_app_resumes_from_checkpoint(app_module, monkeypatch):
+    symbols = [i.symbol for i in app_module.INSTRUMENTS]
+    app_module.update_indicator_state(symbols)
+    expected = {s: app_module.indicator_state['pairs'][s].latest() for s in symbols}
+
+    # Neuer Worker: leerer Zustand, Checkpoint nur im Cache
+    monkeypatch.setitem(app_module.indicator_state, 'pairs', {})
+    monkeypatch.setitem(app_module.indicator_state, 'date', None)
+    loaded = []
+    from_dict = indicators.IndicatorSet.from_dict
+    monkeypatch.setattr(indicators.IndicatorSet, 'from_dict',
+                        classmethod(lambda cls, state: loaded.append(1) or from_dict(state)))
+    app_module.update_indicator_state(symbols)
+    assert len(loaded) == len(symbols)
+    assert {s: app_module.indicator_state['pairs'][s].latest() for s in symbols} == expected
@@ -0,0 +1,79 @@
+"""Indikator-Engine (Zeit x Instrument) gegen die bisherigen Funktionen pro Paar"""
+import numpy as np
+import pytest
+
+import indicators
+
+
+# Die reinen Python-Versionen aus app.py vor der Engine
+def calculate_ema(prices, period):
+    if len(prices) < period:
+        return None
+    multiplier = 2 / (period + 1)
+    ema = sum(prices[:period]) / period
+    for price in prices[period:]:
+        ema = (price - ema) * multiplier + ema
+    return ema
+
+
+def calculate_rsi(prices, period=14):
+    if len(prices) < period + 1:
+        return None
+    gains, losses = [], []
+    for i in range(1, len(prices)):
+        change = prices[i] - prices[i - 1]
+        if change > 0:
+            gains.append(change)
+            losses.append(0)
+        else:
+            gains.append(0)
+            losses.append(abs(change))
+    avg_gain = sum(gains[-period:]) / period
+    avg_loss = sum(losses[-period:]) / period
+    if avg_loss == 0:
+        return 100
+    return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+def find_support_resistance(prices, window=20):
+    if len(prices) < window:
+        return None, None
+    return min(prices[-window:]), max(prices[-window:])
+
+
+def prices(rows, columns, seed=0):
+    rng = np.random.default_rng(seed)
+    matrix = np.cumprod(1 + rng.normal(0, 0.004, (rows, columns)), axis=0)
+    matrix[10:14, 0] = matrix[9, 0]     # Seitwärtsphase: keine Verluste -> RSI 100
+    return matrix
+
+
+# Wenige Spalten laufen über die Python-Schleife pro Spalte, viele vektorisiert
+@pytest.mark.parametrize('columns', [1, 3, indicators.PYTHON_COLUMNS + 5])
+@pytest.mark.parametrize('period', [5, 14, 50])
+def test_batch_matches_per_pair_functions(columns, period):
+    matrix = prices(90, columns, seed=period)
+    ema = indicators.ema(matrix, period)
+    rsi = indicators.rsi(matrix, period)
+    support, resistance = indicators.support_resistance(matrix, period)
+
+    for k in range(columns):
+        column = matrix[:, k].tolist()
+        for end in range(1, len(column) + 1):
+            window = column[:end]
+            expected = calculate_ema(window, period)
+            assert (np.isnan(ema[end - 1, k]) if expected is None else ema[end - 1, k] == expected)
+            expected = calculate_rsi(window, period)
+            assert (np.isnan(rsi[end - 1, k]) if expected is None else rsi[end - 1, k] == expected)
+            low, high = find_support_resistance(window, period)
+            if low is None:
+                assert np.isnan(support[end - 1, k]) and np.isnan(resistance[end - 1, k])
+            else:
+                assert (support[end - 1, k], resistance[end - 1, k]) == (low, high)
+
+
+def test_short_history_is_nan():
+    matrix = prices(10, 2)
+    assert np.isnan(indicators.ema(matrix, 20)).all()
+    assert np.isnan(indicators.rsi(matrix, 14)).all()
+    assert all(np.isnan(a).all() for a in indicators.support_resistance(matrix, 20))
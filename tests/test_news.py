@@ -0,0 +1,140 @@
+"""News-Pipeline: RSS/Atom lesen, Conditional GET, Dubletten und Zuordnung"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import instruments
+import news
+
+RSS = b"""<?xml version="1.0"?>
+<rss version="2.0"><channel><title>FX</title>
+<item><title> ECB holds rates </title><link>https://example.com/ecb</link>
+<description>&lt;p&gt;The &lt;b&gt;euro&lt;/b&gt; firmed&lt;/p&gt;</description>
+<pubDate>Tue, 02 Jan 2024 10:00:00 +0000</pubDate></item>
+<item><title>Neuro stocks rally</title><link>https://example.com/neuro</link>
+<description>Nothing about currencies</description><pubDate>not a date</pubDate></item>
+<item><title>Yen slides as BoJ waits</title><link>https://example.com/yen</link>
+<pubDate>Tue, 02 Jan 2024 09:00:00 +0000</pubDate></item>
+</channel></rss>"""
+
+ATOM = b"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom"><title>Markets</title>
+<entry><title>ECB holds rates</title><link href="https://example.com/ecb"/>
+<updated>2024-01-02T10:05:00+00:00</updated><summary>Duplicate of the RSS item</summary></entry>
+<entry><title>Dollar steady before payrolls</title><link href="https://example.com/usd"/>
+<published>2024-01-02T08:00:00+00:00</published><content>Forex markets wait</content></entry>
+</feed>"""
+
+
+class FeedServer(ThreadingHTTPServer):
+    """Liefert einen Feed mit ETag/Last-Modified und beantwortet passende
+    bedingte Anfragen mit 304"""
+
+    def __init__(self, body):
+        super().__init__(('127.0.0.1', 0), FeedHandler)
+        self.body, self.version, self.requests = body, 1, []
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}/feed.xml'
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        etag = f'"v{server.version}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', 'Tue, 02 Jan 2024 10:00:00 GMT')
+        self.send_header('Content-Length', str(len(server.body)))
+        self.end_headers()
+        self.wfile.write(server.body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def feed_server():
+    server = FeedServer(RSS)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_parse_rss_and_atom(tmp_path):
+    (tmp_path / 'rss.xml').write_bytes(RSS)
+    (tmp_path / 'atom.xml').write_bytes(ATOM)
+    rss = list(news.parse_feed(str(tmp_path / 'rss.xml')))
+    atom = list(news.parse_feed(str(tmp_path / 'atom.xml')))
+
+    assert [i['headline'] for i in rss] == ['ECB holds rates', 'Neuro stocks rally', 'Yen slides as BoJ waits']
+    assert rss[0]['url'] == 'https://example.com/ecb'
+    assert '<b>' not in rss[0]['text'] and 'euro' in rss[0]['text']
+    assert rss[0]['published'] == 1704189600.0
+    assert rss[1]['published'] is None
+    assert [i['url'] for i in atom] == ['https://example.com/ecb', 'https://example.com/usd']
+    assert atom[1]['published'] == 1704182400.0
+    assert 'Forex markets' in atom[1]['text']
+
+
+def test_keyword_matching():
+    matcher = news.KeywordMatcher(news.KEYWORDS)
+    assert matcher.match('Eurozone inflation') == {'EUR'}
+    assert matcher.match('Neuro stocks rally') == set()
+    assert matcher.match('Pound and yen after BoJ') == {'GBP', 'JPY'}
+    assert matcher.match('New Zealand dairy') == {'NZD'}
+
+
+def test_conditional_get(feed_server):
+    pipeline = news.NewsPipeline([feed_server.url])
+    assert pipeline.refresh() == 3
+    assert 'If-None-Match' not in feed_server.requests[0]
+
+    assert pipeline.refresh() == 0
+    assert feed_server.requests[1]['If-None-Match'] == '"v1"'
+    assert feed_server.requests[1]['If-Modified-Since'] == 'Tue, 02 Jan 2024 10:00:00 GMT'
+
+    feed_server.body, feed_server.version = ATOM, 2
+    assert pipeline.refresh() == 1      # ECB-Meldung ist eine Dublette
+    assert pipeline.sources[0].etag == '"v2"'
+
+
+def test_unchanged_file_is_not_parsed_again(tmp_path, monkeypatch):
+    path = tmp_path / 'rss.xml'
+    path.write_bytes(RSS)
+    pipeline = news.NewsPipeline([str(path)])
+    assert pipeline.refresh() == 3
+    monkeypatch.setattr(news, 'parse_feed', lambda source: pytest.fail('Datei unverändert'))
+    assert pipeline.refresh() == 0
+
+
+def test_broken_feed_keeps_others(tmp_path):
+    (tmp_path / 'broken.xml').write_bytes(b'<rss><channel><item>')
+    (tmp_path / 'atom.xml').write_bytes(ATOM)
+    pipeline = news.NewsPipeline([str(tmp_path / 'broken.xml'), str(tmp_path / 'missing.xml'),
+                                  str(tmp_path / 'atom.xml')])
+    assert pipeline.refresh() == 2
+
+
+def test_news_per_pair_without_repeats(tmp_path):
+    (tmp_path / 'rss.xml').write_bytes(RSS)
+    (tmp_path / 'atom.xml').write_bytes(ATOM)
+    pipeline = news.NewsPipeline([str(tmp_path / 'rss.xml'), str(tmp_path / 'atom.xml')])
+    pipeline.refresh()
+    pairs = [instruments.get('EURUSD'), instruments.get('EURJPY'), instruments.get('GBPUSD')]
+    result = pipeline.news(pairs, per_pair=2, now=1704193200.0)
+
+    eur, eurjpy, gbp = (result[p.key] for p in pairs)
+    # Eigene Meldungen, dann allgemeine News, dann der Analyse-Link; jede Meldung höchstens einmal
+    assert [e['headline'] for e in eur] == ['ECB holds rates', 'Dollar steady before payrolls']
+    assert eur[0]['time'] == 'Vor 1 Std'
+    assert [e['headline'] for e in eurjpy] == ['Yen slides as BoJ waits', 'EURJPY - Aktuelle Analyse']
+    assert all(e['headline'] == 'GBPUSD - Aktuelle Analyse' for e in gbp)
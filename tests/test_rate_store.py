@@ -0,0 +1,124 @@
+"""RateStore: Anhängen, Neuschreiben nach vorne und Prüfung von meta.json"""
+import json
+import os
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from rate_store import RateStore
+from stub_frankfurter import random_walk
+
+
+def write_meta(path, **meta):
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(dict({'base': 'USD', 'generation': 1, 'rows': 0, 'days': 0, 'currencies': []}, **meta), f)
+
+
+@pytest.mark.parametrize('meta', [
+    {'generation': '../..'},
+    {'generation': '/etc'},
+    {'generation': True},
+    {'generation': -1},
+    {'rows': '1'},
+    {'currencies': ['../../victim']},
+    {'currencies': ['usd']},
+    {'currencies': 'EUR'},
+])
+def test_rejects_planted_meta(tmp_path, meta):
+    victim = tmp_path / 'victim'
+    victim.mkdir()
+    store_path = tmp_path / 'store'
+    store_path.mkdir()
+    write_meta(store_path, **meta)
+    with pytest.raises(ValueError):
+        RateStore(str(store_path))
+    assert victim.exists()
+
+
+def test_rejects_bad_currency_from_upstream(tmp_path):
+    store = RateStore(str(tmp_path / 'store'))
+    with pytest.raises(ValueError):
+        store.extend({'2024-01-02': {'../X': 1.0}})
+    assert store.rows == 0
+
+
+def test_directory_is_private(tmp_path):
+    RateStore(str(tmp_path / 'store'))
+    assert (tmp_path / 'store').stat().st_mode & 0o077 == 0
+
+
+def expected_rows(rates, currencies):
+    days = sorted(rates)
+    return days, np.array([[rates[d].get(c, np.nan) for c in currencies] for d in days])
+
+
+def assert_store_equals(store, rates):
+    currencies = sorted({c for r in rates.values() for c in r})
+    assert sorted(store.currencies) == currencies
+    days, matrix = store.matrix(currencies)
+    expected_days, expected = expected_rows(rates, currencies)
+    assert days == expected_days
+    np.testing.assert_array_equal(matrix, expected)
+
+
+def test_append_and_backward_rebuild(tmp_path):
+    rates = random_walk(date(2024, 1, 1), date(2024, 4, 30))
+    days = sorted(rates)
+    store = RateStore(str(tmp_path / 'store'))
+    reader = RateStore(str(tmp_path / 'store'))     # anderer Prozess
+
+    assert store.extend({d: rates[d] for d in days[40:60]}) == 20
+    assert store.extend({d: rates[d] for d in days[60:]}) == len(days) - 60     # anhängen
+    generation = store._view.meta['generation']
+    assert_store_equals(store, {d: rates[d] for d in days[40:]})
+
+    # Tage vor dem ersten Datum: neue Generation, die alte verschwindet
+    assert store.extend({d: rates[d] for d in days[:45]}) == 40
+    assert store._view.meta['generation'] == generation + 1
+    assert not (tmp_path / 'store' / str(generation)).exists()
+    assert_store_equals(store, rates)
+
+    assert reader.refresh()
+    assert_store_equals(reader, rates)
+    assert store.extend({d: rates[d] for d in days[:10]}) == 0
+
+
+def test_existing_days_are_kept(tmp_path):
+    store = RateStore(str(tmp_path / 'store'))
+    store.extend({'2024-01-02': {'EUR': 0.9}})
+    assert store.extend({'2024-01-02': {'EUR': 0.5}, '2024-01-03': {'EUR': 0.91}}) == 1
+    assert store.column('EUR').tolist() == [0.9, 0.91]
+
+
+def test_new_currency_on_append(tmp_path):
+    store = RateStore(str(tmp_path / 'store'))
+    store.extend({'2024-01-02': {'EUR': 0.9}, '2024-01-03': {'EUR': 0.91}})
+    store.extend({'2024-01-04': {'EUR': 0.92, 'CHF': 0.85}})
+    assert np.isnan(store.column('CHF')[:2]).all()
+    assert store.column('CHF')[2] == 0.85
+
+
+def test_calendar_lookup(tmp_path):
+    rates = random_walk(date(2024, 1, 1), date(2024, 2, 29))
+    store = RateStore(str(tmp_path / 'store'))
+    store.extend(rates)
+    days = sorted(rates)
+    day = date(2023, 12, 20)
+    while day <= date(2024, 3, 10):
+        # Letztes Fixing an oder vor dem Tag, per Suche über alle Daten
+        before = [n for n, d in enumerate(days) if d <= day.isoformat()]
+        assert store.row(day) == (before[-1] if before else None)
+        day += timedelta(days=1)
+    assert store.dates('2024-01-06', '2024-01-08') == [d for d in days if '2024-01-06' <= d <= '2024-01-08']
+
+
+def test_torn_append_is_truncated(tmp_path):
+    store = RateStore(str(tmp_path / 'store'))
+    store.extend({'2024-01-02': {'EUR': 0.9}})
+    generation = str(store._view.meta['generation'])
+    # Abgebrochener Schreibvorgang: Bytes hinter der letzten gültigen Zeile
+    with open(tmp_path / 'store' / generation / 'EUR.f8', 'ab') as f:
+        f.write(b'\x00' * 5)
+    store.extend({'2024-01-03': {'EUR': 0.91}})
+    assert store.column('EUR').tolist() == [0.9, 0.91]
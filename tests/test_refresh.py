@@ -0,0 +1,72 @@
+"""RefreshScheduler: single-flight und stale-while-revalidate"""
+import threading
+import time
+
+from cache_backend import MemoryCache
+from refresh import RefreshScheduler
+
+
+def slow_build(calls, release, value='data'):
+    def build():
+        calls.append(threading.get_ident())
+        release.wait(5)
+        return value
+    return build
+
+
+def test_cold_start_builds_once():
+    calls, release = [], threading.Event()
+    scheduler = RefreshScheduler(MemoryCache(), tick=60)
+    scheduler.register('rates', slow_build(calls, release), ttl=300)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(scheduler.snapshot('rates')))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert [r['data'] for r in results] == ['data'] * 8
+    assert not any(r['stale'] for r in results)
+
+
+def test_stale_entry_served_while_refreshing():
+    calls, release = [], threading.Event()
+    cache = MemoryCache()
+    cache.set('rates', 'old', time.time() - 400)
+    scheduler = RefreshScheduler(cache, tick=60)
+    scheduler.register('rates', slow_build(calls, release, 'new'), ttl=300)
+
+    start = time.perf_counter()
+    first = scheduler.snapshot('rates')
+    second = scheduler.snapshot('rates')     # Refresh läuft schon - kein zweiter
+    assert time.perf_counter() - start < 1
+    assert first['data'] == second['data'] == 'old'
+    assert first['stale']
+
+    release.set()
+    deadline = time.time() + 5
+    while cache.get('rates')['data'] != 'new' and time.time() < deadline:
+        time.sleep(0.01)
+    assert len(calls) == 1
+    fresh = scheduler.snapshot('rates')
+    assert fresh['data'] == 'new' and not fresh['stale']
+    assert fresh['generation'] == first['generation'] + 1
+
+
+def test_failed_refresh_keeps_last_good():
+    cache = MemoryCache()
+    cache.set('rates', 'old', time.time() - 400)
+    scheduler = RefreshScheduler(cache, tick=60)
+
+    def build():
+        raise RuntimeError('upstream down')
+
+    scheduler.register('rates', build, ttl=300)
+    assert scheduler.refresh('rates') is False
+    assert cache.get('rates')['data'] == 'old'
+    assert cache.acquire('rates', 'other-worker')       # Lease wieder frei
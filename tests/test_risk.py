@@ -0,0 +1,46 @@
+"""RollingRisk (laufende Summen) gegen die Referenz rolling_risk"""
+import numpy as np
+import pytest
+
+import risk
+
+
+def prices(rows, columns, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.cumprod(1 + rng.normal(0, 0.005, (rows, columns)), axis=0)
+
+
+@pytest.mark.parametrize('window', [2, 5, 20])
+def test_incremental_matches_reference_across_rebuilds(window):
+    matrix = prices(window * 5 + 3, 4)
+    rolling = risk.RollingRisk(window, 4)
+    for end in range(1, len(matrix) + 1):
+        rolling.extend(matrix[end - 1:end])
+        expected = risk.rolling_risk(matrix[:end], window)
+        if expected is None:
+            assert not rolling.ready
+            continue
+        assert rolling.ready
+        correlation, volatility, atr = expected
+        np.testing.assert_allclose(rolling.correlation(), correlation, atol=1e-9)
+        np.testing.assert_allclose(rolling.volatility(), volatility, rtol=1e-9)
+        np.testing.assert_allclose(rolling.atr(), atr, rtol=1e-9)
+
+
+def test_bulk_extend_matches_reference():
+    matrix = prices(100, 3, seed=1)
+    rolling = risk.RollingRisk(20, 3)
+    rolling.extend(matrix[:70])     # mehr neue Zeilen als das Fenster
+    rolling.extend(matrix[70:75])
+    correlation, volatility, atr = risk.rolling_risk(matrix[:75], 20)
+    np.testing.assert_allclose(rolling.correlation(), correlation, atol=1e-9)
+    np.testing.assert_allclose(rolling.volatility(), volatility, rtol=1e-9)
+    np.testing.assert_allclose(rolling.atr(), atr, rtol=1e-9)
+
+
+def test_constant_prices_have_no_correlation():
+    matrix = np.column_stack([np.ones(30), prices(30, 1)[:, 0]])
+    rolling = risk.RollingRisk(10, 2)
+    rolling.extend(matrix)
+    assert np.isnan(rolling.correlation()[0, 1])
+    assert risk.to_rows(rolling.correlation())[0][1] is None
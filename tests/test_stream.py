@@ -0,0 +1,67 @@
+"""/api/stream: Events, Reconnect und keine Alarme für anonyme Clients"""
+from conftest import ALERT_TOKENS
+
+
+def read_until_ping(response):
+    """SSE-Blöcke bis zum ersten Heartbeat"""
+    blocks = []
+    try:
+        for chunk in response.response:
+            chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+            if chunk.startswith(': ping'):
+                return blocks
+            blocks.append(chunk)
+    finally:
+        response.close()
+
+
+def events(blocks):
+    return [line[len('event: '):] for block in blocks for line in block.splitlines()
+            if line.startswith('event: ')]
+
+
+def test_stream_without_token_gets_no_alerts(app_module, client, monkeypatch):
+    monkeypatch.setattr(app_module.update_stream, 'heartbeat', 0.05)
+    assert client.get('/api/rates').status_code == 200
+    auth = {'Authorization': f"Bearer {ALERT_TOKENS['alice']}"}
+    response = client.post('/api/alerts/rules', headers=auth,
+                           json={'symbol': 'EURUSD', 'condition': 'RSI(14) < 99'})
+    assert response.status_code in (200, 201), response.get_json()
+    app_module.update_alerts()
+    fired = client.get('/api/alerts', headers=auth).get_json()['data']
+    assert fired and fired[0]['symbol'] == 'EURUSD'
+
+    app_module.update_stream.poll_once()
+    blocks = read_until_ping(client.get('/api/stream'))
+    assert 'rates' in events(blocks)
+    assert 'alerts' not in events(blocks)
+    assert not any('RSI(14) < 99' in block for block in blocks)
+
+
+def test_stream_resume_and_foreign_epoch(app_module, client, monkeypatch):
+    stream = app_module.update_stream
+    monkeypatch.setattr(stream, 'heartbeat', 0.05)
+    stream.publish('news', {'full': True, 'data': []})
+    last = stream.event_id(stream.seq)
+    stream.publish('news', {'full': True, 'data': ['x']})
+
+    resumed = read_until_ping(client.get('/api/stream', headers={'Last-Event-ID': last}))
+    assert events(resumed) == ['news']
+    assert f'id: {stream.event_id(stream.seq)}' in resumed[-1]
+
+    # Fremde Epoche (anderer Worker/Neustart): kompletter Stand statt Nachlieferung
+    foreign = read_until_ping(client.get('/api/stream', headers={'Last-Event-ID': 'abc:1'}))
+    assert '"full": true' in foreign[1]
+
+
+def test_stream_cap(app_module, client, monkeypatch):
+    monkeypatch.setattr(app_module.update_stream, 'max_clients', app_module.update_stream.clients + 1)
+    first = client.get('/api/stream')
+    assert first.status_code == 200
+    full = client.get('/api/stream')
+    assert full.status_code == 503
+    assert full.headers['Retry-After'] == '30'
+    first.close()
+    again = client.get('/api/stream')
+    assert again.status_code == 200
+    again.close()
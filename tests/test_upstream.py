@@ -0,0 +1,130 @@
+"""UpstreamClient gegen den lokalen Frankfurter-Stub: Retries, Circuit
+Breaker, Deadline und Last-Known-Good."""
+import time
+from datetime import date
+
+import pytest
+
+from stub_frankfurter import StubServer, random_walk
+from upstream import CircuitBreaker, CircuitOpenError, DeadlineExceeded, UpstreamClient, UpstreamError
+
+RATES = random_walk(date(2024, 1, 1), date(2024, 3, 1))
+
+
+@pytest.fixture
+def stub():
+    server = StubServer(RATES)
+    server.start()
+    yield server
+    server.stop()
+
+
+def make_client(stub, retries=2, breaker=None, timeout=5):
+    return UpstreamClient(stub.url, timeout=timeout, retries=retries, backoff=0, breaker=breaker)
+
+
+def test_success(stub):
+    result = make_client(stub).get_json('/latest', {'from': 'USD'})
+    assert not result.stale
+    assert result.data['date'] == max(RATES)
+    assert stub.requests == 1
+
+
+def test_retries_until_success(stub):
+    stub.fail_first = 2
+    result = make_client(stub, retries=2).get_json('/latest')
+    assert not result.stale
+    assert stub.requests == 3
+
+
+def test_retries_exhausted_raises(stub):
+    stub.fail_first = 10
+    with pytest.raises(UpstreamError):
+        make_client(stub, retries=1).get_json('/latest')
+    assert stub.requests == 2
+
+
+def test_last_known_good_after_failure(stub):
+    client = make_client(stub, retries=0)
+    fresh = client.get_json('/latest')
+    stub.failure_rate = 1.0
+    result = client.get_json('/latest')
+    assert result.stale
+    assert result.data == fresh.data
+
+
+def test_client_error_is_not_retried(stub):
+    client = make_client(stub, retries=2)
+    with pytest.raises(UpstreamError):
+        client.get_json('/unknown')
+    assert stub.requests == 1
+    assert client.breaker.failures == 0
+
+
+def test_breaker_opens_and_skips_calls(stub):
+    stub.failure_rate = 1.0
+    client = make_client(stub, retries=0, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    for _ in range(2):
+        with pytest.raises(UpstreamError):
+            client.get_json('/latest')
+    assert client.breaker.state == 'open'
+
+    with pytest.raises(CircuitOpenError):
+        client.get_json('/latest')
+    assert stub.requests == 2
+
+
+def test_breaker_half_open_probe(stub):
+    stub.failure_rate = 1.0
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    client = make_client(stub, retries=0, breaker=breaker)
+    with pytest.raises(UpstreamError):
+        client.get_json('/latest')
+    assert breaker.state == 'open'
+
+    # Probeaufruf schlägt fehl -> wieder offen
+    time.sleep(0.06)
+    assert breaker.state == 'half-open'
+    with pytest.raises(UpstreamError):
+        client.get_json('/latest')
+    assert breaker.state == 'open'
+
+    # Probeaufruf klappt -> geschlossen
+    stub.failure_rate = 0.0
+    time.sleep(0.06)
+    assert not client.get_json('/latest').stale
+    assert breaker.state == 'closed'
+
+
+def test_half_open_allows_single_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_expired_deadline_does_not_call_upstream(stub):
+    client = make_client(stub)
+    with client.deadline(0):
+        with pytest.raises(DeadlineExceeded):
+            client.get_json('/latest')
+    assert stub.requests == 0
+    assert client.breaker.failures == 0
+
+
+def test_deadline_is_not_a_breaker_failure(stub):
+    stub.latency = 0.3
+    client = make_client(stub, retries=2, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+    started = time.monotonic()
+    with client.deadline(0.1):
+        with pytest.raises(DeadlineExceeded):
+            client.get_json('/latest')
+    assert time.monotonic() - started < 0.3
+    # Ein knappes Budget des Aufrufers öffnet den Breaker für einen gesunden Upstream nicht
+    assert client.breaker.failures == 0
+    assert client.breaker.state == 'closed'
+
+    stub.latency = 0.0
+    assert not client.get_json('/latest').stale
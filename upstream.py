@@ -0,0 +1,218 @@
+"""Gemeinsamer HTTP-Client für die Upstream-APIs (Frankfurter).
+
+- eine requests.Session mit Connection-Pool (Keep-Alive); requests wird
+  erst beim ersten Aufruf importiert, das hält den Start des Dienstes kurz
+- Gesamt-Deadline pro Refresh (UpstreamClient.deadline), an die sich alle
+  Aufrufe und Retries im selben Thread halten
+- begrenzte Retries mit Backoff und Jitter für Timeouts, Verbindungsfehler,
+  429 und 5xx
+- Circuit Breaker: nach mehreren Fehlern in Folge werden Aufrufe eine Weile
+  gar nicht erst versucht. Eine abgelaufene Deadline liegt am Aufrufer, nicht
+  am Upstream, und zählt nicht als Fehler
+- Last-Known-Good: scheitert ein Aufruf, kommt die letzte gute Antwort für
+  dieselbe URL zurück, markiert als stale
+"""
+import random
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import metrics
+
+UpstreamResult = namedtuple('UpstreamResult', 'data stale')
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class UpstreamError(Exception):
+    """Upstream nicht erreichbar oder fehlerhafte Antwort"""
+
+
+class CircuitOpenError(UpstreamError):
+    """Circuit Breaker offen - Aufruf wurde nicht versucht"""
+
+
+class DeadlineExceeded(UpstreamError):
+    """Die Deadline des Refreshs ist abgelaufen"""
+
+
+class CircuitBreaker:
+    """closed -> open nach `failure_threshold` Fehlern in Folge; nach
+    `reset_timeout` Sekunden wird ein Probeaufruf erlaubt (half-open)"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self.probing:
+                # Genau ein Probeaufruf, die anderen warten auf dessen Ergebnis
+                self.probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def release(self):
+        """Aufruf ohne Ergebnis für den Upstream (z.B. Deadline des Aufrufers):
+        weder Erfolg noch Fehler, nur einen laufenden Probeaufruf freigeben"""
+        with self._lock:
+            self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.probing = False
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+
+class UpstreamClient:
+    """JSON-Client für eine Upstream-API mit Pool, Retries und Circuit Breaker"""
+
+    def __init__(self, base_url, timeout=10, retries=2, backoff=0.5,
+                 breaker=None, pool_size=10):
+        self.base_url = base_url.rstrip('/')
+        self.name = urlparse(self.base_url).netloc     # Label für die Metriken
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.pool_size = pool_size
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._last_good = {}
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        """requests.Session mit Pool, beim ersten Zugriff angelegt"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._session = session
+        return self._session
+
+    @contextmanager
+    def deadline(self, seconds):
+        """Gesamtbudget für alle Aufrufe im Block (im aktuellen Thread)"""
+        previous = getattr(self._local, 'deadline', None)
+        expires = time.monotonic() + seconds
+        if previous is not None:
+            expires = min(expires, previous)
+        self._local.deadline = expires
+        try:
+            yield
+        finally:
+            self._local.deadline = previous
+
+    def _remaining(self):
+        expires = getattr(self._local, 'deadline', None)
+        if expires is None:
+            return None
+        return expires - time.monotonic()
+
+    def get_json(self, path, params=None):
+        """GET auf base_url + path. Liefert UpstreamResult(data, stale);
+        nach einem Fehler die letzte gute Antwort (stale=True), falls es eine
+        gibt, sonst UpstreamError."""
+        key = (path, tuple(sorted((params or {}).items())))
+        try:
+            data = self._fetch(path, params)
+        except UpstreamError as e:
+            if key in self._last_good:
+                metrics.UPSTREAM_STALE.inc(upstream=self.name)
+                print(f"Upstream {path}: {e} - liefere letzten guten Stand")
+                return UpstreamResult(self._last_good[key], True)
+            raise
+
+        self._last_good[key] = data
+        return UpstreamResult(data, False)
+
+    def _fetch(self, path, params):
+        if not self.breaker.allow():
+            metrics.UPSTREAM_ERRORS.inc(upstream=self.name, type='circuit_open')
+            raise CircuitOpenError(f'Circuit offen für {self.base_url}')
+
+        from requests import RequestException, Timeout
+
+        url = self.base_url + path
+        attempt = 0
+        while True:
+            remaining = self._remaining()
+            if remaining is not None and remaining <= 0:
+                self.breaker.release()
+                metrics.UPSTREAM_ERRORS.inc(upstream=self.name, type='deadline')
+                raise DeadlineExceeded(f'Deadline abgelaufen: {url}')
+            timeout = self.timeout if remaining is None else min(self.timeout, remaining)
+
+            try:
+                response = self.session.get(url, params=params, timeout=timeout)
+            except RequestException as e:
+                if isinstance(e, Timeout) and timeout < self.timeout and self._remaining() <= 0:
+                    # Nur wegen des Restbudgets abgebrochen - nicht dem Upstream anlasten
+                    self.breaker.release()
+                    metrics.UPSTREAM_ERRORS.inc(upstream=self.name, type='deadline')
+                    raise DeadlineExceeded(f'Deadline abgelaufen: {url}') from e
+                error = UpstreamError(f'{type(e).__name__}: {e}')
+                kind = type(e).__name__
+            else:
+                if response.status_code == 200:
+                    try:
+                        data = response.json()
+                    except ValueError:
+                        error = UpstreamError(f'Ungültiges JSON von {url}')
+                        kind = 'invalid_json'
+                    else:
+                        self.breaker.record_success()
+                        return data
+                elif response.status_code in RETRY_STATUS:
+                    error = UpstreamError(f'HTTP {response.status_code} von {url}')
+                    kind = f'http_{response.status_code}'
+                else:
+                    # Fehler auf unserer Seite (z.B. 404) - kein Retry, zählt nicht für den Breaker
+                    self.breaker.record_success()
+                    metrics.UPSTREAM_ERRORS.inc(upstream=self.name, type=f'http_{response.status_code}')
+                    raise UpstreamError(f'HTTP {response.status_code} von {url}')
+
+            metrics.UPSTREAM_ERRORS.inc(upstream=self.name, type=kind)
+            if attempt >= self.retries:
+                self.breaker.record_failure()
+                raise error
+
+            # Exponentielles Backoff mit vollem Jitter, nie über die Deadline hinaus
+            delay = random.uniform(0, self.backoff * 2 ** attempt)
+            remaining = self._remaining()
+            if remaining is not None:
+                delay = min(delay, max(remaining, 0))
+            time.sleep(delay)
+            attempt += 1